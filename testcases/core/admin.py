@@ -1,8 +1,19 @@
 from django.contrib import admin
 
+from spare_kits.admin import CachedChoicesMixin
 from .models import Answer, Attempt, Question, Test, TestingData, Theme
 
 
+class TestListFilter(admin.RelatedFieldListFilter):
+    """Фильтр по тесту, загружающий тесты вместе с темами."""
+
+    def field_choices(self, field, request, model_admin):
+        return [
+            (test.pk, str(test))
+            for test in Test.objects.select_related('theme')
+        ]
+
+
 class AnswerAdmin(admin.ModelAdmin):
     search_fields = ('answer_text',)
     list_display = ('answer_text',)
@@ -14,7 +25,8 @@ class AnswerInline(admin.TabularInline):
 
 class ThemeAdmin(admin.ModelAdmin):
     search_fields = ('title',)
-    list_display = ('title',)
+    list_display = ('title', 'tests_count',)
+    readonly_fields = ('tests_count',)
 
 
 class UsersAttemptInline(admin.TabularInline):
@@ -25,27 +37,34 @@ class QuestionInline(admin.TabularInline):
     model = Question
 
 
-class TestAdmin(admin.ModelAdmin):
+class TestAdmin(CachedChoicesMixin, admin.ModelAdmin):
     search_fields = ('title',)
-    list_filter = ('title', 'theme', 'date_creation', 'author', 'prize',)
+    list_filter = (
+        'title', 'theme', 'date_creation',
+        ('author', admin.RelatedOnlyFieldListFilter), 'prize',
+    )
     list_display = ('title', 'theme',)
     list_editable = ('theme',)
+    list_select_related = ('theme',)
+    autocomplete_fields = ('theme',)
     readonly_fields = ('questions_count',)
     inlines = (UsersAttemptInline, QuestionInline,)
 
-    def questions_count(self, instance):
-        return instance.questions.count()
 
-    questions_count.short_description = 'Количество вопросов'
-
-
-class QuestionAdmin(admin.ModelAdmin):
+class QuestionAdmin(CachedChoicesMixin, admin.ModelAdmin):
     search_fields = ('question_text',)
     list_display = ('question_text', 'test_base',)
-    list_filter = ('test_base',)
+    list_filter = (('test_base', TestListFilter),)
     list_editable = ('test_base',)
+    list_select_related = ('test_base__theme',)
+    autocomplete_fields = ('test_base',)
     inlines = (AnswerInline,)
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'test_base':
+            kwargs['queryset'] = Test.objects.select_related('theme')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
 
 class TestingDataAdmin(admin.ModelAdmin):
     list_filter = ('attempt',)
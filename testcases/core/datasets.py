@@ -0,0 +1,334 @@
+"""
+Генерация больших воспроизводимых наборов данных для нагрузочного
+тестирования и планирования мощностей.
+
+Все объекты создаются пакетными вставками без сигналов, поэтому
+после генерации пересчитываются счетчики, поисковый индекс, статистика
+пользователей и версии кэшей. Одинаковое зерно и параметры дают
+одинаковые данные.
+"""
+import json
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+
+from spare_kits.page_cache import CATALOG_PAGES, LEADERBOARD_PAGES
+from spare_kits.utils import batched
+from spare_kits.versions import bump_version
+from users.models import CoinTransaction, Color, UserStats, Wallet
+from .models import Answer, Attempt, Question, Test, TestingData, Theme
+from .search import index_tests
+from .snapshots import AnswerSnapshot, QuestionSnapshot, get_version_name
+
+User = get_user_model()
+
+
+def insert_rows(model, columns, rows, batch_size):
+    """
+    Вставляет строки-кортежи в таблицу модели многострочными `INSERT`.
+
+    В отличие от `bulk_create` не создает экземпляры модели и не
+    подготавливает значения полей, поэтому значения должны быть уже
+    в формате базы данных. Возвращает количество вставленных строк.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    names = ', '.join(connection.ops.quote_name(name) for name in columns)
+    placeholder = '({})'.format(', '.join(['%s'] * len(columns)))
+    size = min(
+        batch_size,
+        connection.ops.bulk_batch_size(columns, [None] * batch_size),
+    )
+    inserted = 0
+    with connection.cursor() as cursor:
+        for batch in batched(rows, size):
+            cursor.execute(
+                'INSERT INTO {} ({}) VALUES {}'.format(
+                    table, names, ', '.join([placeholder] * len(batch))
+                ),
+                [value for row in batch for value in row],
+            )
+            inserted += len(batch)
+    return inserted
+
+
+class DatasetGenerator:
+    """
+    Генератор набора данных.
+
+    Попытки создаются по пользователям пакетами по `batch_size`: каждый
+    пользователь проходит `attempts_per_user` разных тестов, доля
+    `in_progress` попыток остается незавершенной.
+    """
+
+    def __init__(self, themes=10, tests_per_theme=10, questions_per_test=10,
+                 answers_per_question=4, users=1000, attempts_per_user=5,
+                 in_progress=0.1, correct_rate=0.7, seed=0, prefix='load',
+                 password=None, batch_size=5000, stdout=None):
+        self.themes = themes
+        self.tests_per_theme = tests_per_theme
+        self.questions_per_test = questions_per_test
+        self.answers_per_question = answers_per_question
+        self.users = users
+        self.attempts_per_user = attempts_per_user
+        self.in_progress = in_progress
+        self.correct_rate = correct_rate
+        self.prefix = prefix
+        self.password = password
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self.random = random.Random(seed)
+        self.counts = {}
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def generate(self):
+        """Создает набор данных и возвращает количество объектов по моделям."""
+        with transaction.atomic():
+            self.create_catalog()
+        self.create_users()
+        self.create_attempts()
+        self.refresh_derived_data()
+        return self.counts
+
+    def create_catalog(self):
+        prefix = self.prefix
+        themes = Theme.objects.bulk_create(
+            (
+                Theme(title=f'{prefix} тема {index}',
+                      slug=f'{prefix}-theme-{index}')
+                for index in range(self.themes)
+            ),
+            batch_size=self.batch_size,
+        )
+        tests = Test.objects.bulk_create(
+            (
+                Test(
+                    theme=theme,
+                    title=f'{prefix} тест {theme_index}-{index}',
+                    prize=self.random.randint(10, 100),
+                    percent_success=self.random.choice((50, 60, 70, 80)),
+                )
+                for theme_index, theme in enumerate(themes)
+                for index in range(self.tests_per_theme)
+            ),
+            batch_size=self.batch_size,
+        )
+        questions = Question.objects.bulk_create(
+            (
+                Question(
+                    question_text=f'{prefix} вопрос {test.pk}-{index}',
+                    test_base=test,
+                )
+                for test in tests
+                for index in range(self.questions_per_test)
+            ),
+            batch_size=self.batch_size,
+        )
+        answers = Answer.objects.bulk_create(
+            (
+                Answer(
+                    answer_text=f'{prefix} ответ {question.pk}-{index}',
+                    question=question,
+                    correct=not index,
+                )
+                for question in questions
+                for index in range(self.answers_per_question)
+            ),
+            batch_size=self.batch_size,
+        )
+        answers_by_question = {}
+        for answer in answers:
+            answers_by_question.setdefault(answer.question_id, []).append(
+                AnswerSnapshot(
+                    pk=answer.pk,
+                    question_id=answer.question_id,
+                    answer_text=answer.answer_text,
+                    correct=answer.correct,
+                )
+            )
+        self.tests = tests
+        self.questions = {test.pk: [] for test in tests}
+        for question in questions:
+            self.questions[question.test_base_id].append(QuestionSnapshot(
+                pk=question.pk,
+                question_text=question.question_text,
+                answers=tuple(answers_by_question.get(question.pk, ())),
+            ))
+        self.counts.update({
+            'themes': len(themes),
+            'tests': len(tests),
+            'questions': len(questions),
+            'answers': len(answers),
+        })
+        self.log(f'Создано тестов: {len(tests)}')
+
+    def create_users(self):
+        color = Color.get_default_color()
+        password = (
+            make_password(self.password) if self.password
+            else make_password(None)
+        )
+        created = 0
+        for batch in batched(range(self.users), self.batch_size):
+            User.objects.bulk_create(
+                User(
+                    username=f'{self.prefix}-user-{index}',
+                    first_name='Пользователь',
+                    last_name=str(index),
+                    password=password,
+                    color=color,
+                )
+                for index in batch
+            )
+            created += len(batch)
+        self.counts['users'] = created
+        self.log(f'Создано пользователей: {created}')
+
+    def answer_questions(self, attempt, order, answered):
+        """
+        Выбирает ответы на первые `answered` вопросов и возвращает
+        id выбранных ответов.
+        """
+        answer_ids = []
+        correct = 0
+        for question_id, _ in order[:answered]:
+            answers = self.questions_map[question_id].answers
+            right = [answer.pk for answer in answers if answer.correct]
+            wrong = [answer.pk for answer in answers if not answer.correct]
+            if right and (not wrong or self.random.random()
+                          < self.correct_rate):
+                answer_ids.append(self.random.choice(right))
+                correct += 1
+            elif wrong:
+                answer_ids.append(self.random.choice(wrong))
+            else:
+                answer_ids.append(None)
+        attempt.answered_count = answered
+        attempt.correct_count = correct
+        return answer_ids
+
+    def build_attempt(self, user_id, test):
+        """
+        Возвращает несохраненную попытку и строки `TestingData` без id
+        попытки: завершенную или, с вероятностью `in_progress`, с частью
+        ответов.
+        """
+        attempt = Attempt(
+            subject_id=user_id,
+            testcase_id=test.pk,
+            seed=self.random.getrandbits(31),
+        )
+        order = attempt.shuffle_order(self.questions[test.pk])
+        attempt.questions_count = len(order)
+        completed = self.random.random() >= self.in_progress
+        if completed:
+            answered = len(order)
+        else:
+            answered = self.random.randrange(len(order) or 1)
+        answer_ids = self.answer_questions(attempt, order, answered)
+        answer_ids += [None] * (len(order) - answered)
+        if completed:
+            attempt.result = round(attempt.percent_correct, 2)
+            attempt.success = attempt.result >= test.percent_success
+        rows = [
+            (question_id, answer_id, position, json.dumps(answers_order))
+            for position, ((question_id, answers_order), answer_id)
+            in enumerate(zip(order, answer_ids))
+        ]
+        return attempt, rows
+
+    def create_attempts(self):
+        """
+        Создает попытки, ответы, кошельки и журнал монет пакетами
+        пользователей.
+
+        Ответов на порядок больше, чем остальных объектов, поэтому они
+        вставляются готовыми кортежами через `insert_rows`, без создания
+        экземпляров модели.
+        """
+        self.questions_map = {
+            question.pk: question
+            for questions in self.questions.values()
+            for question in questions
+        }
+        attempts_per_user = min(self.attempts_per_user, len(self.tests))
+        user_ids = User.objects.filter(
+            username__startswith=f'{self.prefix}-user-'
+        ).order_by('pk').values_list('pk', flat=True).iterator(
+            chunk_size=self.batch_size
+        )
+        attempts_count = testing_data_count = 0
+        users_per_batch = max(
+            self.batch_size // max(attempts_per_user, 1), 1
+        )
+        for batch in batched(user_ids, users_per_batch):
+            attempts, testing_data, wallets, coins = [], [], [], []
+            for user_id in batch:
+                total = 0
+                for test in self.random.sample(self.tests, attempts_per_user):
+                    attempt, rows = self.build_attempt(user_id, test)
+                    attempts.append(attempt)
+                    testing_data.append(rows)
+                    if attempt.success:
+                        total += test.prize
+                        coins.append(CoinTransaction(
+                            owner_id=user_id,
+                            amount=test.prize,
+                            kind=CoinTransaction.PRIZE,
+                            materialized=True,
+                        ))
+                wallets.append(Wallet(
+                    owner_id=user_id, total_won=total, current_sum=total
+                ))
+            with transaction.atomic():
+                Attempt.objects.bulk_create(
+                    attempts, batch_size=self.batch_size
+                )
+                Wallet.objects.bulk_create(
+                    wallets, batch_size=self.batch_size
+                )
+                CoinTransaction.objects.bulk_create(
+                    coins, batch_size=self.batch_size
+                )
+                testing_data_count += insert_rows(
+                    TestingData,
+                    ('question_id', 'answer_id', 'position', 'answers_order',
+                     'attempt_id'),
+                    (
+                        row + (attempt.pk,)
+                        for attempt, rows in zip(attempts, testing_data)
+                        for row in rows
+                    ),
+                    self.batch_size,
+                )
+            attempts_count += len(attempts)
+            self.log(
+                f'Создано попыток: {attempts_count}, '
+                f'ответов: {testing_data_count}'
+            )
+        self.counts['attempts'] = attempts_count
+        self.counts['testing_data'] = testing_data_count
+
+    def refresh_derived_data(self):
+        """Пересчитывает данные, которые обычно обновляют сигналы."""
+        with transaction.atomic():
+            Theme.update_tests_count(
+                Theme.objects.filter(
+                    slug__startswith=f'{self.prefix}-theme-'
+                ).values_list('pk', flat=True)
+            )
+            Test.update_questions_count([test.pk for test in self.tests])
+            index_tests([test.pk for test in self.tests])
+        UserStats.rebuild(
+            User.objects.filter(username__startswith=f'{self.prefix}-user-'),
+            batch_size=self.batch_size,
+        )
+        bump_version(
+            CATALOG_PAGES,
+            LEADERBOARD_PAGES,
+            *[get_version_name(test.pk) for test in self.tests],
+        )
@@ -0,0 +1,306 @@
+"""
+Хранилища состояния незавершенных попыток прохождения тестов.
+
+`DatabaseAttemptEngine` хранит попытку и ответы в таблицах `Attempt`
+и `TestingData` с самого начала тестирования. `CacheAttemptEngine`
+держит порядок вопросов и выбранные ответы в кэше Django и записывает
+`Attempt` вместе со всеми `TestingData` одной транзакцией только при
+завершении теста. Хранилище выбирается настройкой `TESTING_STATE_ENGINE`.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .models import Attempt, Question, TestingData
+
+STATE_KEY = 'core:attempt-state:{}:{}'
+REGISTRY_COUNTER_KEY = 'core:attempt-states:{}'
+REGISTRY_SLOT_KEY = 'core:attempt-states:{}:{}'
+
+
+class DatabaseAttemptEngine:
+    """Хранит состояние попытки в базе данных."""
+
+    def __init__(self, user, test):
+        self.user = user
+        self.test = test
+
+    def get_attempt(self):
+        """Возвращает незавершенную попытку, создавая ее при необходимости."""
+        self.attempt, created = Attempt.objects.filter(
+            result=None
+        ).get_or_create(
+            subject=self.user,
+            testcase_id=self.test.pk,
+        )
+        if created:
+            testing_data = TestingData.objects.bulk_create(
+                self.attempt.shuffle_questions(self.test.questions)
+            )
+            self.attempt.questions_count = len(testing_data)
+            self.attempt.save(update_fields=['questions_count'])
+        elif not self.attempt.questions_count:
+            # Без счетчиков незавершенная попытка считалась бы пройденной
+            self.attempt.recount_answers()
+        return self.attempt
+
+    def get_current(self):
+        """Возвращает первый вопрос попытки без ответа."""
+        return self.attempt.testing_data.filter(answer=None).first()
+
+    def get_pending(self):
+        """Возвращает все вопросы попытки без ответа."""
+        return list(self.attempt.testing_data.filter(answer=None))
+
+    def save_answers(self, form):
+        """Сохраняет ответы из формы `TestingDataForm`/`TestingBatchForm`."""
+        form.save()
+
+    def drop_questions(self, question_ids):
+        """Убирает из попытки вопросы, удаленные после ее начала."""
+        self.attempt.testing_data.filter(question_id__in=question_ids).delete()
+        self.attempt.recount_answers()
+
+    def finish(self):
+        """Сохраняет результат попытки."""
+        self.attempt.save()
+
+
+class CacheAttemptEngine(DatabaseAttemptEngine):
+    """
+    Хранит состояние попытки в кэше до завершения теста.
+
+    Каждая попытка регистрируется в реестре по интервалу времени начала,
+    чтобы `flush_attempt_states` мог найти брошенные попытки.
+    """
+
+    def __init__(self, user, test):
+        super().__init__(user, test)
+        self.key = STATE_KEY.format(user.pk, test.pk)
+
+    def get_attempt(self):
+        self.state = cache.get(self.key)
+        if self.state is None:
+            self.state = self.create_state()
+        self.attempt = Attempt(
+            subject=self.user,
+            testcase_id=self.test.pk,
+            seed=self.state['seed'],
+        )
+        self.count_answers()
+        return self.attempt
+
+    def create_state(self):
+        attempt = Attempt(subject=self.user, testcase_id=self.test.pk)
+        now = time.time()
+        state = {
+            'user_id': self.user.pk,
+            'test_id': self.test.pk,
+            'seed': attempt.seed,
+            'started': now,
+            'updated': now,
+            'questions': [
+                (testing_data.question_id, testing_data.answers_order)
+                for testing_data in attempt.shuffle_questions(
+                    self.test.questions
+                )
+            ],
+            'answers': {},
+        }
+        self.save_state(state)
+        register_state(self.key)
+        return state
+
+    def save_state(self, state):
+        state['updated'] = time.time()
+        cache.set(self.key, state, timeout=settings.TESTING_STATE_TIMEOUT)
+
+    def count_answers(self):
+        correct_answers = self.test.get_correct_answers()
+        answers = self.state['answers']
+        self.attempt.questions_count = len(self.state['questions'])
+        self.attempt.answered_count = len(answers)
+        self.attempt.correct_count = sum(
+            correct_answers.get(answer_id, False)
+            for answer_id in answers.values()
+        )
+
+    def get_testing_data(self):
+        return get_state_testing_data(self.state, self.attempt)
+
+    def get_current(self):
+        return next(
+            (obj for obj in self.get_testing_data() if obj.answer_id is None),
+            None,
+        )
+
+    def get_pending(self):
+        return [
+            obj for obj in self.get_testing_data() if obj.answer_id is None
+        ]
+
+    def drop_questions(self, question_ids):
+        drop_state_questions(self.state, question_ids)
+        self.save_state(self.state)
+        self.count_answers()
+
+    def save_answers(self, form):
+        answers = self.state['answers']
+        for question_id, answer in form.get_answers().items():
+            answers.setdefault(question_id, answer)
+        self.save_state(self.state)
+        self.count_answers()
+
+    def finish(self):
+        """
+        Записывает попытку и все ответы одной транзакцией и удаляет
+        состояние из кэша после ее фиксации.
+        """
+        deleted = get_deleted_questions(self.state)
+        if deleted:
+            self.drop_questions(deleted)
+        with transaction.atomic(savepoint=False):
+            self.attempt.save()
+            TestingData.objects.bulk_create(self.get_testing_data())
+            transaction.on_commit(lambda: cache.delete(self.key))
+
+
+def get_state_testing_data(state, attempt):
+    """Возвращает несохраненные `TestingData` по состоянию попытки."""
+    return [
+        TestingData(
+            attempt=attempt,
+            question_id=question_id,
+            answer_id=state['answers'].get(question_id),
+            position=position,
+            answers_order=answers_order,
+        )
+        for position, (question_id, answers_order) in enumerate(
+            state['questions']
+        )
+    ]
+
+
+def get_deleted_questions(state):
+    """
+    Возвращает идентификаторы вопросов из состояния попытки, удаленных
+    после ее начала: в кэше на них нет внешнего ключа.
+    """
+    question_ids = {question_id for question_id, _ in state['questions']}
+    return question_ids - set(
+        Question.objects.filter(pk__in=question_ids).values_list(
+            'pk', flat=True
+        )
+    )
+
+
+def drop_state_questions(state, question_ids):
+    """Убирает вопросы и ответы на них из состояния попытки."""
+    state['questions'] = [
+        (question_id, answers_order)
+        for question_id, answers_order in state['questions']
+        if question_id not in question_ids
+    ]
+    for question_id in question_ids:
+        state['answers'].pop(question_id, None)
+
+
+def get_attempt_engine(user, test):
+    """Возвращает хранилище попытки согласно `TESTING_STATE_ENGINE`."""
+    if settings.TESTING_STATE_ENGINE == 'cache':
+        return CacheAttemptEngine(user, test)
+    return DatabaseAttemptEngine(user, test)
+
+
+def get_bucket(timestamp):
+    return int(timestamp // settings.TESTING_STATE_BUCKET_SIZE)
+
+
+def register_state(key, timestamp=None):
+    """
+    Добавляет ключ состояния попытки в реестр интервала времени.
+
+    Номер ячейки выдается атомарным `incr`, поэтому параллельные
+    регистрации не перезаписывают друг друга.
+    """
+    bucket = get_bucket(time.time() if timestamp is None else timestamp)
+    timeout = (
+        settings.TESTING_STATE_TIMEOUT + settings.TESTING_STATE_BUCKET_SIZE
+    )
+    counter_key = REGISTRY_COUNTER_KEY.format(bucket)
+    cache.add(counter_key, 0, timeout=timeout)
+    slot = cache.incr(counter_key)
+    cache.set(REGISTRY_SLOT_KEY.format(bucket, slot), key, timeout=timeout)
+
+
+def persist_state(state):
+    """
+    Записывает брошенную попытку в базу данных как незавершенную.
+
+    Если у пользователя уже есть незавершенная попытка этого теста
+    в базе данных, состояние не записывается и возвращается `None`.
+    """
+    drop_state_questions(state, get_deleted_questions(state))
+    attempt = Attempt(
+        subject_id=state['user_id'],
+        testcase_id=state['test_id'],
+        seed=state['seed'],
+        questions_count=len(state['questions']),
+        answered_count=len(state['answers']),
+    )
+    testing_data = get_state_testing_data(state, attempt)
+    try:
+        with transaction.atomic():
+            attempt.save()
+            TestingData.objects.bulk_create(testing_data)
+            attempt.correct_count = TestingData.objects.filter(
+                attempt=attempt, answer__correct=True
+            ).count()
+            attempt.save(update_fields=['correct_count'])
+    except IntegrityError:
+        return None
+    return attempt
+
+
+def flush_attempt_states(max_age, persist=False):
+    """
+    Обрабатывает состояния попыток, не обновлявшиеся дольше `max_age`
+    секунд: удаляет их из кэша или, при `persist=True`, записывает
+    в базу данных незавершенными попытками.
+
+    Активные попытки переносятся в реестр текущего интервала, как и
+    попытки, которые не удалось записать из-за незавершенной попытки
+    того же теста в базе данных: состояние удаляется из кэша только
+    после записи. Возвращает количество обработанных и пропущенных
+    брошенных попыток.
+    """
+    now = time.time()
+    cutoff = now - max_age
+    first_bucket = get_bucket(now - settings.TESTING_STATE_TIMEOUT) - 1
+    flushed = skipped = 0
+    for bucket in range(first_bucket, get_bucket(cutoff) + 1):
+        counter_key = REGISTRY_COUNTER_KEY.format(bucket)
+        slots = cache.get(counter_key)
+        if not slots:
+            continue
+        slot_keys = [
+            REGISTRY_SLOT_KEY.format(bucket, slot)
+            for slot in range(1, slots + 1)
+        ]
+        for key in cache.get_many(slot_keys).values():
+            state = cache.get(key)
+            if state is None:
+                continue
+            if state['updated'] > cutoff:
+                register_state(key, now)
+                continue
+            if persist and persist_state(state) is None:
+                register_state(key, now)
+                skipped += 1
+                continue
+            cache.delete(key)
+            flushed += 1
+        cache.delete_many(slot_keys + [counter_key])
+    return flushed, skipped
@@ -1,12 +1,50 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, Value, When
 
-from .models import Answer, TestingData
+from .models import Answer, Attempt, TestingData
+
+
+class SnapshotAnswerField(forms.ModelChoiceField):
+    """
+    Поле выбора ответа, варианты которого берутся из снимка теста.
+
+    Варианты передаются через `set_answers`, поэтому ни отрисовка поля,
+    ни проверка выбранного ответа не обращаются к базе данных. Ответ,
+    которого нет среди вариантов, не принимается.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(SnapshotAnswerField, self).__init__(*args, **kwargs)
+        self.answers = {}
+
+    def set_answers(self, answers):
+        self.answers = {str(answer.pk): answer for answer in answers}
+        self.choices = [(answer.pk, answer.answer_text) for answer in answers]
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        answer = self.answers.get(str(value))
+        if answer is None:
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return Answer(
+            pk=answer.pk,
+            question_id=answer.question_id,
+            answer_text=answer.answer_text,
+            correct=answer.correct,
+        )
 
 
 class TestingDataForm(forms.ModelForm):
     """Форма для создания объекта тестирования пользователя."""
 
-    answer = forms.ModelChoiceField(
+    answer = SnapshotAnswerField(
         queryset=Answer.objects,
         label='Варианты ответов',
         empty_label=None,
@@ -23,5 +61,110 @@ class TestingDataForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         queryset = kwargs.pop('field_queryset', Answer.objects)
+        answers = kwargs.pop('answers', None)
         super(TestingDataForm, self).__init__(*args, **kwargs)
         self.fields['answer'].queryset = queryset
+        if answers is None:
+            answers = queryset.filter(question_id=self.instance.question_id)
+        self.fields['answer'].set_answers(tuple(answers))
+
+    def get_answers(self):
+        """Возвращает выбранный ответ: идентификатор вопроса -> ответа."""
+        return {self.instance.question_id: self.cleaned_data['answer'].pk}
+
+    def save(self, commit=True):
+        """
+        Сохраняет ответ пользователя и обновляет счетчики попытки.
+
+        Ответ записывается только в еще не отвеченный вопрос, поэтому
+        повторная отправка формы не учитывается в счетчиках дважды.
+        """
+        instance = super(TestingDataForm, self).save(commit=False)
+        if not commit:
+            return instance
+        with transaction.atomic(savepoint=False):
+            answered = TestingData.objects.filter(
+                pk=instance.pk, answer=None
+            ).update(answer=instance.answer)
+            if answered:
+                instance.attempt.count_answers(
+                    answered, int(instance.answer.correct)
+                )
+        return instance
+
+
+class TestingBatchForm(forms.Form):
+    """Форма для ответа сразу на все вопросы теста."""
+
+    def __init__(self, *args, **kwargs):
+        self.testing_data = kwargs.pop('testing_data', [])
+        test = kwargs.pop('test')
+        super(TestingBatchForm, self).__init__(*args, **kwargs)
+        self.correct_answers = test.get_correct_answers()
+        for testing_data in self.testing_data:
+            question = test.get_question(testing_data.question_id)
+            self.fields[self.get_field_name(testing_data)] = (
+                forms.TypedChoiceField(
+                    label=question.question_text,
+                    choices=[
+                        (answer.pk, answer.answer_text)
+                        for answer in testing_data.sort_answers(
+                            question.answers
+                        )
+                    ],
+                    coerce=int,
+                    widget=forms.RadioSelect,
+                )
+            )
+
+    @staticmethod
+    def get_field_name(testing_data):
+        return f'question_{testing_data.question_id}'
+
+    def get_answers(self):
+        """Возвращает выбранные ответы: идентификатор вопроса -> ответа."""
+        return {
+            testing_data.question_id: self.cleaned_data[
+                self.get_field_name(testing_data)
+            ]
+            for testing_data in self.testing_data
+        }
+
+    def save(self):
+        """
+        Сохраняет ответы пользователя и обновляет счетчики попытки.
+
+        Попытка блокируется, а ответы записываются только в еще не
+        отвеченные вопросы, поэтому повторная или параллельная отправка
+        формы не учитывается в счетчиках дважды.
+        """
+        if not self.testing_data:
+            return self.testing_data
+        attempt = self.testing_data[0].attempt
+        answers = {
+            testing_data.pk: self.cleaned_data[
+                self.get_field_name(testing_data)
+            ]
+            for testing_data in self.testing_data
+        }
+        with transaction.atomic(savepoint=False):
+            list(Attempt.objects.select_for_update().filter(
+                pk=attempt.pk
+            ).values_list('pk', flat=True))
+            pending_ids = list(TestingData.objects.filter(
+                pk__in=answers, answer=None
+            ).values_list('pk', flat=True))
+            if not pending_ids:
+                return self.testing_data
+            TestingData.objects.filter(
+                pk__in=pending_ids, answer=None
+            ).update(answer=Case(*[
+                When(pk=pk, then=Value(answers[pk])) for pk in pending_ids
+            ]))
+            attempt.count_answers(len(pending_ids), sum(
+                self.correct_answers.get(answers[pk], False)
+                for pk in pending_ids
+            ))
+        for testing_data in self.testing_data:
+            testing_data.answer_id = answers[testing_data.pk]
+        return self.testing_data
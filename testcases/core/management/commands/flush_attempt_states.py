@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from core.engines import flush_attempt_states
+
+
+class Command(BaseCommand):
+    help = (
+        'Обрабатывает брошенные попытки, состояние которых хранится в кэше: '
+        'удаляет их или записывает в базу данных незавершенными.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age',
+            type=int,
+            default=60 * 60,
+            help='Сколько секунд попытка может не обновляться (по умолчанию '
+                 '3600).',
+        )
+        parser.add_argument(
+            '--persist',
+            action='store_true',
+            help='Записать брошенные попытки в базу данных вместо удаления.',
+        )
+
+    def handle(self, *args, **options):
+        flushed, skipped = flush_attempt_states(
+            options['max_age'], persist=options['persist']
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано брошенных попыток: {flushed}')
+        )
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f'Не записано из-за незавершенных попыток в базе данных: '
+                f'{skipped}'
+            ))
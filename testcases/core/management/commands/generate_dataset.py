@@ -0,0 +1,72 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from core.datasets import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает большой воспроизводимый набор данных: темы, тесты, вопросы, '
+        'ответы, пользователей с кошельками и попытки с ответами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--themes', type=int, default=10,
+                            help='Количество тем (по умолчанию 10).')
+        parser.add_argument('--tests-per-theme', type=int, default=10,
+                            help='Тестов в каждой теме (по умолчанию 10).')
+        parser.add_argument('--questions-per-test', type=int, default=10,
+                            help='Вопросов в каждом тесте (по умолчанию 10).')
+        parser.add_argument('--answers-per-question', type=int, default=4,
+                            help='Вариантов ответа на вопрос (по умолчанию '
+                                 '4, первый - правильный).')
+        parser.add_argument('--users', type=int, default=1000,
+                            help='Количество пользователей (по умолчанию '
+                                 '1000).')
+        parser.add_argument('--attempts-per-user', type=int, default=5,
+                            help='Разных тестов, начатых каждым '
+                                 'пользователем (по умолчанию 5).')
+        parser.add_argument('--in-progress', type=float, default=0.1,
+                            help='Доля незавершенных попыток (по умолчанию '
+                                 '0.1).')
+        parser.add_argument('--correct-rate', type=float, default=0.7,
+                            help='Вероятность правильного ответа (по '
+                                 'умолчанию 0.7).')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Зерно генератора случайных чисел.')
+        parser.add_argument('--prefix', default='load',
+                            help='Префикс названий и имен, чтобы несколько '
+                                 'наборов не пересекались (по умолчанию '
+                                 'load).')
+        parser.add_argument('--password',
+                            help='Пароль всех созданных пользователей; без '
+                                 'него вход по паролю невозможен.')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Количество записей в одном запросе (по '
+                                 'умолчанию 5000).')
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        counts = DatasetGenerator(
+            themes=options['themes'],
+            tests_per_theme=options['tests_per_theme'],
+            questions_per_test=options['questions_per_test'],
+            answers_per_question=options['answers_per_question'],
+            users=options['users'],
+            attempts_per_user=options['attempts_per_user'],
+            in_progress=options['in_progress'],
+            correct_rate=options['correct_rate'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+            password=options['password'],
+            batch_size=options['batch_size'],
+            stdout=self.stdout,
+        ).generate()
+        summary = ', '.join(
+            f'{name}: {count}' for name, count in counts.items()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Набор данных создан за {perf_counter() - start:.1f} с '
+            f'({summary})'
+        ))
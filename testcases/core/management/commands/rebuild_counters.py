@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Test, Theme
+from spare_kits.page_cache import CATALOG_PAGES, invalidate_pages
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает количество тестов тем и вопросов тестов, например '
+        'после загрузки данных командой loaddata.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            Theme.update_tests_count(Theme.objects.values('pk'))
+            Test.update_questions_count(Test.objects.values('pk'))
+            invalidate_pages(CATALOG_PAGES)
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.search import index_tests
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс тестов.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            index_tests()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
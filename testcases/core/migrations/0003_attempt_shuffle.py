@@ -0,0 +1,45 @@
+# Generated by Django 4.0 on 2026-10-18 03:30
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='answer',
+            options={'ordering': ('id',), 'verbose_name': 'ответ', 'verbose_name_plural': 'ответы'},
+        ),
+        migrations.AlterModelOptions(
+            name='question',
+            options={'ordering': ('id',), 'verbose_name': 'вопрос', 'verbose_name_plural': 'вопросы'},
+        ),
+        migrations.AlterModelOptions(
+            name='testingdata',
+            options={'ordering': ('attempt_id', 'position'), 'verbose_name': 'вопрос + ответ пользователя', 'verbose_name_plural': 'вопросы + ответы пользователей'},
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='seed',
+            field=models.PositiveIntegerField(default=core.models.get_shuffle_seed, editable=False, verbose_name='зерно перемешивания вопросов и ответов'),
+        ),
+        migrations.AddField(
+            model_name='testingdata',
+            name='answers_order',
+            field=models.JSONField(blank=True, default=list, verbose_name='порядок вариантов ответа'),
+        ),
+        migrations.AddField(
+            model_name='testingdata',
+            name='position',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='порядковый номер вопроса в попытке'),
+        ),
+        migrations.AddIndex(
+            model_name='testingdata',
+            index=models.Index(fields=['attempt', 'position'], name='testingdata_attempt_pos_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.0 on 2026-10-18 03:33
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_attempt_counters(apps, schema_editor):
+    Attempt = apps.get_model('core', 'Attempt')
+    attempts = Attempt.objects.annotate(
+        testing_questions=Count('testing_data'),
+        testing_answered=Count('testing_data__answer'),
+        testing_correct=Count(
+            'testing_data__answer',
+            filter=Q(testing_data__answer__correct=True),
+        ),
+    ).iterator()
+    for attempt in attempts:
+        Attempt.objects.filter(pk=attempt.pk).update(
+            questions_count=attempt.testing_questions,
+            answered_count=attempt.testing_answered,
+            correct_count=attempt.testing_correct,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_attempt_shuffle'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='answered_count',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='количество данных ответов'),
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='correct_count',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='количество правильных ответов'),
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='questions_count',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='количество вопросов в попытке'),
+        ),
+        migrations.RunPython(
+            fill_attempt_counters, migrations.RunPython.noop
+        ),
+    ]
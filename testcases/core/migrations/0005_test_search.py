@@ -0,0 +1,47 @@
+from django.db import migrations
+
+FORWARD_SQL = {
+    'postgresql': [
+        'CREATE TABLE core_test_search ('
+        'test_id bigint PRIMARY KEY '
+        'REFERENCES core_test (id) ON DELETE CASCADE DEFERRABLE '
+        'INITIALLY DEFERRED, '
+        'document tsvector NOT NULL)',
+        'CREATE INDEX core_test_search_document_idx '
+        'ON core_test_search USING gin (document)',
+        'INSERT INTO core_test_search (test_id, document) '
+        "SELECT test.id, setweight(to_tsvector('russian', test.title), 'A') "
+        "|| setweight(to_tsvector('russian', coalesce(theme.title, '')), "
+        "'B') FROM core_test test "
+        'LEFT JOIN core_theme theme ON theme.id = test.theme_id',
+    ],
+    'sqlite': [
+        'CREATE VIRTUAL TABLE core_test_search USING fts5('
+        "title, theme, tokenize='unicode61 remove_diacritics 2')",
+        'INSERT INTO core_test_search (rowid, title, theme) '
+        "SELECT test.id, test.title, coalesce(theme.title, '') "
+        'FROM core_test test '
+        'LEFT JOIN core_theme theme ON theme.id = test.theme_id',
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    for sql in FORWARD_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in FORWARD_SQL:
+        schema_editor.execute('DROP TABLE core_test_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_attempt_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
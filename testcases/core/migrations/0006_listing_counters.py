@@ -0,0 +1,49 @@
+# Generated by Django 4.0 on 2026-10-18 03:43
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_listing_counters(apps, schema_editor):
+    Theme = apps.get_model('core', 'Theme')
+    Test = apps.get_model('core', 'Test')
+    Question = apps.get_model('core', 'Question')
+    Theme.objects.update(tests_count=Coalesce(
+        Subquery(
+            Test.objects.filter(theme=OuterRef('pk')).order_by().values(
+                'theme'
+            ).annotate(count=Count('pk')).values('count')
+        ),
+        0,
+    ))
+    Test.objects.update(questions_count=Coalesce(
+        Subquery(
+            Question.objects.filter(test_base=OuterRef('pk')).order_by(
+            ).values('test_base').annotate(count=Count('pk')).values('count')
+        ),
+        0,
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_test_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='test',
+            name='questions_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='количество вопросов'),
+        ),
+        migrations.AddField(
+            model_name='theme',
+            name='tests_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='количество тестов'),
+        ),
+        migrations.RunPython(
+            fill_listing_counters, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.0 on 2026-10-18 03:47
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def make_slugs_unique(apps, schema_editor):
+    """Добавляет к повторяющимся слагам тем числовой суффикс."""
+    Theme = apps.get_model('core', 'Theme')
+    duplicates = Theme.objects.order_by().values('slug').annotate(
+        count=Count('pk')
+    ).filter(count__gt=1).values_list('slug', flat=True)
+    taken = set(Theme.objects.values_list('slug', flat=True))
+    for slug in list(duplicates):
+        themes = Theme.objects.filter(slug=slug).order_by('pk')[1:]
+        for theme in themes:
+            suffix = 2
+            while f'{slug}-{suffix}' in taken:
+                suffix += 1
+            theme.slug = f'{slug}-{suffix}'
+            taken.add(theme.slug)
+            theme.save(update_fields=['slug'])
+
+
+def delete_duplicate_open_attempts(apps, schema_editor):
+    """
+    Оставляет по одной, самой новой, незавершенной попытке на пару
+    пользователь/тест.
+    """
+    Attempt = apps.get_model('core', 'Attempt')
+    latest = Attempt.objects.filter(result=None).order_by().values(
+        'subject', 'testcase'
+    ).annotate(
+        count=Count('pk'), latest=Max('pk')
+    ).filter(count__gt=1)
+    for row in list(latest):
+        Attempt.objects.filter(
+            result=None,
+            subject_id=row['subject'],
+            testcase_id=row['testcase'],
+            pk__lt=row['latest'],
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_listing_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(make_slugs_unique, migrations.RunPython.noop),
+        migrations.RunPython(
+            delete_duplicate_open_attempts, migrations.RunPython.noop
+        ),
+        migrations.AlterField(
+            model_name='theme',
+            name='slug',
+            field=models.SlugField(unique=True, verbose_name='слаг/аббревиатура темы'),
+        ),
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(fields=['subject', 'testcase', 'success'], name='attempt_subject_test_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testingdata',
+            index=models.Index(condition=models.Q(('answer__isnull', True)), fields=['attempt', 'position'], name='testingdata_pending_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='attempt',
+            constraint=models.UniqueConstraint(condition=models.Q(('result__isnull', True)), fields=('subject', 'testcase'), name='attempt_one_open_per_user_test'),
+        ),
+    ]
@@ -1,11 +1,20 @@
+import random
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 
 User = get_user_model()
 
 
+def get_shuffle_seed():
+    """Возвращает случайное зерно для перемешивания вопросов попытки."""
+    return random.getrandbits(31)
+
+
 class Theme(models.Model):
     """Модель для тематики тестов."""
 
@@ -15,8 +24,14 @@ class Theme(models.Model):
         verbose_name='название',
     )
     slug = models.SlugField(
+        unique=True,
         verbose_name='слаг/аббревиатура темы',
     )
+    tests_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='количество тестов',
+    )
 
     class Meta:
         """
@@ -33,6 +48,18 @@ class Theme(models.Model):
         """
         return f'{self.title}'
 
+    @classmethod
+    def update_tests_count(cls, theme_ids):
+        """Пересчитывает одним запросом количество тестов тем `theme_ids`."""
+        cls.objects.filter(pk__in=theme_ids).update(tests_count=Coalesce(
+            Subquery(
+                Test.objects.filter(theme=OuterRef('pk')).order_by().values(
+                    'theme'
+                ).annotate(count=Count('pk')).values('count')
+            ),
+            0,
+        ))
+
 
 class Test(models.Model):
     """Модель теста."""
@@ -73,6 +100,11 @@ class Test(models.Model):
         ],
         verbose_name='процент правильных ответов для прохождения',
     )
+    questions_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='количество вопросов',
+    )
 
     class Meta:
         """
@@ -89,6 +121,22 @@ class Test(models.Model):
         """
         return f'{self.title} ({self.theme})'
 
+    @classmethod
+    def update_questions_count(cls, test_ids):
+        """
+        Пересчитывает одним запросом количество вопросов тестов `test_ids`.
+        """
+        cls.objects.filter(pk__in=test_ids).update(questions_count=Coalesce(
+            Subquery(
+                Question.objects.filter(
+                    test_base=OuterRef('pk')
+                ).order_by().values('test_base').annotate(
+                    count=Count('pk')
+                ).values('count')
+            ),
+            0,
+        ))
+
 
 class Attempt(models.Model):
     """Промежуточная модель попытки прохождения теста пользователем."""
@@ -120,12 +168,42 @@ class Attempt(models.Model):
         decimal_places=2,
         verbose_name='процент правильных ответов',
     )
+    questions_count = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='количество вопросов в попытке',
+    )
+    answered_count = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='количество данных ответов',
+    )
+    correct_count = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='количество правильных ответов',
+    )
+    seed = models.PositiveIntegerField(
+        default=get_shuffle_seed,
+        editable=False,
+        verbose_name='зерно перемешивания вопросов и ответов',
+    )
 
     class Meta:
         """
         Сортирует и добавляет названия в админке.
         """
         ordering = ('subject',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('subject', 'testcase'),
+                condition=models.Q(result__isnull=True),
+                name='attempt_one_open_per_user_test',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('subject', 'testcase', 'success'),
+                name='attempt_subject_test_idx',
+            ),
+        ]
         verbose_name = 'пользователь + тест'
         verbose_name_plural = 'пользователи + тесты'
 
@@ -136,6 +214,83 @@ class Attempt(models.Model):
         """
         return f'{self.subject} + {self.testcase}'
 
+    @property
+    def is_completed(self):
+        """Проверяет по счетчикам, даны ли ответы на все вопросы."""
+        return self.answered_count >= self.questions_count
+
+    @property
+    def percent_correct(self):
+        """Возвращает процент правильных ответов по счетчикам попытки."""
+        if not self.questions_count:
+            return 0
+        return self.correct_count / self.questions_count * 100
+
+    def count_answers(self, answered, correct):
+        """
+        Атомарно увеличивает счетчики данных и правильных ответов попытки.
+
+        Значения экземпляра обновляются в памяти, чтобы не перечитывать
+        попытку из базы данных.
+        """
+        Attempt.objects.filter(pk=self.pk).update(
+            answered_count=models.F('answered_count') + answered,
+            correct_count=models.F('correct_count') + correct,
+        )
+        self.answered_count += answered
+        self.correct_count += correct
+
+    def recount_answers(self):
+        """
+        Пересчитывает счетчики попытки по ее `TestingData`, например
+        для попыток, загруженных из фикстур без счетчиков.
+        """
+        counts = self.testing_data.aggregate(
+            questions=Count('pk'),
+            answered=Count('answer'),
+            correct=Count('answer', filter=Q(answer__correct=True)),
+        )
+        self.questions_count = counts['questions']
+        self.answered_count = counts['answered']
+        self.correct_count = counts['correct']
+        self.save(update_fields=[
+            'questions_count', 'answered_count', 'correct_count'
+        ])
+
+    def shuffle_order(self, questions):
+        """
+        Перемешивает вопросы теста и варианты ответов на них по зерну попытки.
+
+        Возвращает пары `(id вопроса, порядок id ответов)` в порядке
+        показа вопросов. Одинаковое зерно дает одинаковый порядок.
+        """
+        shuffle = random.Random(self.seed)
+        questions = list(questions)
+        shuffle.shuffle(questions)
+        order = []
+        for question in questions:
+            answers_order = [answer.pk for answer in question.answers]
+            shuffle.shuffle(answers_order)
+            order.append((question.pk, answers_order))
+        return order
+
+    def shuffle_questions(self, questions):
+        """
+        Возвращает несохраненные объекты `TestingData` с позицией вопроса
+        и порядком ответов (см. `shuffle_order`), которые затем создаются
+        одним `bulk_create`.
+        """
+        return [
+            TestingData(
+                attempt=self,
+                question_id=question_id,
+                position=position,
+                answers_order=answers_order,
+            )
+            for position, (question_id, answers_order)
+            in enumerate(self.shuffle_order(questions))
+        ]
+
 
 class Question(models.Model):
     """Модель вопроса."""
@@ -156,7 +311,7 @@ class Question(models.Model):
         """
         Сортирует и добавляет названия в админке.
         """
-        ordering = ('?',)
+        ordering = ('id',)
         verbose_name = 'вопрос'
         verbose_name_plural = 'вопросы'
 
@@ -190,7 +345,7 @@ class Answer(models.Model):
         """
         Сортирует и добавляет названия в админке.
         """
-        ordering = ('?',)
+        ordering = ('id',)
         verbose_name = 'ответ'
         verbose_name_plural = 'ответы'
 
@@ -223,12 +378,32 @@ class TestingData(models.Model):
         on_delete=models.CASCADE,
         verbose_name='попытка',
     )
+    position = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='порядковый номер вопроса в попытке',
+    )
+    answers_order = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='порядок вариантов ответа',
+    )
 
     class Meta:
         """
         Сортирует и добавляет названия в админке.
         """
-        ordering = ('attempt',)
+        ordering = ('attempt_id', 'position')
+        indexes = [
+            models.Index(
+                fields=('attempt', 'position'),
+                name='testingdata_attempt_pos_idx',
+            ),
+            models.Index(
+                fields=('attempt', 'position'),
+                condition=models.Q(answer__isnull=True),
+                name='testingdata_pending_idx',
+            ),
+        ]
         verbose_name = 'вопрос + ответ пользователя'
         verbose_name_plural = 'вопросы + ответы пользователей'
 
@@ -238,3 +413,14 @@ class TestingData(models.Model):
         на печать.
         """
         return f'{self.attempt} + {self.question}'
+
+    def sort_answers(self, answers):
+        """
+        Упорядочивает уже загруженные варианты ответа на вопрос в порядке,
+        сохраненном при создании попытки.
+        """
+        order = {pk: index for index, pk in enumerate(self.answers_order)}
+        return sorted(
+            answers,
+            key=lambda answer: (order.get(answer.pk, len(order)), answer.pk),
+        )
@@ -0,0 +1,124 @@
+"""
+Полнотекстовый поиск тестов.
+
+Индекс хранится в отдельной таблице `core_test_search`, которую создает
+миграция под конкретную СУБД: на PostgreSQL это столбец `tsvector`
+с GIN-индексом и русской морфологией, на SQLite - виртуальная таблица
+FTS5. Для остальных СУБД поиск выполняется через `icontains` по словам
+запроса. Индекс обновляется сигналами при сохранении тестов и тем.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import Test
+
+SEARCH_TABLE = 'core_test_search'
+TOKEN_RE = re.compile(r'\w+')
+
+
+def parse_query(text):
+    """
+    Разбивает поисковый запрос на слова.
+
+    Берутся только буквенно-цифровые последовательности, поэтому
+    результат безопасно подставлять в синтаксис запросов FTS5 и tsquery.
+    """
+    tokens = []
+    for token in TOKEN_RE.findall((text or '').lower()):
+        if token not in tokens:
+            tokens.append(token)
+    return tokens[:settings.SEARCH_MAX_TERMS]
+
+
+def has_search_index():
+    return connection.vendor in ('postgresql', 'sqlite')
+
+
+def index_tests(test_ids=None):
+    """
+    Обновляет записи индекса для тестов `test_ids` (для всех тестов,
+    если не переданы).
+    """
+    if not has_search_index():
+        return
+    if test_ids is not None:
+        test_ids = list(test_ids)
+        if not test_ids:
+            return
+    if connection.vendor == 'postgresql':
+        key, columns, document = 'test_id', '(test_id, document)', (
+            "setweight(to_tsvector('russian', test.title), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(theme.title, '')), "
+            "'B')"
+        )
+    else:
+        key, columns = 'rowid', '(rowid, title, theme)'
+        document = "test.title, coalesce(theme.title, '')"
+    delete, where, params = '', '', []
+    if test_ids is not None:
+        placeholders = ', '.join(['%s'] * len(test_ids))
+        delete = f'WHERE {key} IN ({placeholders})'
+        where = f'WHERE test.id IN ({placeholders})'
+        params = test_ids
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} {delete}', params)
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} {columns} '
+            f'SELECT test.id, {document} '
+            'FROM core_test test '
+            f'LEFT JOIN core_theme theme ON theme.id = test.theme_id {where}',
+            params,
+        )
+
+
+def unindex_test(test_id):
+    """Удаляет тест из индекса."""
+    if not has_search_index():
+        return
+    key = 'test_id' if connection.vendor == 'postgresql' else 'rowid'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE {key} = %s', [test_id]
+        )
+
+
+def search_test_ids(text):
+    """
+    Возвращает идентификаторы найденных тестов, начиная с наиболее
+    релевантных. Совпадение в названии теста весит больше, чем
+    в названии темы; каждое слово запроса ищется как префикс.
+    """
+    tokens = parse_query(text)
+    if not tokens:
+        return []
+    limit = settings.SEARCH_RESULTS_LIMIT
+    if connection.vendor == 'postgresql':
+        sql = (
+            f'SELECT test_id FROM {SEARCH_TABLE}, '
+            "to_tsquery('russian', %s) query "
+            'WHERE document @@ query '
+            'ORDER BY ts_rank(document, query) DESC, test_id DESC LIMIT %s'
+        )
+        params = [' & '.join(f'{token}:*' for token in tokens), limit]
+    elif connection.vendor == 'sqlite':
+        sql = (
+            f'SELECT rowid FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s '
+            f'ORDER BY bm25({SEARCH_TABLE}, 2.0, 1.0), rowid DESC LIMIT %s'
+        )
+        params = [' '.join(f'"{token}"*' for token in tokens), limit]
+    else:
+        condition = Q()
+        for token in tokens:
+            condition &= (
+                Q(title__icontains=token) | Q(theme__title__icontains=token)
+            )
+        return list(Test.objects.filter(condition).order_by(
+            '-id'
+        ).values_list('id', flat=True)[:limit])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,112 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from spare_kits.page_cache import (CATALOG_PAGES, LEADERBOARD_PAGES,
+                                   invalidate_pages)
+from .models import Answer, Attempt, Question, Test, Theme
+from .search import index_tests, unindex_test
+from .snapshots import invalidate_test_snapshot
+
+
+def invalidate_on_commit(test_id):
+    """Меняет версию снимка теста после фиксации транзакции."""
+    if test_id is not None:
+        transaction.on_commit(lambda: invalidate_test_snapshot(test_id))
+
+
+@receiver((post_save, post_delete), sender=Test)
+def test_changed(sender, instance, **kwargs):
+    invalidate_on_commit(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=Question)
+def question_changed(sender, instance, **kwargs):
+    invalidate_on_commit(instance.test_base_id)
+    previous_test_id = getattr(instance, '_previous_test_id', None)
+    if previous_test_id != instance.test_base_id:
+        invalidate_on_commit(previous_test_id)
+
+
+@receiver(pre_save, sender=Answer)
+def answer_remember_test(sender, instance, raw=False, **kwargs):
+    """Запоминает прежний тест ответа для сброса его снимка."""
+    instance._previous_test_id = None
+    if instance.pk is not None and not raw:
+        instance._previous_test_id = Answer.objects.filter(
+            pk=instance.pk
+        ).values_list('question__test_base_id', flat=True).first()
+
+
+@receiver((post_save, post_delete), sender=Answer)
+def answer_changed(sender, instance, **kwargs):
+    test_id = Question.objects.filter(
+        pk=instance.question_id
+    ).values_list('test_base_id', flat=True).first()
+    invalidate_on_commit(test_id)
+    previous_test_id = getattr(instance, '_previous_test_id', None)
+    if previous_test_id != test_id:
+        invalidate_on_commit(previous_test_id)
+
+
+@receiver(post_save, sender=Test)
+def test_saved_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_tests([instance.pk])
+
+
+@receiver(post_delete, sender=Test)
+def test_deleted_index(sender, instance, **kwargs):
+    unindex_test(instance.pk)
+
+
+@receiver(post_save, sender=Theme)
+def theme_saved_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_tests(instance.tests.values_list('id', flat=True))
+
+
+@receiver(pre_save, sender=Test)
+def test_remember_theme(sender, instance, raw=False, **kwargs):
+    """Запоминает прежнюю тему теста для пересчета ее счетчика."""
+    instance._previous_theme_id = None
+    if instance.pk is not None and not raw:
+        instance._previous_theme_id = Test.objects.filter(
+            pk=instance.pk
+        ).values_list('theme_id', flat=True).first()
+
+
+@receiver((post_save, post_delete), sender=Test)
+def test_count_changed(sender, instance, **kwargs):
+    Theme.update_tests_count({
+        instance.theme_id, getattr(instance, '_previous_theme_id', None)
+    } - {None})
+
+
+@receiver(pre_save, sender=Question)
+def question_remember_test(sender, instance, raw=False, **kwargs):
+    """Запоминает прежний тест вопроса для пересчета его счетчика."""
+    instance._previous_test_id = None
+    if instance.pk is not None and not raw:
+        instance._previous_test_id = Question.objects.filter(
+            pk=instance.pk
+        ).values_list('test_base_id', flat=True).first()
+
+
+@receiver((post_save, post_delete), sender=Question)
+def question_count_changed(sender, instance, **kwargs):
+    Test.update_questions_count({
+        instance.test_base_id, getattr(instance, '_previous_test_id', None)
+    } - {None})
+
+
+@receiver((post_save, post_delete), sender=Theme)
+@receiver((post_save, post_delete), sender=Test)
+@receiver((post_save, post_delete), sender=Question)
+def catalog_changed(sender, **kwargs):
+    invalidate_pages(CATALOG_PAGES)
+
+
+@receiver((post_save, post_delete), sender=Attempt)
+def attempt_changed(sender, **kwargs):
+    invalidate_pages(LEADERBOARD_PAGES)
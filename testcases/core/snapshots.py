@@ -0,0 +1,174 @@
+"""
+Неизменяемые снимки тестов.
+
+Снимок содержит тест, его вопросы, варианты ответов и ключ правильных
+ответов. Он хранится в кэше Django под ключом с версией теста, а перед
+кэшем находится LRU текущего процесса. Версия меняется сигналами при
+сохранении или удалении теста, вопроса или ответа.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+
+from spare_kits.versions import bump_version, get_version
+from .models import Test
+
+SNAPSHOT_KEY = 'core:test-snapshot:{}:{}'
+
+
+def get_version_name(test_id):
+    return f'core.test:{test_id}'
+
+
+@dataclass(frozen=True)
+class AnswerSnapshot:
+    """Снимок варианта ответа."""
+
+    pk: int
+    question_id: int
+    answer_text: str
+    correct: bool
+
+
+@dataclass(frozen=True)
+class QuestionSnapshot:
+    """Снимок вопроса вместе с вариантами ответа."""
+
+    pk: int
+    question_text: str
+    answers: tuple
+
+
+@dataclass(frozen=True)
+class TestSnapshot:
+    """Снимок теста со всеми вопросами и ответами."""
+
+    pk: int
+    title: str
+    prize: int
+    percent_success: int
+    questions: tuple
+    version: int = 0
+    questions_map: dict = field(
+        init=False, repr=False, compare=False, default=None
+    )
+
+    def __post_init__(self):
+        object.__setattr__(self, 'questions_map', {
+            question.pk: question for question in self.questions
+        })
+
+    @property
+    def id(self):
+        return self.pk
+
+    def __str__(self):
+        return f'{self.title}'
+
+    def get_question(self, question_id):
+        return self.questions_map.get(question_id)
+
+    def get_answers(self):
+        """Возвращает словарь вариантов ответа по идентификатору вопроса."""
+        return {
+            question.pk: question.answers for question in self.questions
+        }
+
+    def get_correct_answers(self):
+        """Возвращает ключ ответов: идентификатор ответа -> правильность."""
+        return {
+            answer.pk: answer.correct
+            for question in self.questions
+            for answer in question.answers
+        }
+
+
+class SnapshotLRU:
+    """Потокобезопасный LRU снимков тестов текущего процесса."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            snapshot = self.items.get(key)
+            if snapshot is not None:
+                self.items.move_to_end(key)
+            return snapshot
+
+    def set(self, key, snapshot):
+        with self.lock:
+            self.items[key] = snapshot
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+snapshots_lru = SnapshotLRU(settings.TEST_SNAPSHOT_LRU_SIZE)
+
+
+def build_test_snapshot(test_id, version=0):
+    """
+    Собирает снимок теста из базы данных.
+
+    Вызывает `Test.DoesNotExist`, если теста не существует.
+    """
+    test = Test.objects.prefetch_related(
+        'questions', 'questions__answers'
+    ).get(pk=test_id)
+    return TestSnapshot(
+        pk=test.pk,
+        title=test.title,
+        prize=test.prize,
+        percent_success=test.percent_success,
+        version=version,
+        questions=tuple(
+            QuestionSnapshot(
+                pk=question.pk,
+                question_text=question.question_text,
+                answers=tuple(
+                    AnswerSnapshot(
+                        pk=answer.pk,
+                        question_id=question.pk,
+                        answer_text=answer.answer_text,
+                        correct=answer.correct,
+                    ) for answer in question.answers.all()
+                ),
+            ) for question in test.questions.all()
+        ),
+    )
+
+
+def get_test_snapshot(test_id):
+    """
+    Возвращает актуальный снимок теста.
+
+    Сначала ищет снимок в LRU процесса, затем в кэше Django и только
+    после этого собирает его из базы данных.
+    """
+    test_id = int(test_id)
+    version = get_version(get_version_name(test_id))
+    key = SNAPSHOT_KEY.format(test_id, version)
+    snapshot = snapshots_lru.get(key)
+    if snapshot is not None:
+        return snapshot
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_test_snapshot(test_id, version)
+        cache.set(key, snapshot, timeout=settings.TEST_SNAPSHOT_TIMEOUT)
+    snapshots_lru.set(key, snapshot)
+    return snapshot
+
+
+def invalidate_test_snapshot(test_id):
+    """Делает устаревшим снимок теста во всех процессах."""
+    bump_version(get_version_name(test_id))
@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from users.models import UserStats, Wallet
+from ..models import Attempt, TestingData, Theme
+from ..search import search_test_ids
+from ..snapshots import get_test_snapshot
+
+User = get_user_model()
+
+OPTIONS = {
+    'themes': 2,
+    'tests_per_theme': 3,
+    'questions_per_test': 4,
+    'answers_per_question': 3,
+    'users': 10,
+    'attempts_per_user': 2,
+    'in_progress': 0.3,
+    'seed': 7,
+    'batch_size': 7,
+}
+
+
+class DatasetGeneratorTests(TestCase):
+    """Тестирует генератор синтетического набора данных."""
+
+    def generate(self, prefix='load'):
+        call_command(
+            'generate_dataset', prefix=prefix, stdout=StringIO(), **OPTIONS
+        )
+        attempts = Attempt.objects.filter(
+            subject__username__startswith=f'{prefix}-'
+        ).order_by('pk')
+        return (
+            list(attempts.values_list('seed', 'result', 'answered_count')),
+            list(
+                TestingData.objects.filter(attempt__in=attempts)
+                .order_by('attempt', 'position')
+                .values_list('position', 'answer__correct')
+            ),
+        )
+
+    def test_generated_dataset_is_consistent(self):
+        """Созданные данные согласованы со счетчиками и статистикой."""
+        self.generate()
+        self.assertEqual(User.objects.count(), 10)
+        self.assertEqual(Attempt.objects.count(), 20)
+        self.assertEqual(TestingData.objects.count(), 80)
+        self.assertEqual(Wallet.objects.count(), 10)
+        self.assertEqual(UserStats.objects.count(), 10)
+        for theme in Theme.objects.all():
+            self.assertEqual(theme.tests_count, 3)
+            for test in theme.tests.all():
+                self.assertEqual(test.questions_count, 4)
+        for attempt in Attempt.objects.prefetch_related(
+            'testing_data__answer'
+        ):
+            testing_data = attempt.testing_data.all()
+            self.assertEqual(
+                [
+                    (item.question_id, item.answers_order)
+                    for item in testing_data
+                ],
+                attempt.shuffle_order(
+                    get_test_snapshot(attempt.testcase_id).questions
+                ),
+            )
+            answered = [item for item in testing_data if item.answer_id]
+            self.assertEqual(attempt.answered_count, len(answered))
+            self.assertEqual(
+                attempt.correct_count,
+                sum(item.answer.correct for item in answered),
+            )
+            if attempt.result is None:
+                self.assertLess(attempt.answered_count, 4)
+        self.assertTrue(search_test_ids('load тест'))
+
+    def test_same_seed_gives_same_dataset(self):
+        """Одинаковое зерно дает одинаковые попытки и ответы."""
+        self.assertEqual(self.generate('first'), self.generate('second'))
@@ -0,0 +1,210 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from users.models import Wallet
+from ..engines import STATE_KEY
+from ..models import Answer, Attempt, Question, Test, TestingData, Theme
+
+User = get_user_model()
+
+
+@override_settings(
+    TESTING_STATE_ENGINE='cache',
+    CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }},
+)
+class CacheAttemptEngineTests(TestCase):
+    """Тестирует хранение состояния попыток в кэше."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создает экземпляры пользователя, теста, вопросов и ответов."""
+        cls.user = User.objects.create_user(username='tester')
+        Wallet.objects.create(owner=cls.user)
+        cls.theme = Theme.objects.create(
+            title='История',
+            slug='history',
+        )
+        cls.test = Test.objects.create(
+            theme=cls.theme,
+            title='Тестовая история',
+            author=cls.user,
+            prize=100,
+            percent_success=50,
+        )
+        cls.correct_answers = []
+        for number in range(3):
+            question = Question.objects.create(
+                question_text=f'Исторический вопрос {number}',
+                test_base=cls.test,
+            )
+            cls.correct_answers.append(Answer.objects.create(
+                answer_text=f'Исторический ответ {number}',
+                question=question,
+                correct=True,
+            ))
+            Answer.objects.create(
+                answer_text=f'Неверный исторический ответ {number}',
+                question=question,
+                correct=False,
+            )
+        cls.PAGE = reverse('core:tests-detail', kwargs={'pk': cls.test.id})
+        cls.STATE_KEY = STATE_KEY.format(cls.user.id, cls.test.id)
+
+    def setUp(self):
+        """Создает пользователя и чистит кэш."""
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def answer_question(self, correct=True):
+        question = self.authorized_client.get(self.PAGE).context['question']
+        answer = next(
+            answer for answer in question.answers
+            if answer.correct == correct
+        )
+        return self.authorized_client.post(
+            self.PAGE, data={'answer': [str(answer.pk)]}
+        )
+
+    def test_state_is_kept_in_cache_until_finish(self):
+        """Проверяет, что до завершения теста попытка и ответы не пишутся
+        в базу данных, а по завершении записываются целиком.
+        """
+        self.answer_question()
+        self.answer_question(correct=False)
+
+        self.assertFalse(Attempt.objects.exists())
+        self.assertFalse(TestingData.objects.exists())
+        self.assertEqual(len(cache.get(self.STATE_KEY)['answers']), 2)
+
+        self.answer_question()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.authorized_client.get(self.PAGE)
+
+        attempt = Attempt.objects.get()
+        self.assertEqual(response.context['attempt'].pk, attempt.pk)
+        self.assertEqual(attempt.correct_count, 2)
+        self.assertEqual(attempt.answered_count, 3)
+        self.assertTrue(attempt.success)
+        self.assertEqual(
+            TestingData.objects.filter(
+                attempt=attempt, answer__correct=True
+            ).count(),
+            2,
+        )
+        self.assertIsNone(cache.get(self.STATE_KEY))
+        Wallet.materialize()
+        self.assertEqual(
+            Wallet.objects.get(owner=self.user).total_won, self.test.prize
+        )
+
+    def test_deleted_questions_are_dropped(self):
+        """Проверяет, что вопросы, удаленные во время попытки, убираются
+        из нее, а не приводят к ошибке сервера.
+        """
+        self.answer_question()
+        answered_id = next(iter(cache.get(self.STATE_KEY)['answers']))
+        pending_id = next(
+            question_id
+            for question_id, _ in cache.get(self.STATE_KEY)['questions']
+            if question_id != answered_id
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.filter(pk__in=[answered_id, pending_id]).delete()
+        response = self.authorized_client.get(
+            reverse('core:tests-batch', kwargs={'pk': self.test.id})
+        )
+        self.assertEqual(len(response.context['form'].fields), 1)
+        self.assertNotIn(
+            pending_id, dict(cache.get(self.STATE_KEY)['questions'])
+        )
+
+        self.answer_question()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authorized_client.get(self.PAGE)
+        attempt = Attempt.objects.get()
+        self.assertEqual(attempt.questions_count, 1)
+        self.assertEqual(attempt.correct_count, 1)
+        self.assertEqual(attempt.testing_data.count(), 1)
+
+    def test_deleted_answered_question_is_not_persisted(self):
+        """Проверяет, что ответы на удаленные вопросы не записываются
+        в базу данных.
+        """
+        self.answer_question()
+        answered_id = next(iter(cache.get(self.STATE_KEY)['answers']))
+        Question.objects.filter(pk=answered_id).delete()
+        call_command(
+            'flush_attempt_states', max_age=0, persist=True, stdout=StringIO()
+        )
+        attempt = Attempt.objects.get()
+        self.assertEqual(attempt.testing_data.count(), 2)
+        self.assertEqual(attempt.questions_count, 2)
+        self.assertEqual(attempt.answered_count, 0)
+
+    def test_flush_expires_abandoned_state(self):
+        """Проверяет удаление брошенных попыток из кэша."""
+        self.answer_question()
+
+        call_command('flush_attempt_states', max_age=0, stdout=StringIO())
+
+        self.assertIsNone(cache.get(self.STATE_KEY))
+        self.assertFalse(Attempt.objects.exists())
+
+    def test_flush_persists_abandoned_state(self):
+        """Проверяет запись брошенных попыток в базу данных."""
+        self.answer_question()
+
+        call_command(
+            'flush_attempt_states', max_age=0, persist=True, stdout=StringIO()
+        )
+
+        attempt = Attempt.objects.get()
+        self.assertIsNone(attempt.result)
+        self.assertEqual(attempt.answered_count, 1)
+        self.assertEqual(attempt.correct_count, 1)
+        self.assertEqual(attempt.testing_data.count(), 3)
+        self.assertIsNone(cache.get(self.STATE_KEY))
+
+    def test_flush_keeps_state_of_open_attempt(self):
+        """Проверяет, что состояние не удаляется из кэша, если в базе
+        данных уже есть незавершенная попытка этого теста.
+        """
+        self.answer_question()
+        Attempt.objects.create(subject=self.user, testcase=self.test)
+        out = StringIO()
+
+        call_command(
+            'flush_attempt_states', max_age=0, persist=True, stdout=out
+        )
+
+        self.assertIn('Обработано брошенных попыток: 0', out.getvalue())
+        self.assertIn('незавершенных попыток в базе данных: 1', out.getvalue())
+        self.assertIsNotNone(cache.get(self.STATE_KEY))
+        self.assertEqual(Attempt.objects.count(), 1)
+
+    def test_flush_keeps_active_state(self):
+        """Проверяет, что активные попытки не обрабатываются и переносятся
+        в реестр текущего интервала.
+        """
+        self.answer_question()
+
+        call_command('flush_attempt_states', max_age=3600, stdout=StringIO())
+        self.assertIsNotNone(cache.get(self.STATE_KEY))
+
+        with mock.patch(
+            'core.engines.time.time',
+            return_value=cache.get(self.STATE_KEY)['updated'] + 7200,
+        ):
+            call_command(
+                'flush_attempt_states', max_age=3600, stdout=StringIO()
+            )
+        self.assertIsNone(cache.get(self.STATE_KEY))
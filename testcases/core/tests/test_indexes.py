@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+
+from ..models import Attempt, Question, Test, TestingData, Theme
+
+User = get_user_model()
+
+
+class IndexTests(TestCase):
+    """Проверяет по EXPLAIN, что горячие запросы используют индексы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создает экземпляры пользователя, темы, теста и попытки."""
+        cls.user = User.objects.create_user(username='tester')
+        cls.theme = Theme.objects.create(title='История', slug='history')
+        cls.test = Test.objects.create(
+            theme=cls.theme,
+            title='Тестовая история',
+            author=cls.user,
+            prize=100,
+            percent_success=50,
+        )
+        cls.question = Question.objects.create(
+            question_text='Исторический вопрос',
+            test_base=cls.test,
+        )
+        cls.attempt = Attempt.objects.create(
+            subject=cls.user,
+            testcase=cls.test,
+        )
+        TestingData.objects.create(
+            attempt=cls.attempt,
+            question=cls.question,
+        )
+
+    def assertUsesIndex(self, queryset, index_name):
+        """Проверяет, что план запроса использует индекс `index_name`."""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_open_attempt_lookup_uses_index(self):
+        """Поиск незавершенной попытки пользователя."""
+        self.assertUsesIndex(
+            Attempt.objects.filter(
+                result=None, subject=self.user, testcase_id=self.test.pk
+            ),
+            'attempt_one_open_per_user_test',
+        )
+
+    def test_attempt_history_uses_index(self):
+        """Поиск завершенных и успешных попыток пользователя."""
+        for success in None, True:
+            queryset = Attempt.objects.filter(
+                subject=self.user,
+                testcase_id=self.test.pk,
+                result__isnull=False,
+            )
+            if success:
+                queryset = queryset.filter(success=success)
+            with self.subTest(success=success):
+                self.assertUsesIndex(queryset, 'attempt_subject_test_idx')
+
+    def test_pending_testing_data_uses_partial_index(self):
+        """Поиск вопросов попытки без ответа."""
+        self.assertUsesIndex(
+            self.attempt.testing_data.filter(answer=None),
+            'testingdata_pending_idx',
+        )
+
+    def test_theme_by_slug_uses_unique_index(self):
+        """Поиск темы по слагу."""
+        plan = Theme.objects.filter(slug=self.theme.slug).explain()
+        self.assertRegex(plan, r'(?i)index.*slug')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Theme.objects.create(title='Другая история', slug='history')
+
+    def test_only_one_open_attempt_per_user_test(self):
+        """Незавершенная попытка пользователя для теста только одна."""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Attempt.objects.create(subject=self.user, testcase=self.test)
+        Attempt.objects.filter(pk=self.attempt.pk).update(result=100)
+        Attempt.objects.create(subject=self.user, testcase=self.test)
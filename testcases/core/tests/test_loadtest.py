@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.test import (Client, LiveServerTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from spare_kits.loadtest import percentile, run_load_test
+from spare_kits.middleware import QUERY_COUNT_HEADER
+from users.models import Color
+from ..models import Answer, Question, Test, Theme
+
+User = get_user_model()
+
+
+@override_settings(QUERY_COUNT_HEADER=True)
+class LoadTestTests(LiveServerTestCase):
+    """Тестирует нагрузочный тест на запущенном тестовом сервере."""
+
+    # Восстанавливает начальный цвет, созданный миграцией
+    serialized_rollback = True
+
+    def setUp(self):
+        """Создает тему, тест с вопросами и цвет для покупки."""
+        Color.get_default_color()
+        self.color = Color.objects.create(hex_code='FF0000', cost=10)
+        theme = Theme.objects.create(title='История', slug='history')
+        test = Test.objects.create(
+            theme=theme,
+            title='Древний Рим',
+            prize=100,
+            percent_success=0,
+        )
+        for index in range(3):
+            question = Question.objects.create(
+                question_text=f'Вопрос {index}', test_base=test
+            )
+            Answer.objects.create(
+                answer_text=f'Ответ {index}', question=question, correct=True
+            )
+            Answer.objects.create(
+                answer_text=f'Ответ {index}?', question=question,
+                correct=False,
+            )
+
+    def test_scenario_is_measured(self):
+        """Сценарий проходит до покупки цвета, запросы замеряются."""
+        recorder, errors = run_load_test(
+            self.live_server_url, users=2, concurrency=1, prefix='lt'
+        )
+        self.assertEqual(errors, [])
+        report = {row['endpoint']: row for row in recorder.report()}
+        self.assertEqual(report['POST tests-detail']['requests'], 6)
+        self.assertEqual(report['POST user-color']['requests'], 2)
+        for row in report.values():
+            self.assertEqual(row['errors'], 0)
+            self.assertIsNotNone(row['queries'])
+            self.assertLessEqual(row['p50'], row['p95'])
+            self.assertLessEqual(row['p95'], row['p99'])
+        users = User.objects.filter(username__startswith='lt-')
+        self.assertEqual(len(users), 2)
+        for user in users:
+            self.assertEqual(user.color, self.color)
+            self.assertEqual(user.wallet.current_sum, 90)
+
+
+class LoadTestHelpersTests(TestCase):
+    """Тестирует заголовок с количеством SQL-запросов и отчет."""
+
+    def test_query_count_header(self):
+        """Заголовок добавляется только при включенной настройке."""
+        client = Client()
+        client.force_login(User.objects.create_user(username='tester'))
+        url = reverse('core:themes-list')
+        self.assertNotIn(QUERY_COUNT_HEADER, client.get(url))
+        with override_settings(QUERY_COUNT_HEADER=True):
+            client.handler.load_middleware()
+            response = client.get(url)
+        self.assertGreater(int(response[QUERY_COUNT_HEADER]), 0)
+
+    def test_percentile(self):
+        """Перцентили считаются по рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([5], 95), 5)
+        self.assertEqual(percentile([], 95), 0)
@@ -0,0 +1,108 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from spare_kits.metrics import registry
+from ..models import Theme
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    """Тестирует сбор метрик представлений и их эндпоинт."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Включает метрики с файлами во временном каталоге."""
+        cls.metrics_dir = tempfile.mkdtemp()
+        cls.metrics_settings = override_settings(
+            METRICS_ENABLED=True, METRICS_DIR=cls.metrics_dir
+        )
+        cls.metrics_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создает пользователя и тему."""
+        cls.user = User.objects.create_user(username='tester')
+        Theme.objects.create(title='История', slug='history')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.metrics_settings.disable()
+        shutil.rmtree(cls.metrics_dir, ignore_errors=True)
+
+    def setUp(self):
+        """Очищает метрики и создает клиента."""
+        registry.reset()
+        for path in Path(self.metrics_dir).glob('*'):
+            path.unlink()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def get_metrics(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode().splitlines()
+
+    def test_requests_are_measured_by_view(self):
+        """Запросы учитываются по имени представления."""
+        for _ in range(2):
+            self.client.get(reverse('core:themes-list'))
+        lines = self.get_metrics()
+        labels = 'view="core:themes-list",method="GET"'
+        self.assertIn(
+            f'http_requests_total{{{labels},status="200"}} 2', lines
+        )
+        self.assertIn(
+            f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2',
+            lines,
+        )
+        self.assertIn(
+            f'http_request_duration_seconds_count{{{labels}}} 2', lines
+        )
+        self.assertIn('# TYPE http_request_duration_seconds histogram', lines)
+        values = {
+            line.split(' ')[0]: float(line.split(' ')[1])
+            for line in lines if not line.startswith('#')
+        }
+        view = '{view="core:themes-list"}'
+        self.assertGreater(values[f'db_queries_total{view}'], 0)
+        self.assertGreater(values[f'db_query_duration_seconds_total{view}'], 0)
+        self.assertGreater(
+            values[f'template_render_duration_seconds_total{view}'], 0
+        )
+
+    def test_metrics_of_workers_are_summed(self):
+        """Метрики из файлов других процессов суммируются."""
+        self.client.get(reverse('core:themes-list'))
+        labels = [
+            ['view', 'core:themes-list'], ['method', 'GET'],
+            ['status', '200'],
+        ]
+        Path(self.metrics_dir, 'metrics-1.json').write_text(
+            json.dumps([['http_requests_total', labels, 5]])
+        )
+        self.assertIn(
+            'http_requests_total{view="core:themes-list",method="GET",'
+            'status="200"} 6',
+            self.get_metrics(),
+        )
+
+    def test_endpoint_is_internal(self):
+        """Эндпоинт недоступен с чужих адресов без прав персонала."""
+        url = reverse('metrics')
+        response = self.client.get(url, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 404)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        with self.settings(METRICS_ENABLED=False):
+            self.assertEqual(self.client.get(url).status_code, 404)
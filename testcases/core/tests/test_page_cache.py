@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from spare_kits.page_cache import LOCK_KEY, get_page_key
+from users.models import Wallet
+from ..models import Test, Theme
+
+User = get_user_model()
+
+
+class PageCacheTests(TestCase):
+    """Тестирует кэш страниц для анонимных пользователей."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создает экземпляры пользователя, темы и теста."""
+        cls.user = User.objects.create_user(username='tester')
+        cls.wallet = Wallet.objects.create(owner=cls.user)
+        cls.theme = Theme.objects.create(title='История', slug='history')
+        cls.test = Test.objects.create(
+            theme=cls.theme,
+            title='Тестовая история',
+            author=cls.user,
+            prize=100,
+            percent_success=50,
+        )
+        cls.THEMES_PAGE = reverse('core:themes-list')
+        cls.RESULTS_PAGE = reverse('users:users-list')
+
+    def setUp(self):
+        """Чистит кэш и создает клиентов."""
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_anonymous_page_is_cached(self):
+        """Повторный запрос анонима отдается из кэша без запросов к БД,
+        а строка запроса входит в ключ.
+        """
+        response = self.guest_client.get(self.THEMES_PAGE)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            cached = self.guest_client.get(self.THEMES_PAGE)
+        self.assertEqual(cached['X-Page-Cache'], 'hit')
+        self.assertEqual(cached.content, response.content)
+        response = self.guest_client.get(self.THEMES_PAGE, {'cursor': 'x'})
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+
+    def test_authorized_page_is_not_cached(self):
+        """Страницы авторизованных пользователей не кэшируются."""
+        for _ in range(2):
+            response = self.authorized_client.get(self.THEMES_PAGE)
+            self.assertNotIn('X-Page-Cache', response)
+
+    def test_page_is_invalidated_by_signals(self):
+        """Изменение данных делает устаревшими связанные страницы."""
+        self.guest_client.get(self.THEMES_PAGE)
+        self.guest_client.get(self.RESULTS_PAGE)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.theme.title = 'Новая история'
+            self.theme.save()
+        response = self.guest_client.get(self.THEMES_PAGE)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Новая история')
+        response = self.guest_client.get(self.RESULTS_PAGE)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.wallet.total_won = 10
+            self.wallet.save()
+        response = self.guest_client.get(self.RESULTS_PAGE)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+
+    def test_stale_page_is_served_while_revalidating(self):
+        """Пока устаревшую страницу собирает другой запрос, отдается
+        прежняя версия.
+        """
+        self.guest_client.get(self.THEMES_PAGE)
+        with self.captureOnCommitCallbacks(execute=True):
+            Theme.objects.create(title='География', slug='geo')
+        request = self.guest_client.get(self.THEMES_PAGE).wsgi_request
+        with self.captureOnCommitCallbacks(execute=True):
+            Theme.objects.create(title='Физика', slug='physics')
+        cache.add(LOCK_KEY.format(get_page_key(request)), 1)
+        response = self.guest_client.get(self.THEMES_PAGE)
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+        self.assertNotContains(response, 'Физика')
+        with override_settings(PAGE_CACHE_STALE_TIMEOUT=0):
+            response = self.guest_client.get(self.THEMES_PAGE)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Физика')
+
+    def test_conditional_get_returns_not_modified(self):
+        """Проверяет ответ 304 по ETag и Last-Modified, пока данные
+        не изменились.
+        """
+        response = self.guest_client.get(self.THEMES_PAGE)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                self.THEMES_PAGE, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        response = self.guest_client.get(
+            self.THEMES_PAGE, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+        response = self.authorized_client.get(
+            self.THEMES_PAGE, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test.save()
+        response = self.guest_client.get(
+            self.THEMES_PAGE, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
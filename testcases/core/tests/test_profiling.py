@@ -0,0 +1,102 @@
+import pstats
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from spare_kits.profiling import Sampler, make_profile_token
+
+User = get_user_model()
+
+
+class ProfilingTests(TestCase):
+    """Тестирует профилирование запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создает пользователя и сотрудника."""
+        cls.user = User.objects.create_user(username='tester')
+        cls.staff = User.objects.create_user(
+            username='staff', is_staff=True
+        )
+
+    def setUp(self):
+        """Включает профилирование во временный каталог."""
+        cache.clear()
+        self.profiling_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.profiling_dir)
+        profiling_settings = override_settings(
+            PROFILING_DIR=str(self.profiling_dir)
+        )
+        profiling_settings.enable()
+        self.addCleanup(profiling_settings.disable)
+
+    def get_files(self, suffix):
+        return sorted(self.profiling_dir.glob(f'*{suffix}'))
+
+    def test_staff_profiles_request(self):
+        """Персонал профилирует запрос флагом в адресе."""
+        client = Client()
+        client.force_login(self.staff)
+        response = client.get(reverse('core:themes-list'), {'profile': 1})
+        name = response['X-Profile']
+        self.assertIn('core-themes-list', name)
+        [prof] = self.get_files('.prof')
+        self.assertEqual(prof.stem, name)
+        self.assertTrue(pstats.Stats(str(prof)).total_calls)
+        self.assertEqual(len(self.get_files('.collapsed')), 1)
+
+    def test_flag_is_ignored_for_users(self):
+        """Флаг обычного пользователя и неверный токен игнорируются."""
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('core:themes-list')
+        response = client.get(url, {'profile': 1})
+        self.assertNotIn('X-Profile', response)
+        response = client.get(url, HTTP_X_PROFILE='forged')
+        self.assertNotIn('X-Profile', response)
+        self.assertEqual(self.get_files(''), [])
+
+    def test_signed_header(self):
+        """Подписанный заголовок включает профилирование."""
+        response = Client().get(
+            reverse('core:themes-list'),
+            HTTP_X_PROFILE=make_profile_token(),
+        )
+        self.assertIn('X-Profile', response)
+        self.assertEqual(len(self.get_files('.prof')), 1)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_SAMPLE_LIMIT=2)
+    def test_sampling_is_rate_limited(self):
+        """Выборочное профилирование ограничено по частоте и видам."""
+        client = Client()
+        for _ in range(3):
+            response = client.get(reverse('users:users-list'))
+            self.assertNotIn('X-Profile', response)
+        client.get(reverse('core:themes-list'))
+        self.assertEqual(len(self.get_files('.collapsed')), 2)
+        self.assertEqual(self.get_files('.prof'), [])
+        for path in self.get_files('.collapsed'):
+            self.assertIn('users-users-list', path.name)
+
+    @override_settings(PROFILING_SAMPLE_INTERVAL=0.001)
+    def test_sampler_collects_stacks(self):
+        """Сэмплирующий профайлер сворачивает стеки потока."""
+        sampler = Sampler()
+        sampler.start()
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+        sampler.stop()
+        lines = sampler.collapsed().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(any(
+            'test_sampler_collects_stacks' in line for line in lines
+        ))
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertGreater(int(count), 0)
@@ -0,0 +1,190 @@
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.models import Color, UserStats, Wallet
+from ..models import Answer, Question, Test, Theme
+from ..search import index_tests
+
+User = get_user_model()
+
+THEMES = 30
+TESTS_PER_THEME = 10
+QUESTIONS_PER_TEST = 10
+ANSWERS_PER_QUESTION = 3
+USERS = 1000
+# Грубый бюджет времени ответа одного запроса (в секундах); зависит
+# от машины, поэтому проверяется, только если задан в окружении
+LATENCY_BUDGET = float(os.getenv('QUERY_BUDGET_LATENCY', default=0))
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Проверяет количество SQL-запросов (и время ответа, если задано
+    `QUERY_BUDGET_LATENCY`) представлений на наборе данных из сотен
+    тестов, тысяч вопросов и пользователей.
+
+    Бюджет не зависит от размера данных, поэтому появление N+1 запросов
+    сразу его превышает.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """Заполняет базу данных пакетными вставками."""
+        cls.user = User.objects.create_superuser(
+            username='admin', password='admin'
+        )
+        Wallet.objects.create(owner=cls.user, total_won=500, current_sum=500)
+        color = Color.get_default_color()
+        cls.color = Color.objects.create(hex_code='FF0000', cost=100)
+        users = User.objects.bulk_create(
+            User(username=f'user{index}', color=color)
+            for index in range(USERS)
+        )
+        Wallet.objects.bulk_create(
+            Wallet(owner=user, total_won=index, current_sum=index)
+            for index, user in enumerate(users)
+        )
+        UserStats.objects.bulk_create(
+            UserStats(user=user, total_won=index)
+            for index, user in enumerate(users)
+        )
+        themes = Theme.objects.bulk_create(
+            Theme(title=f'Тема {index}', slug=f'theme-{index}')
+            for index in range(THEMES)
+        )
+        tests = Test.objects.bulk_create(
+            Test(
+                theme=theme,
+                title=f'Тест {theme.pk}-{index}',
+                author=cls.user,
+                prize=10,
+                percent_success=50,
+            )
+            for theme in themes for index in range(TESTS_PER_THEME)
+        )
+        questions = Question.objects.bulk_create(
+            Question(
+                question_text=f'Вопрос {test.pk}-{index}',
+                test_base=test,
+            )
+            for test in tests for index in range(QUESTIONS_PER_TEST)
+        )
+        Answer.objects.bulk_create(
+            Answer(
+                answer_text=f'Ответ {question.pk}-{index}',
+                question=question,
+                correct=not index,
+            )
+            for question in questions for index in range(ANSWERS_PER_QUESTION)
+        )
+        Theme.update_tests_count([theme.pk for theme in themes])
+        Test.update_questions_count([test.pk for test in tests])
+        index_tests()
+        cls.theme = themes[0]
+        cls.test = tests[0]
+
+    def setUp(self):
+        """Чистит кэш и создает клиентов."""
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def assertWithinBudget(self, url, queries, client=None, method='get',
+                           data=None):
+        """Выполняет запрос и проверяет бюджет запросов и времени."""
+        client = client or self.authorized_client
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            elapsed = time.perf_counter() - start
+        self.assertLessEqual(
+            len(context), queries,
+            '\n'.join(query['sql'] for query in context.captured_queries),
+        )
+        if LATENCY_BUDGET:
+            self.assertLess(elapsed, LATENCY_BUDGET)
+        return response
+
+    def test_catalog_pages(self):
+        """Списки тем и тестов и результаты поиска."""
+        pages = (
+            (reverse('core:themes-list'), None, 3, 1),
+            (reverse('core:themes-detail', args=(self.theme.slug,)),
+             None, 4, 2),
+            (reverse('core:tests-list'), None, 3, 1),
+            (reverse('core:tests-list'), {'search': 'тест'}, 4, 2),
+        )
+        for url, data, queries, guest_queries in pages:
+            with self.subTest(url=url, data=data):
+                self.assertWithinBudget(url, queries, data=data)
+                self.assertWithinBudget(
+                    url, guest_queries, client=self.guest_client, data=data
+                )
+
+    def test_testing_steps(self):
+        """Каждый шаг прохождения теста по одному вопросу."""
+        url = reverse('core:tests-detail', args=(self.test.pk,))
+        response = self.assertWithinBudget(url, 12)
+        for step in range(QUESTIONS_PER_TEST):
+            question = response.context['question']
+            with self.subTest(step=step):
+                self.assertWithinBudget(
+                    url, 7, method='post',
+                    data={'answer': question.answers[0].pk},
+                )
+                response = self.assertWithinBudget(
+                    url, 4 if step < QUESTIONS_PER_TEST - 1 else 7
+                )
+        self.assertIsNotNone(response.context['attempt'].result)
+
+    def test_batch_testing(self):
+        """Успешное прохождение теста одной формой со всеми вопросами."""
+        url = reverse('core:tests-batch', args=(self.test.pk,))
+        response = self.assertWithinBudget(url, 12)
+        form = response.context['form']
+        data = {
+            name: next(
+                pk for pk, _ in field.choices if form.correct_answers[pk]
+            )
+            for name, field in form.fields.items()
+        }
+        self.assertWithinBudget(url, 12, method='post', data=data)
+
+    def test_users_pages(self):
+        """Таблица результатов, личная страница и смена цвета.
+
+        Миниатюры аватаров один раз строятся заранее: их метаданные
+        хранятся в кэше sorl-thumbnail.
+        """
+        for url in reverse('users:users-list'), reverse('users:users-me'):
+            self.authorized_client.get(url)
+        self.assertWithinBudget(reverse('users:users-list'), 4)
+        self.assertWithinBudget(
+            reverse('users:users-list'), 2, client=self.guest_client
+        )
+        self.assertWithinBudget(reverse('users:users-me'), 4)
+        self.assertWithinBudget(
+            reverse('users:user-color', args=(self.color.pk,)), 7
+        )
+
+    def test_admin_changelists(self):
+        """Списки объектов в админке."""
+        budgets = {
+            Theme: 5, Test: 11, Question: 6, Answer: 5,
+            User: 8, Wallet: 5, UserStats: 5, Color: 5,
+        }
+        for model, queries in budgets.items():
+            url = reverse(
+                f'admin:{model._meta.app_label}_'
+                f'{model._meta.model_name}_changelist'
+            )
+            with self.subTest(url=url):
+                self.assertWithinBudget(url, queries)
@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Test, Theme
+from ..search import parse_query, search_test_ids
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    """Тестирует полнотекстовый поиск тестов приложения `core`."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создает экземпляры тем и тестов."""
+        cls.user = User.objects.create_user(username='tester')
+        cls.history = Theme.objects.create(title='История', slug='history')
+        cls.python = Theme.objects.create(title='Программирование',
+                                          slug='python')
+        cls.history_test = Test.objects.create(
+            theme=cls.history,
+            title='Древний Рим',
+            author=cls.user,
+            prize=100,
+            percent_success=50,
+        )
+        cls.python_test = Test.objects.create(
+            theme=cls.python,
+            title='Основы Python',
+            author=cls.user,
+            prize=100,
+            percent_success=50,
+        )
+        cls.mixed_test = Test.objects.create(
+            theme=cls.history,
+            title='История Python',
+            author=cls.user,
+            prize=100,
+            percent_success=50,
+        )
+
+    def setUp(self):
+        """Создание экземпляра клиента."""
+        self.guest_client = Client()
+
+    def test_parse_query(self):
+        """Проверяет разбор запроса на слова без спецсимволов."""
+        self.assertEqual(
+            parse_query('  (Python* OR "рим") python ^ '),
+            ['python', 'or', 'рим'],
+        )
+        self.assertEqual(parse_query('.*+?'), [])
+
+    def test_search_ranks_title_above_theme(self):
+        """Совпадение в названии теста выше совпадения в теме."""
+        self.assertEqual(
+            search_test_ids('истор'),
+            [self.mixed_test.id, self.history_test.id],
+        )
+        self.assertEqual(
+            search_test_ids('python'),
+            [self.mixed_test.id, self.python_test.id],
+        )
+        self.assertEqual(search_test_ids('python рим'), [])
+
+    def test_index_follows_test_and_theme_changes(self):
+        """Проверяет обновление индекса сигналами."""
+        self.python_test.title = 'Основы Go'
+        self.python_test.save()
+        self.assertEqual(search_test_ids('python'), [self.mixed_test.id])
+        self.python.title = 'Языки'
+        self.python.save()
+        self.assertEqual(search_test_ids('язык'), [self.python_test.id])
+        self.mixed_test.delete()
+        self.assertEqual(search_test_ids('python'), [])
+
+    def test_search_page_is_ordered_by_rank(self):
+        """Проверяет выдачу результатов поиска по релевантности."""
+        response = self.guest_client.get(
+            reverse('core:tests-list'), {'search': 'истор'}
+        )
+        self.assertEqual(
+            list(response.context['object_list']),
+            [self.mixed_test, self.history_test],
+        )
+        response = self.guest_client.get(
+            reverse('core:tests-list'), {'search': '(a+)+$'}
+        )
+        self.assertEqual(len(response.context['object_list']), 0)
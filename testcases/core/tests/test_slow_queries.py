@@ -0,0 +1,74 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from spare_kits.slow_queries import (get_fingerprint, log_slow_queries,
+                                     normalize_sql)
+from ..models import Test, Theme
+
+User = get_user_model()
+
+
+class SlowQueriesTests(TestCase):
+    """Тестирует журнал медленных SQL-запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создает пользователя и тему."""
+        cls.user = User.objects.create_user(username='tester')
+        Theme.objects.create(title='История', slug='history')
+
+    def get_entries(self, logs):
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_normalize_sql(self):
+        """Значения параметров не влияют на отпечаток запроса."""
+        self.assertEqual(
+            normalize_sql(
+                "SELECT * FROM t WHERE a = 'x' AND b IN (1, 2,  3)\n"
+                "AND c = %s"
+            ),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) AND c = ?',
+        )
+        self.assertEqual(
+            get_fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+            get_fingerprint('SELECT * FROM t WHERE id IN (%s)'),
+        )
+
+    @override_settings(SLOW_QUERY_THRESHOLD=1e-9)
+    def test_view_queries_are_logged_with_plan(self):
+        """Запросы представления записываются с его именем и планом."""
+        client = Client()
+        client.force_login(self.user)
+        with self.assertLogs('spare_kits.slow_queries', 'WARNING') as logs:
+            client.get(reverse('core:themes-list'))
+        entries = self.get_entries(logs)
+        select = [
+            entry for entry in entries
+            if 'FROM "core_theme"' in entry['sql']
+        ][0]
+        self.assertEqual(select['source'], 'core:themes-list')
+        self.assertEqual(select['database'], connection.alias)
+        self.assertEqual(len(select['fingerprint']), 16)
+        self.assertTrue(select['plan'])
+        self.assertTrue(all(entry['duration'] >= 0 for entry in entries))
+
+    @override_settings(SLOW_QUERY_THRESHOLD=1e-9)
+    def test_writes_are_logged_without_plan(self):
+        """Для запросов на изменение план не снимается."""
+        with self.assertLogs('spare_kits.slow_queries', 'WARNING') as logs:
+            with log_slow_queries('command'):
+                Test.objects.filter(pk=0).update(prize=10)
+        [entry] = self.get_entries(logs)
+        self.assertEqual(entry['source'], 'command')
+        self.assertIsNone(entry['plan'])
+
+    @override_settings(SLOW_QUERY_THRESHOLD=60)
+    def test_fast_queries_are_not_logged(self):
+        """Быстрые запросы не записываются."""
+        with self.assertNoLogs('spare_kits.slow_queries', 'WARNING'):
+            with log_slow_queries('command'):
+                list(Theme.objects.all())
@@ -0,0 +1,148 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..forms import TestingDataForm
+from ..models import Answer, Question, Test, Theme
+from ..snapshots import SnapshotLRU, get_test_snapshot, snapshots_lru
+
+User = get_user_model()
+
+
+class TestSnapshotTests(TestCase):
+    """Тестирует снимки тестов приложения `core`."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создает экземпляры теста, вопроса и ответов."""
+        cls.user = User.objects.create_user(username='tester')
+        cls.theme = Theme.objects.create(
+            title='История',
+            slug='history',
+        )
+        cls.test = Test.objects.create(
+            theme=cls.theme,
+            title='Тестовая история',
+            author=cls.user,
+            prize=100,
+            percent_success=50,
+        )
+        cls.question = Question.objects.create(
+            question_text='Исторический вопрос',
+            test_base=cls.test,
+        )
+        cls.answer = Answer.objects.create(
+            answer_text='Исторический ответ',
+            question=cls.question,
+            correct=True,
+        )
+
+    def setUp(self):
+        """Чистит кэш и LRU снимков."""
+        cache.clear()
+        snapshots_lru.clear()
+
+    def test_snapshot_contains_test_data(self):
+        """Проверяет содержимое снимка теста."""
+        snapshot = get_test_snapshot(self.test.id)
+
+        self.assertEqual(snapshot.title, self.test.title)
+        self.assertEqual(snapshot.prize, self.test.prize)
+        question = snapshot.get_question(self.question.id)
+        self.assertEqual(question.question_text, self.question.question_text)
+        self.assertEqual(question.answers[0].answer_text,
+                         self.answer.answer_text)
+        self.assertEqual(
+            snapshot.get_correct_answers(), {self.answer.id: True}
+        )
+
+    def test_snapshot_is_read_from_memory(self):
+        """Проверяет, что повторное получение снимка не обращается к БД,
+        в том числе после вытеснения из LRU процесса.
+        """
+        get_test_snapshot(self.test.id)
+        with self.assertNumQueries(0):
+            get_test_snapshot(self.test.id)
+        snapshots_lru.clear()
+        with self.assertNumQueries(0):
+            get_test_snapshot(self.test.id)
+
+    def test_snapshot_invalidated_on_change(self):
+        """Проверяет, что изменение ответа меняет версию снимка."""
+        snapshot = get_test_snapshot(self.test.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.answer.answer_text = 'Новый исторический ответ'
+            self.answer.save()
+
+        new_snapshot = get_test_snapshot(self.test.id)
+        self.assertNotEqual(new_snapshot.version, snapshot.version)
+        self.assertEqual(
+            new_snapshot.get_question(self.question.id).answers[0].answer_text,
+            'Новый исторический ответ',
+        )
+
+    def test_moved_question_and_answer_leave_old_snapshot(self):
+        """Проверяет, что перенос вопроса или ответа в другой тест
+        сбрасывает снимок прежнего теста.
+        """
+        other_test = Test.objects.create(
+            theme=self.theme,
+            title='Другая история',
+            author=self.user,
+            prize=10,
+            percent_success=50,
+        )
+        other_question = Question.objects.create(
+            question_text='Другой вопрос',
+            test_base=other_test,
+        )
+        get_test_snapshot(self.test.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.answer.question = other_question
+            self.answer.save()
+        snapshot = get_test_snapshot(self.test.id)
+        self.assertEqual(snapshot.get_question(self.question.id).answers, ())
+        self.assertEqual(snapshot.get_correct_answers(), {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.test_base = other_test
+            self.question.save()
+        self.assertIsNone(
+            get_test_snapshot(self.test.id).get_question(self.question.id)
+        )
+
+    def test_question_without_answers_rejects_any_answer(self):
+        """Проверяет, что для вопроса без ответов в снимке форма
+        не принимает ответ другого вопроса из базы данных.
+        """
+        question = Question.objects.create(
+            question_text='Вопрос без ответов',
+            test_base=self.test,
+        )
+        snapshot = get_test_snapshot(self.test.id)
+        form = TestingDataForm(
+            {'answer': self.answer.id},
+            answers=snapshot.get_question(question.id).answers,
+        )
+        with self.assertNumQueries(0):
+            self.assertFalse(form.is_valid())
+        self.assertEqual(
+            form.errors.as_data()['answer'][0].code, 'invalid_choice'
+        )
+
+    def test_snapshot_of_unexisting_test(self):
+        """Проверяет ошибку при получении снимка несуществующего теста."""
+        with self.assertRaises(Test.DoesNotExist):
+            get_test_snapshot(self.test.id + 100)
+
+    def test_lru_evicts_least_recently_used(self):
+        """Проверяет вытеснение давно не использованных снимков."""
+        lru = SnapshotLRU(maxsize=2)
+        lru.set('first', 1)
+        lru.set('second', 2)
+        lru.get('first')
+        lru.set('third', 3)
+
+        self.assertEqual(lru.get('first'), 1)
+        self.assertIsNone(lru.get('second'))
+        self.assertEqual(lru.get('third'), 3)
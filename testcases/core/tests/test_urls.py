@@ -66,6 +66,12 @@ class CoreUrlsTests(TestCase):
                 }),
                 'template': 'core/test_detail.html',
             },
+            'TESTS_BATCH_PAGE': {
+                'url': reverse('core:tests-batch', kwargs={
+                    'pk': cls.test.id,
+                }),
+                'template': 'core/test_batch.html',
+            },
             'UNEXISTING_PAGE': {
                 'url': '/unexisting_page/',
                 'template': 'errors/404.html',
@@ -95,8 +101,9 @@ class CoreUrlsTests(TestCase):
             for test_user in (self.guest_client, self.authorized_client):
                 with self.subTest(page=page):
                     status = HTTPStatus.OK
-                    if test_user is self.guest_client \
-                        and title == 'TESTS_DETAIL_PAGE':
+                    if test_user is self.guest_client and title in (
+                        'TESTS_DETAIL_PAGE', 'TESTS_BATCH_PAGE',
+                    ):
                         status = HTTPStatus.FOUND
                     elif title == 'UNEXISTING_PAGE':
                         status = HTTPStatus.NOT_FOUND
@@ -105,9 +112,11 @@ class CoreUrlsTests(TestCase):
 
     def test_redirects_urls(self):
         """Проверяет адрес редиректов неавторизованного пользователя."""
-        page = self.PAGES['TESTS_DETAIL_PAGE']['url']
-        response = self.guest_client.get(page)
-        self.assertRedirects(response, f'/users/login/?next={page}')
+        for title in ('TESTS_DETAIL_PAGE', 'TESTS_BATCH_PAGE'):
+            page = self.PAGES[title]['url']
+            with self.subTest(page=page):
+                response = self.guest_client.get(page)
+                self.assertRedirects(response, f'/users/login/?next={page}')
 
     def test_urls_uses_correct_template(self):
         """Проверяет использование верных шаблонов."""
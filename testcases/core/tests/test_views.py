@@ -1,11 +1,19 @@
+from io import StringIO
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.management import call_command
 from django.forms import ModelChoiceField
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from users.models import Color, Wallet
+from spare_kits.pagination import NEXT, encode_cursor
+from users.models import CoinTransaction, Color, UserStats, Wallet
+from ..forms import TestingBatchForm
 from ..models import Answer, Attempt, Question, Test, TestingData, Theme
+from ..search import index_tests
+from ..snapshots import get_test_snapshot
 
 User = get_user_model()
 
@@ -54,6 +62,9 @@ class CoreViewTests(TestCase):
             'TESTS_DETAIL_PAGE': reverse('core:tests-detail', kwargs={
                     'pk': cls.test.id,
                 }),
+            'TESTS_BATCH_PAGE': reverse('core:tests-batch', kwargs={
+                    'pk': cls.test.id,
+                }),
         }
 
     @classmethod
@@ -79,11 +90,11 @@ class CoreViewTests(TestCase):
         response = self.authorized_client.get(
             self.PAGES['THEMES_LIST_PAGE']
         )
-        object = response.context.get('object_list').first()
+        object = response.context.get('object_list')[0]
 
         self.assertEqual(object.title, self.theme.title)
         self.assertEqual(object.slug, self.theme.slug)
-        self.assertEqual(object.tests.count(), self.theme.tests.count())
+        self.assertEqual(object.tests_count, self.theme.tests.count())
 
     def test_themes_detail_page_show_correct_context(self):
         """Проверяет корректность возвращаемого view-функцией контекста
@@ -101,13 +112,11 @@ class CoreViewTests(TestCase):
 
                 if page == 'THEMES_DETAIL_PAGE':
                     self.assertEqual(object.title, self.theme.title)
-                    test = object.tests.all().first()
-                else:
-                    test = object.first()
+                test = response.context.get('object_list')[0]
 
                 self.assertEqual(test.title, self.test.title)
                 self.assertEqual(
-                    test.questions.count(), self.test.questions.count()
+                    test.questions_count, self.test.questions.count()
                 )
                 self.assertEqual(test.prize, self.test.prize)
                 self.assertEqual(
@@ -172,6 +181,12 @@ class CoreViewTests(TestCase):
         self.assertEqual(attempt.result, 100)
         self.assertTrue(attempt.success)
 
+        self.assertTrue(
+            CoinTransaction.objects.filter(
+                owner=self.user, amount=self.test.prize, materialized=False
+            ).exists()
+        )
+        Wallet.materialize()
         user_db = User.objects.get(id=self.user.id)
         self.assertEqual(
             user_db.wallet.total_won, total_coins + self.test.prize
@@ -179,3 +194,357 @@ class CoreViewTests(TestCase):
         self.assertEqual(
             user_db.wallet.current_sum, current_coins + self.test.prize
         )
+
+    def test_testdetail_shuffle_is_stored_in_attempt(self):
+        """Проверяет, что порядок вопросов и ответов перемешивается один раз
+        при создании попытки и сохраняется в `Тестовых данных`.
+        """
+        answer = Answer.objects.create(
+            answer_text='Неверный исторический ответ',
+            question=self.question,
+            correct=False,
+        )
+        first_response = self.authorized_client.get(
+            self.PAGES['TESTS_DETAIL_PAGE']
+        )
+        testing_data = TestingData.objects.get()
+
+        self.assertEqual(testing_data.position, 0)
+        self.assertCountEqual(
+            testing_data.answers_order, [self.answer.id, answer.id]
+        )
+        self.assertEqual(
+            [
+                answer.id for answer in testing_data.sort_answers(
+                    Answer.objects.filter(question=self.question)
+                )
+            ],
+            testing_data.answers_order,
+        )
+
+        second_response = self.authorized_client.get(
+            self.PAGES['TESTS_DETAIL_PAGE']
+        )
+        self.assertEqual(Attempt.objects.count(), 1)
+        self.assertEqual(
+            list(first_response.context['form'].fields['answer'].choices),
+            list(second_response.context['form'].fields['answer'].choices),
+        )
+
+    @override_settings(TESTING_SINGLE_ROUND_TRIP=True)
+    def test_testdetail_single_round_trip_renders_next_step(self):
+        """Проверяет, что в режиме `TESTING_SINGLE_ROUND_TRIP` ответ
+        на POST-запрос сразу содержит следующий шаг теста без редиректа.
+        """
+        self.authorized_client.get(self.PAGES['TESTS_DETAIL_PAGE'])
+        response = self.authorized_client.post(
+            self.PAGES['TESTS_DETAIL_PAGE'],
+            data={'answer': [str(self.answer.id)]},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'core/test_detail.html')
+        attempt = response.context.get('attempt')
+        self.assertEqual(attempt.result, 100)
+        self.assertTrue(attempt.success)
+        self.assertEqual(Attempt.objects.count(), 1)
+
+    def test_testdetail_post_rejects_answer_of_other_question(self):
+        """Проверяет, что ответ на чужой вопрос не принимается."""
+        question = Question.objects.create(
+            question_text='Другой исторический вопрос',
+            test_base=Test.objects.create(
+                theme=self.theme,
+                title='Другая тестовая история',
+                author=self.user,
+                prize=10,
+                percent_success=50,
+            ),
+        )
+        answer = Answer.objects.create(
+            answer_text='Ответ на другой вопрос',
+            question=question,
+            correct=True,
+        )
+        self.authorized_client.get(self.PAGES['TESTS_DETAIL_PAGE'])
+        response = self.authorized_client.post(
+            self.PAGES['TESTS_DETAIL_PAGE'],
+            data={'answer': [str(answer.id)]},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(
+            TestingData.objects.exclude(answer=None).exists()
+        )
+
+    def test_testbatch_submits_all_answers_in_one_post(self):
+        """Проверяет, что на странице прохождения теста целиком выводятся
+        все вопросы, а ответы на них принимаются одним POST-запросом.
+        """
+        question = Question.objects.create(
+            question_text='Второй исторический вопрос',
+            test_base=self.test,
+        )
+        wrong_answer = Answer.objects.create(
+            answer_text='Неверный ответ на второй вопрос',
+            question=question,
+            correct=False,
+        )
+        response = self.authorized_client.get(self.PAGES['TESTS_BATCH_PAGE'])
+        form = response.context.get('form')
+        self.assertEqual(len(form.fields), 2)
+
+        data = {}
+        for testing_data in TestingData.objects.select_related('question'):
+            answer = (
+                self.answer if testing_data.question == self.question
+                else wrong_answer
+            )
+            data[form.get_field_name(testing_data)] = str(answer.id)
+        with self.assertNumQueries(8):
+            response = self.authorized_client.post(
+                self.PAGES['TESTS_BATCH_PAGE'], data=data
+            )
+        self.assertRedirects(
+            response, self.PAGES['TESTS_BATCH_PAGE'],
+            fetch_redirect_response=False,
+        )
+        self.assertFalse(TestingData.objects.filter(answer=None).exists())
+
+        response = self.authorized_client.get(self.PAGES['TESTS_BATCH_PAGE'])
+        attempt = response.context.get('attempt')
+        self.assertEqual(attempt.result, 50)
+        self.assertTrue(attempt.success)
+
+    def test_testbatch_repeated_post_is_graded_once(self):
+        """Проверяет, что повторная отправка ответов не создает новую
+        попытку и не увеличивает счетчики ответов.
+        """
+        response = self.authorized_client.get(self.PAGES['TESTS_BATCH_PAGE'])
+        form = response.context.get('form')
+        data = {
+            form.get_field_name(testing_data): str(self.answer.id)
+            for testing_data in TestingData.objects.all()
+        }
+        for _ in range(2):
+            self.authorized_client.post(
+                self.PAGES['TESTS_BATCH_PAGE'], data=data
+            )
+
+        attempt = Attempt.objects.get()
+        self.assertEqual(attempt.answered_count, 1)
+        self.assertEqual(attempt.correct_count, 1)
+        self.assertEqual(attempt.result, 100)
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).tests_attempts, 1
+        )
+
+    def test_rebuild_counters_command(self):
+        """Проверяет пересчет счетчиков после загрузки без сигналов."""
+        Theme.objects.update(tests_count=0)
+        Test.objects.update(questions_count=0)
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(
+            Theme.objects.get(pk=self.theme.pk).tests_count, 1
+        )
+        self.assertEqual(Test.objects.get(pk=self.test.pk).questions_count, 1)
+
+    def test_attempt_without_counters_is_not_graded(self):
+        """Проверяет, что незавершенная попытка без счетчиков (например,
+        из фикстуры) не оценивается, а продолжается.
+        """
+        attempt = Attempt.objects.create(subject=self.user, testcase=self.test)
+        TestingData.objects.create(attempt=attempt, question=self.question)
+        response = self.authorized_client.get(self.PAGES['TESTS_DETAIL_PAGE'])
+        self.assertIn('form', response.context)
+        attempt.refresh_from_db()
+        self.assertIsNone(attempt.result)
+        self.assertEqual(
+            (attempt.questions_count, attempt.answered_count), (1, 0)
+        )
+
+    def test_testbatch_form_counts_unanswered_only(self):
+        """Проверяет, что форма не учитывает уже отвеченные вопросы."""
+        self.authorized_client.get(self.PAGES['TESTS_BATCH_PAGE'])
+        attempt = Attempt.objects.get()
+        testing_data = list(attempt.testing_data.all())
+        for _ in range(2):
+            form = TestingBatchForm(
+                {
+                    TestingBatchForm.get_field_name(obj): str(self.answer.id)
+                    for obj in testing_data
+                },
+                testing_data=testing_data,
+                test=get_test_snapshot(self.test.pk),
+            )
+            self.assertTrue(form.is_valid())
+            form.save()
+
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.answered_count, 1)
+        self.assertEqual(attempt.correct_count, 1)
+
+    def test_testbatch_requires_every_answer(self):
+        """Проверяет, что без ответов на все вопросы тест не оценивается."""
+        self.authorized_client.get(self.PAGES['TESTS_BATCH_PAGE'])
+        response = self.authorized_client.post(
+            self.PAGES['TESTS_BATCH_PAGE'], data={}
+        )
+
+        self.assertTrue(response.context.get('form').errors)
+        self.assertIsNone(Attempt.objects.get().result)
+
+    def test_testdetail_counts_answers_in_attempt(self):
+        """Проверяет, что счетчики попытки обновляются при каждом ответе
+        и используются для отображения прогресса и итогового результата.
+        """
+        question = Question.objects.create(
+            question_text='Второй исторический вопрос',
+            test_base=self.test,
+        )
+        Answer.objects.create(
+            answer_text='Неверный ответ на второй вопрос',
+            question=question,
+            correct=False,
+        )
+        response = self.authorized_client.get(
+            self.PAGES['TESTS_DETAIL_PAGE']
+        )
+        progress = response.context.get('progress')
+        self.assertEqual(progress.questions_count, 2)
+        self.assertEqual(progress.answered_count, 0)
+
+        for _ in range(2):
+            testing_data = TestingData.objects.filter(answer=None).first()
+            answer = testing_data.question.answers.first()
+            self.authorized_client.post(
+                self.PAGES['TESTS_DETAIL_PAGE'],
+                data={'answer': [str(answer.id)]},
+            )
+
+        attempt = Attempt.objects.get()
+        self.assertEqual(attempt.answered_count, 2)
+        self.assertEqual(attempt.correct_count, 1)
+        self.assertIsNone(attempt.result)
+
+        response = self.authorized_client.get(
+            self.PAGES['TESTS_DETAIL_PAGE']
+        )
+        attempt = response.context.get('attempt')
+        self.assertEqual(attempt.result, 50)
+        self.assertTrue(attempt.success)
+
+    def test_testdetail_updates_user_stats(self):
+        """Проверяет, что статистика пользователя для таблицы результатов
+        обновляется при завершении каждой попытки.
+        """
+        for _ in range(2):
+            self.authorized_client.post(
+                self.PAGES['TESTS_DETAIL_PAGE'],
+                data={'answer': [str(self.answer.id)]},
+                follow=True,
+            )
+
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual(stats.tests_attempts, 2)
+        self.assertEqual(stats.tests_count, 1)
+        self.assertEqual(stats.tests_success, 1)
+        self.assertEqual(stats.total_won, self.test.prize)
+
+    def test_listing_counters_follow_changes(self):
+        """Проверяет пересчет количества тестов темы и вопросов теста,
+        а также то, что списки не загружают вопросы и тесты.
+        """
+        other_theme = Theme.objects.create(title='География', slug='geo')
+        test = Test.objects.create(
+            theme=other_theme,
+            title='Тестовая география',
+            author=self.user,
+            prize=10,
+            percent_success=50,
+        )
+        question = Question.objects.create(
+            question_text='Географический вопрос',
+            test_base=test,
+        )
+        test.refresh_from_db()
+        other_theme.refresh_from_db()
+        self.assertEqual(test.questions_count, 1)
+        self.assertEqual(other_theme.tests_count, 1)
+
+        question.test_base = self.test
+        question.save()
+        test.refresh_from_db()
+        self.assertEqual(test.questions_count, 0)
+        self.assertEqual(
+            Test.objects.get(pk=self.test.pk).questions_count,
+            self.test.questions.count(),
+        )
+        question.test_base = test
+        question.save()
+
+        test.theme = self.theme
+        test.save()
+        question.delete()
+        test.refresh_from_db()
+        other_theme.refresh_from_db()
+        self.assertEqual(test.questions_count, 0)
+        self.assertEqual(other_theme.tests_count, 0)
+        self.assertEqual(Theme.objects.get(pk=self.theme.pk).tests_count, 2)
+
+        for page, queries in (
+            ('THEMES_LIST_PAGE', 3), ('THEMES_DETAIL_PAGE', 4),
+        ):
+            with self.subTest(page=page), self.assertNumQueries(queries):
+                self.authorized_client.get(self.PAGES[page])
+
+    def test_listings_are_paginated_and_load_more(self):
+        """Проверяет постраничный вывод тестов и подгрузку следующей
+        порции карточек в JSON с сохранением поискового запроса.
+        """
+        Test.objects.bulk_create(
+            Test(
+                theme=self.theme,
+                title=f'История {index}',
+                author=self.user,
+                prize=10,
+                percent_success=50,
+            ) for index in range(settings.LISTING_PAGE_SIZE)
+        )
+        index_tests()
+        for page in 'THEMES_DETAIL_PAGE', 'TESTS_LIST_PAGE':
+            with self.subTest(page=page):
+                response = self.authorized_client.get(
+                    self.PAGES[page], {'search': 'история'}
+                )
+                page_obj = response.context['page_obj']
+                self.assertEqual(len(page_obj), settings.LISTING_PAGE_SIZE)
+                self.assertEqual(
+                    response.context['cursor_query'], 'search=%D0%B8%D1%81'
+                    '%D1%82%D0%BE%D1%80%D0%B8%D1%8F&'
+                )
+                data = self.authorized_client.get(self.PAGES[page], {
+                    'search': 'история',
+                    'cursor': page_obj.next_cursor,
+                    'format': 'json',
+                }).json()
+                self.assertEqual(data['html'].count('class="col"'), 1)
+                self.assertFalse(data['has_next'])
+                self.assertIsNone(data['next_cursor'])
+
+    def test_listings_ignore_tampered_cursor(self):
+        """Проверяет, что курсор с неподходящими значениями открывает
+        первую страницу, а не приводит к ошибке сервера.
+        """
+        cursors = (
+            ('TESTS_LIST_PAGE', {}, ['notadate', 5]),
+            ('TESTS_LIST_PAGE', {'search': 'a'}, ['x', 'y']),
+            ('THEMES_LIST_PAGE', {}, [['x'], 'y']),
+        )
+        for page, query, values in cursors:
+            with self.subTest(page=page, values=values):
+                response = self.authorized_client.get(self.PAGES[page], {
+                    **query, 'cursor': encode_cursor(values, NEXT, 2)
+                })
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['page_obj'].number, 1)
@@ -2,26 +2,41 @@ from django.contrib.auth.decorators import login_required
 from django.urls import path
 from django.views.generic import TemplateView
 
+from spare_kits.page_cache import (CATALOG_PAGES, cache_anonymous_page,
+                                   versioned_page)
 from . import views
 
 app_name = 'core'
 
 urlpatterns = [
     path(
-        '', TemplateView.as_view(template_name='core/index.html'), name='index'
+        '',
+        cache_anonymous_page()(
+            TemplateView.as_view(template_name='core/index.html')
+        ),
+        name='index'
     ),
     path(
-        'themes/', views.ThemeListView.as_view(), name='themes-list'
+        'themes/',
+        versioned_page(CATALOG_PAGES)(views.ThemeListView.as_view()),
+        name='themes-list'
     ),
     path(
-        'themes/<slug:slug>/', views.ThemeDetailView.as_view(),
+        'themes/<slug:slug>/',
+        versioned_page(CATALOG_PAGES)(views.ThemeDetailView.as_view()),
         name='themes-detail'
     ),
     path(
-        'tests/', views.TestListView.as_view(), name='tests-list'
+        'tests/',
+        versioned_page(CATALOG_PAGES)(views.TestListView.as_view()),
+        name='tests-list'
     ),
     path(
         'tests/<int:pk>/', login_required(views.TestDetailView.as_view()),
         name='tests-detail'
     ),
+    path(
+        'tests/<int:pk>/all/', login_required(views.TestBatchView.as_view()),
+        name='tests-batch'
+    ),
 ]
@@ -1,19 +1,27 @@
-from django.db.models import Count, F, Q
-from django.http import HttpResponseRedirect
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, Q, When
+from django.http import Http404, HttpResponseRedirect
 from django.urls import reverse
 from django.views.generic import DetailView, FormView, ListView
 
-from users.models import Wallet
-from .forms import TestingDataForm
-from .models import Attempt, Test, TestingData, Theme
+from spare_kits.pagination import LoadMoreMixin
+from users.models import CoinTransaction, UserStats
+from .forms import TestingBatchForm, TestingDataForm
+from .engines import get_attempt_engine
+from .models import Attempt, Test, Theme
+from .search import search_test_ids
+from .snapshots import get_test_snapshot, invalidate_test_snapshot
 
 
-class ThemeListView(ListView):
+class ThemeListView(LoadMoreMixin, ListView):
     """Представление списка тем тестов."""
 
-    queryset = Theme.objects.prefetch_related('tests')
+    queryset = Theme.objects.all()
     template_name = 'core/themes_list.html'
+    cards_template_name = 'includes/theme_cards.html'
+    paginate_by = settings.LISTING_PAGE_SIZE
+    keyset_ordering = ('title', 'id')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -21,40 +29,56 @@ class ThemeListView(ListView):
         return context
 
 
-class ThemeDetailView(DetailView):
+class ThemeDetailView(LoadMoreMixin, DetailView):
     """Представление списка тестов конкретной темы."""
 
-    queryset = Theme.objects.prefetch_related(
-        'tests', 'tests__questions'
-    )
+    queryset = Theme.objects.all()
     template_name = 'core/test_list.html'
+    cards_template_name = 'includes/test_cards.html'
+    paginate_by = settings.LISTING_PAGE_SIZE
+    keyset_ordering = ('-date_creation', '-id')
 
     def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+        paginator, page, object_list, is_paginated = self.paginate_queryset(
+            self.object.tests.all(), self.paginate_by
+        )
+        context = super().get_context_data(
+            paginator=paginator,
+            page_obj=page,
+            is_paginated=is_paginated,
+            object_list=object_list,
+            **kwargs,
+        )
         context['text'] = 'Тесты соответствующей тематики'
         return context
 
 
-class TestListView(ListView):
+class TestListView(LoadMoreMixin, ListView):
     """
     Представление общего списка тестов.
 
-    Используется при выдаче результатов теста по поисковому запросу.
+    Используется при выдаче результатов теста по поисковому запросу:
+    тесты упорядочиваются по релевантности из полнотекстового индекса.
     """
 
-    queryset = Test.objects.select_related(
-        'theme'
-    ).prefetch_related('questions')
+    queryset = Test.objects.all()
     template_name = 'core/test_list.html'
+    cards_template_name = 'includes/test_cards.html'
+    paginate_by = settings.LISTING_PAGE_SIZE
+    keyset_ordering = ('-date_creation', '-id')
 
     def get_queryset(self):
         search_query = self.request.GET.get('search')
         if not search_query:
             return self.queryset.all()
-        return self.queryset.filter(
-            Q(title__iregex=search_query)
-            | Q(theme__title__iregex=search_query)
-        )
+        test_ids = search_test_ids(search_query)
+        if not test_ids:
+            return self.queryset.none()
+        self.keyset_ordering = ('rank', 'id')
+        return self.queryset.filter(pk__in=test_ids).annotate(rank=Case(
+            *[When(pk=pk, then=position)
+              for position, pk in enumerate(test_ids)]
+        ))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -76,100 +100,139 @@ class TestDetailView(ListView, FormView):
     def post(self, request, *args, **kwargs):
         self.get_testing_data()
         self.object_list = self.get_queryset()
+        if not self.testing_data:
+            return HttpResponseRedirect(self.get_success_url())
 
         form = self.form_class(
             self.request.POST or None,
             instance=self.testing_data,
+            answers=self.get_answers(),
         )
         if form.is_valid():
-            form.save()
-
             return self.form_valid(form)
         return self.form_invalid(form)
 
     def form_valid(self, form):
-        form.save()
-        return HttpResponseRedirect(self.get_success_url())
+        """
+        Сохраняет ответ пользователя.
+
+        В режиме `TESTING_SINGLE_ROUND_TRIP` вместо редиректа сразу отдает
+        следующий вопрос (или результаты), используя уже загруженные
+        тест и попытку.
+        """
+        self.engine.save_answers(form)
+        if not settings.TESTING_SINGLE_ROUND_TRIP:
+            return HttpResponseRedirect(self.get_success_url())
+        self.object_list = self.get_queryset()
+        return self.render_to_response(self.get_context_data())
 
     def get_context_data(self, **kwargs):
-        context = super(ListView, self).get_context_data(**kwargs)
-        context['test'] = self.test
+        # Форма по умолчанию из FormMixin не нужна: без вариантов
+        # из снимка теста она загружала бы ответы из базы данных
+        kwargs['form'] = None
         if self.testing_data:
-            context['form'] = self.form_class(
+            kwargs['form'] = self.form_class(
                 self.request.GET or None,
                 initial={
                     'question': 0,
                     'attempt': 0,
                 },
                 instance=self.testing_data,
-                field_queryset=context['question'].answers
+                answers=self.get_answers(),
             )
+        context = super(ListView, self).get_context_data(**kwargs)
+        context['test'] = self.test
+        if self.testing_data:
+            context['progress'] = self.attempt
             return context
         context['attempt'] = self.attempt
         context['re_passing_test'] = self.re_passing_test
         return context
 
     def get_queryset(self):
-        self.testing_data = self.attempt.testing_data.select_related(
-            'question'
-        ).filter(
-            answer=None
-        ).first()
+        self.testing_data = None
+        if self.attempt.is_completed:
+            return self.create_testing_result()
+        self.testing_data = self.engine.get_current()
         if not self.testing_data:
             return self.create_testing_result()
-        return self.testing_data.question
+        question = self.test.get_question(self.testing_data.question_id)
+        if question is None:
+            self.refresh_test()
+            question = self.test.get_question(self.testing_data.question_id)
+        if question is None:
+            # Вопрос удален после начала попытки
+            self.engine.drop_questions({self.testing_data.question_id})
+            return self.get_queryset()
+        return question
+
+    def get_answers(self):
+        """
+        Возвращает варианты ответа на текущий вопрос из снимка теста
+        в порядке, сохраненном в попытке.
+        """
+        return self.testing_data.sort_answers(self.object_list.answers)
+
+    def get_test(self):
+        try:
+            return get_test_snapshot(self.kwargs['pk'])
+        except Test.DoesNotExist:
+            raise Http404('Тест не найден.')
+
+    def refresh_test(self):
+        """Пересобирает устаревший снимок теста."""
+        invalidate_test_snapshot(self.test.pk)
+        self.test = self.engine.test = self.get_test()
 
     def get_testing_data(self):
-        self.test = get_object_or_404(
-            Test.objects.prefetch_related('questions'),
-            pk=self.kwargs['pk'],
-        )
-        self.attempt, created = Attempt.objects.filter(
-            result=None
-        ).get_or_create(
-            subject=self.request.user,
-            testcase=self.test,
-        )
-        if created:
-            TestingData.objects.bulk_create([
-                TestingData(
-                    attempt=self.attempt, question=obj
-                ) for obj in self.test.questions.all()
-            ])
+        self.test = self.get_test()
+        self.engine = get_attempt_engine(self.request.user, self.test)
+        self.attempt = self.engine.get_attempt()
 
     def create_testing_result(self):
-        self.results = TestingData.objects.filter(
-            attempt=self.attempt
-        ).aggregate(
-            count_corr_answers=Count('answer', filter=Q(answer__correct=True)),
-            count_questions=Count('question'),
-        )
-        self.results['percent_corr_answers'] = (
-            self.results['count_corr_answers']
-            / self.results['count_questions']
-            if self.results['count_questions'] else 0
-        ) * 100
+        self.results = {
+            'count_corr_answers': self.attempt.correct_count,
+            'count_questions': self.attempt.questions_count,
+            'percent_corr_answers': self.attempt.percent_correct,
+        }
         return self.added_attempts_data()
 
+    @transaction.atomic(savepoint=False)
     def added_attempts_data(self):
-        self.re_passing_test = Attempt.objects.filter(
+        history = Attempt.objects.filter(
             subject=self.request.user,
-            testcase=self.test,
-            success=True,
-        ).exists()
+            testcase_id=self.test.pk,
+            result__isnull=False,
+        ).aggregate(
+            completed=Count('pk'),
+            passed=Count('pk', filter=Q(success=True)),
+        )
+        self.re_passing_test = bool(history['passed'])
         self.attempt.result = self.results['percent_corr_answers']
         self.attempt.success = (
             True if self.test.percent_success <= self.attempt.result else False
         )
-        self.attempt.save()
-        if not self.re_passing_test and self.attempt.success:
-            return self.get_coins_in_wallet()
+        self.engine.finish()
+        new_success = not self.re_passing_test and self.attempt.success
+        if new_success:
+            self.get_coins_in_wallet()
+        UserStats.count_attempt(
+            self.request.user,
+            new_test=not history['completed'],
+            new_success=new_success,
+            prize=self.test.prize if new_success else 0,
+        )
         return self.attempt
 
     def get_coins_in_wallet(self):
-        Wallet.objects.filter(owner=self.request.user).update(
-            current_sum=F('current_sum') + self.test.prize,
-            total_won=F('total_won') + self.test.prize,
+        """
+        Начисляет награду записью в журнал монет; в кошелек она
+        переносится пакетно (см. `Wallet.materialize`).
+        """
+        CoinTransaction.objects.create(
+            owner=self.request.user,
+            amount=self.test.prize,
+            kind=CoinTransaction.PRIZE,
         )
         return self.attempt
 
@@ -177,3 +240,81 @@ class TestDetailView(ListView, FormView):
         return reverse(
             'core:tests-detail', kwargs={'pk': self.kwargs['pk']}
         )
+
+
+class TestBatchView(TestDetailView):
+    """
+    Представление для прохождения теста целиком на одной странице.
+
+    Все ответы принимаются одним POST-запросом, проверяются по набору
+    ответов из снимка теста и оцениваются в одной транзакции.
+    """
+
+    template_name = 'core/test_batch.html'
+    context_object_name = 'questions'
+    form_class = TestingBatchForm
+
+    def get(self, request, *args, **kwargs):
+        self.get_testing_data()
+        self.object_list = self.get_queryset()
+        return self.render_to_response(self.get_context_data())
+
+    def post(self, request, *args, **kwargs):
+        self.get_testing_data()
+        self.object_list = self.get_queryset()
+        if not self.testing_data:
+            return HttpResponseRedirect(self.get_success_url())
+
+        form = self.get_form()
+        if form.is_valid():
+            return self.form_valid(form)
+        return self.form_invalid(form)
+
+    def form_valid(self, form):
+        """
+        Сохраняет ответы и перенаправляет на страницу результатов, чтобы
+        повторная отправка формы не начинала новую попытку.
+        """
+        self.engine.save_answers(form)
+        return HttpResponseRedirect(self.get_success_url())
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['testing_data'] = self.testing_data
+        kwargs['test'] = self.test
+        return kwargs
+
+    def get_context_data(self, **kwargs):
+        context = super(ListView, self).get_context_data(**kwargs)
+        context['test'] = self.test
+        if not self.testing_data:
+            context['attempt'] = self.attempt
+            context['re_passing_test'] = self.re_passing_test
+        return context
+
+    def get_queryset(self):
+        self.testing_data = []
+        if self.attempt.is_completed:
+            return self.create_testing_result()
+        self.testing_data = self.engine.get_pending()
+        if not self.testing_data:
+            return self.create_testing_result()
+        if self.get_missing_questions():
+            self.refresh_test()
+            missing = self.get_missing_questions()
+            if missing:
+                # Вопросы удалены после начала попытки
+                self.engine.drop_questions(missing)
+                return self.get_queryset()
+        return self.testing_data
+
+    def get_missing_questions(self):
+        return {
+            obj.question_id for obj in self.testing_data
+            if self.test.get_question(obj.question_id) is None
+        }
+
+    def get_success_url(self):
+        return reverse(
+            'core:tests-batch', kwargs={'pk': self.kwargs['pk']}
+        )
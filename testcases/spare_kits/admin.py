@@ -0,0 +1,110 @@
+from django.contrib.admin.widgets import AutocompleteSelect
+
+
+def load_labels(field, values, queryset=None):
+    """
+    Возвращает подписи объектов, на которые ссылается внешний ключ
+    `field`, по значениям `values` одним запросом.
+    """
+    if queryset is None:
+        queryset = field.remote_field.model._default_manager.all()
+    target = field.target_field.attname
+    return {
+        str(getattr(obj, target)): str(obj)
+        for obj in queryset.filter(**{f'{target}__in': values})
+    }
+
+
+class CachedAutocompleteSelect(AutocompleteSelect):
+    """
+    Поле автодополнения, выводящее только выбранный вариант.
+
+    Подписи вариантов берутся из словаря `labels`, общего для всех строк
+    списка объектов, а не запрашиваются для каждой строки. Подписи
+    недостающих значений догружаются из `queryset`.
+    """
+
+    def __init__(self, *args, labels, queryset, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.labels = labels
+        self.queryset = queryset
+
+    def optgroups(self, name, value, attr=None):
+        missing = [
+            option_value for option_value in value
+            if option_value and str(option_value) not in self.labels
+        ]
+        if missing:
+            self.labels.update(load_labels(self.field, missing, self.queryset))
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        for option_value in value:
+            label = self.labels.get(str(option_value))
+            if label is not None:
+                options.append(self.create_option(
+                    name, option_value, label, True, len(options)
+                ))
+        return [(None, options, 0)]
+
+
+class CachedChoicesMixin:
+    """
+    Строит варианты выбора внешних ключей один раз на запрос.
+
+    Без этого `list_editable` выполняет запрос вариантов для каждой
+    строки списка объектов. Для полей из `autocomplete_fields` варианты
+    целиком не загружаются: подписи берутся только для значений
+    на текущей странице списка.
+    """
+
+    def get_choices_cache(self, request):
+        return request.__dict__.setdefault('_admin_choices', {})
+
+    def get_changelist_instance(self, request):
+        """
+        Собирает подписи значений полей автодополнения со строк страницы:
+        из уже загруженных связанных объектов или одним запросом на поле.
+        """
+        changelist = super().get_changelist_instance(request)
+        choices_cache = self.get_choices_cache(request)
+        for name in self.get_autocomplete_fields(request):
+            if name not in self.list_editable:
+                continue
+            field = self.model._meta.get_field(name)
+            labels = choices_cache.setdefault((self.model, name), {})
+            missing = set()
+            for obj in changelist.result_list:
+                value = getattr(obj, field.attname)
+                if value is None:
+                    continue
+                if field.is_cached(obj):
+                    labels[str(value)] = str(field.get_cached_value(obj))
+                else:
+                    missing.add(value)
+            if missing:
+                labels.update(load_labels(field, missing))
+        return changelist
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        if formfield is None:
+            return formfield
+        choices_cache = self.get_choices_cache(request)
+        key = (self.model, db_field.name)
+        if db_field.name in self.get_autocomplete_fields(request):
+            formfield.widget = CachedAutocompleteSelect(
+                db_field,
+                self.admin_site,
+                using=kwargs.get('using'),
+                labels=choices_cache.setdefault(key, {}),
+                queryset=formfield.queryset,
+            )
+            formfield.widget.is_required = formfield.required
+            return formfield
+        if key not in choices_cache:
+            choices_cache[key] = list(formfield.choices)
+        formfield.choices = choices_cache[key]
+        return formfield
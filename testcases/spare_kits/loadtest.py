@@ -0,0 +1,270 @@
+"""
+Нагрузочный тест сквозного сценария прохождения тестов.
+
+Виртуальные пользователи ходят по настоящим URL запущенного сервера
+(например, gunicorn): регистрируются, входят, открывают темы, проходят
+тесты, смотрят результаты и покупают цвет. Каждый запрос замеряется,
+а количество SQL-запросов берется из заголовка `X-DB-Queries`
+(см. `spare_kits.middleware.QueryCountMiddleware`).
+
+Выбор темы, теста и ответов определяется зерном, поэтому прогоны
+с одинаковыми параметрами на одинаковых данных сравнимы между собой.
+"""
+import http.client
+import math
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urljoin, urlsplit
+
+from django.urls import reverse
+
+from .middleware import QUERY_COUNT_HEADER
+
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+THEME_RE = re.compile(r'href="(/themes/[\w-]+/)"')
+TEST_RE = re.compile(r'href="(/tests/\d+/)"')
+ANSWER_RE = re.compile(r'name="answer" value="(\d+)"')
+COLOR_RE = re.compile(r'action="(/users/me/color/\d+/)"')
+# Ограничение числа ответов в одном тесте на случай зацикливания
+MAX_QUESTIONS = 1000
+
+
+class LoadTestError(Exception):
+    """Сценарий виртуального пользователя не может продолжаться."""
+
+
+def percentile(values, percent):
+    """Возвращает перцентиль отсортированного списка (nearest-rank)."""
+    if not values:
+        return 0
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
+class Recorder:
+    """Потокобезопасный журнал замеров запросов."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def add(self, endpoint, status, elapsed, queries):
+        with self.lock:
+            self.samples.append((endpoint, status, elapsed, queries))
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def report(self):
+        """
+        Возвращает статистику по эндпоинтам: число запросов и ошибок,
+        пропускную способность, перцентили задержки (в мс) и среднее
+        количество SQL-запросов.
+        """
+        duration = (self.finished or time.perf_counter()) - self.started
+        endpoints = {}
+        for endpoint, status, elapsed, queries in self.samples:
+            endpoints.setdefault(endpoint, []).append(
+                (status, elapsed, queries)
+            )
+        report = []
+        for endpoint, samples in sorted(endpoints.items()):
+            latencies = sorted(elapsed * 1000 for _, elapsed, _ in samples)
+            queries = [queries for _, _, queries in samples
+                       if queries is not None]
+            report.append({
+                'endpoint': endpoint,
+                'requests': len(samples),
+                'errors': sum(
+                    1 for status, _, _ in samples if not 0 < status < 400
+                ),
+                'rps': round(len(samples) / duration, 2) if duration else 0,
+                'p50': round(percentile(latencies, 50), 1),
+                'p95': round(percentile(latencies, 95), 1),
+                'p99': round(percentile(latencies, 99), 1),
+                'queries': (
+                    round(sum(queries) / len(queries), 1) if queries
+                    else None
+                ),
+            })
+        return report
+
+
+class VirtualUser:
+    """
+    Виртуальный пользователь с собственным соединением и cookies.
+
+    Редиректы не выполняются автоматически: сценарий переходит по ним
+    сам, чтобы каждый запрос замерялся отдельно.
+    """
+
+    def __init__(self, base_url, username, password, recorder, seed=0,
+                 tests=1, timeout=30):
+        url = urlsplit(base_url)
+        connection_class = (
+            http.client.HTTPSConnection if url.scheme == 'https'
+            else http.client.HTTPConnection
+        )
+        self.connection = connection_class(url.netloc, timeout=timeout)
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.recorder = recorder
+        self.random = random.Random(seed)
+        self.tests = tests
+        self.cookies = {}
+
+    def request(self, endpoint, method, path, data=None):
+        """Выполняет запрос и возвращает статус, заголовки и тело ответа."""
+        headers = {'Referer': urljoin(self.base_url, path)}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(
+                f'{name}={value}' for name, value in self.cookies.items()
+            )
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        start = time.perf_counter()
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+            content = response.read().decode()
+        except (OSError, http.client.HTTPException) as error:
+            self.connection.close()
+            self.recorder.add(
+                f'{method} {endpoint}', 0, time.perf_counter() - start, None
+            )
+            raise LoadTestError(f'{method} {path}: {error}') from error
+        queries = response.getheader(QUERY_COUNT_HEADER)
+        self.recorder.add(
+            f'{method} {endpoint}',
+            response.status,
+            time.perf_counter() - start,
+            int(queries) if queries is not None else None,
+        )
+        for header in response.headers.get_all('Set-Cookie', ()):
+            for name, morsel in SimpleCookie(header).items():
+                if morsel.value:
+                    self.cookies[name] = morsel.value
+                else:
+                    self.cookies.pop(name, None)
+        if response.status >= 400:
+            raise LoadTestError(f'{method} {path}: {response.status}')
+        return response.status, response, content
+
+    def get(self, endpoint, path):
+        return self.request(endpoint, 'GET', path)[2]
+
+    def post(self, endpoint, path, page, data):
+        """
+        Отправляет форму со страницы `page` и переходит по редиректу.
+
+        Возвращает тело итоговой страницы.
+        """
+        token = CSRF_RE.search(page)
+        if token is None:
+            raise LoadTestError(f'{path}: нет CSRF-токена')
+        status, response, content = self.request(
+            endpoint, 'POST', path,
+            {'csrfmiddlewaretoken': token.group(1), **data},
+        )
+        if status in (301, 302, 303):
+            location = urlsplit(response.getheader('Location'))
+            path = location.path + (
+                f'?{location.query}' if location.query else ''
+            )
+            return self.get(f'{endpoint} redirect', path)
+        return content
+
+    def choose(self, pattern, page, what):
+        paths = sorted(set(pattern.findall(page)))
+        if not paths:
+            raise LoadTestError(f'Не найдено: {what}')
+        return self.random.choice(paths)
+
+    def sign_up(self):
+        path = reverse('users:signup')
+        self.post('signup', path, self.get('signup', path), {
+            'username': self.username,
+            'first_name': 'Нагрузка',
+            'last_name': self.username,
+            'email': f'{self.username}@example.com',
+            'password1': self.password,
+            'password2': self.password,
+        })
+        path = reverse('users:login')
+        self.post('login', path, self.get('login', path), {
+            'username': self.username,
+            'password': self.password,
+        })
+
+    def pass_test(self, path):
+        page = self.get('tests-detail', path)
+        for _ in range(MAX_QUESTIONS):
+            answers = ANSWER_RE.findall(page)
+            if not answers:
+                return
+            page = self.post(
+                'tests-detail', path, page,
+                {'answer': self.random.choice(answers)},
+            )
+        raise LoadTestError(f'{path}: слишком много вопросов')
+
+    def buy_color(self):
+        page = self.get('users-me', reverse('users:users-me'))
+        color = COLOR_RE.search(page)
+        if color is not None:
+            self.post('user-color', color.group(1), page, {})
+
+    def run(self):
+        """Проходит сценарий; возвращает текст ошибки или None."""
+        try:
+            self.sign_up()
+            for _ in range(self.tests):
+                themes = self.get('themes-list', reverse('core:themes-list'))
+                theme = self.get(
+                    'themes-detail', self.choose(THEME_RE, themes, 'тема')
+                )
+                self.pass_test(self.choose(TEST_RE, theme, 'тест'))
+            self.get('users-list', reverse('users:users-list'))
+            self.buy_color()
+        except LoadTestError as error:
+            return f'{self.username}: {error}'
+        finally:
+            self.connection.close()
+        return None
+
+
+def run_load_test(base_url, users=10, concurrency=5, tests=1, seed=0,
+                  prefix=None, password='Load-test-password-1'):
+    """
+    Прогоняет сценарий `users` виртуальными пользователями,
+    из которых одновременно работают `concurrency`.
+
+    Возвращает журнал замеров и список ошибок сценариев.
+    """
+    prefix = prefix or f'lt{int(time.time())}'
+    recorder = Recorder()
+    virtual_users = [
+        VirtualUser(
+            base_url, f'{prefix}-{index}', password, recorder,
+            seed=seed + index, tests=tests,
+        )
+        for index in range(users)
+    ]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        errors = [
+            error for error in executor.map(
+                lambda user: user.run(), virtual_users
+            )
+            if error
+        ]
+    recorder.stop()
+    return recorder, errors
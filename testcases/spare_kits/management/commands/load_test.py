@@ -0,0 +1,86 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from spare_kits.loadtest import run_load_test
+
+COLUMNS = (
+    ('endpoint', 'Эндпоинт', 36),
+    ('requests', 'Запросов', 9),
+    ('errors', 'Ошибок', 7),
+    ('rps', 'RPS', 8),
+    ('p50', 'p50, мс', 9),
+    ('p95', 'p95, мс', 9),
+    ('p99', 'p99, мс', 9),
+    ('queries', 'SQL', 6),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест запущенного сервера: виртуальные пользователи '
+        'регистрируются, проходят тесты, смотрят результаты и покупают '
+        'цвет. Для подсчета SQL-запросов сервер запускается с '
+        'QUERY_COUNT_HEADER=True.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='Адрес сервера (по умолчанию '
+                                 'http://127.0.0.1:8000).')
+        parser.add_argument('--users', type=int, default=10,
+                            help='Количество виртуальных пользователей (по '
+                                 'умолчанию 10).')
+        parser.add_argument('--concurrency', type=int, default=5,
+                            help='Одновременно работающих пользователей '
+                                 '(по умолчанию 5).')
+        parser.add_argument('--tests', type=int, default=1,
+                            help='Тестов, проходимых каждым пользователем '
+                                 '(по умолчанию 1).')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Зерно выбора тем, тестов и ответов.')
+        parser.add_argument('--prefix',
+                            help='Префикс имен создаваемых пользователей '
+                                 '(по умолчанию зависит от времени).')
+        parser.add_argument('--output',
+                            help='Файл для сохранения отчета в JSON, чтобы '
+                                 'сравнивать прогоны между релизами.')
+
+    def handle(self, *args, **options):
+        recorder, errors = run_load_test(
+            options['url'],
+            users=options['users'],
+            concurrency=options['concurrency'],
+            tests=options['tests'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+        )
+        report = recorder.report()
+        self.stdout.write(''.join(
+            title.ljust(width) for _, title, width in COLUMNS
+        ))
+        for row in report:
+            self.stdout.write(''.join(
+                str('-' if row[key] is None else row[key]).ljust(width)
+                for key, _, width in COLUMNS
+            ))
+        for error in errors:
+            self.stderr.write(error)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(
+                    {'options': options_summary(options), 'report': report,
+                     'errors': errors},
+                    file, ensure_ascii=False, indent=2,
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Запросов: {len(recorder.samples)}, '
+            f'ошибок сценариев: {len(errors)}'
+        ))
+
+
+def options_summary(options):
+    return {
+        key: options[key]
+        for key in ('url', 'users', 'concurrency', 'tests', 'seed')
+    }
@@ -0,0 +1,164 @@
+"""
+Метрики производительности представлений в формате Prometheus.
+
+Каждый процесс копит значения в памяти и не чаще раза в
+`METRICS_FLUSH_INTERVAL` секунд сбрасывает их в свой файл
+`METRICS_DIR/metrics-<pid>.json`. Эндпоинт метрик суммирует файлы всех
+процессов, поэтому значения агрегируются по всем воркерам gunicorn.
+Каталог нужно очищать при перезапуске сервера, иначе счетчики
+продолжатся с прежних значений.
+
+Все значения - суммируемые счетчики: гистограммы хранятся
+накопительными корзинами `_bucket`, а также `_sum` и `_count`.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+FILE_PREFIX = 'metrics-'
+# Семейства метрик: тип и описание
+METRICS = {
+    'http_requests_total': (
+        'counter', 'Количество запросов по представлениям и статусам.'
+    ),
+    'http_request_duration_seconds': (
+        'histogram', 'Время обработки запроса.'
+    ),
+    'db_queries_total': (
+        'counter', 'Количество SQL-запросов.'
+    ),
+    'db_query_duration_seconds_total': (
+        'counter', 'Суммарное время SQL-запросов.'
+    ),
+    'template_render_duration_seconds_total': (
+        'counter', 'Суммарное время отрисовки шаблонов.'
+    ),
+}
+
+
+class MetricsRegistry:
+    """Метрики текущего процесса с периодическим сбросом в файл."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.samples = defaultdict(float)
+        self.flushed = 0
+
+    def record(self, view, method, status, duration, queries, db_time,
+               render_time):
+        """Учитывает один обработанный запрос."""
+        with self.lock:
+            if self.pid != os.getpid():
+                # Процесс-потомок не должен повторно учитывать значения,
+                # накопленные родителем до fork
+                self.reset()
+            samples = self.samples
+            samples['http_requests_total', (
+                ('view', view), ('method', method), ('status', str(status))
+            )] += 1
+            labels = (('view', view), ('method', method))
+            for bucket in settings.METRICS_BUCKETS:
+                if duration <= bucket:
+                    samples['http_request_duration_seconds_bucket', labels + (
+                        ('le', str(bucket)),
+                    )] += 1
+            samples['http_request_duration_seconds_bucket', labels + (
+                ('le', '+Inf'),
+            )] += 1
+            samples['http_request_duration_seconds_sum', labels] += duration
+            samples['http_request_duration_seconds_count', labels] += 1
+            labels = (('view', view),)
+            samples['db_queries_total', labels] += queries
+            samples['db_query_duration_seconds_total', labels] += db_time
+            samples[
+                'template_render_duration_seconds_total', labels
+            ] += render_time
+            if (
+                settings.METRICS_DIR
+                and time.monotonic() - self.flushed
+                >= settings.METRICS_FLUSH_INTERVAL
+            ):
+                self.flush()
+
+    def flush(self):
+        """Атомарно записывает метрики процесса в его файл."""
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'{FILE_PREFIX}{self.pid}.json'
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps([
+            [name, labels, value]
+            for (name, labels), value in self.samples.items()
+        ]))
+        os.replace(temporary, path)
+        self.flushed = time.monotonic()
+
+    def collect(self):
+        """Возвращает метрики, просуммированные по всем процессам."""
+        with self.lock:
+            if not settings.METRICS_DIR:
+                return dict(self.samples)
+            self.flush()
+        samples = defaultdict(float)
+        for path in Path(settings.METRICS_DIR).glob(f'{FILE_PREFIX}*.json'):
+            try:
+                rows = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in rows:
+                samples[name, tuple(map(tuple, labels))] += value
+        return samples
+
+
+registry = MetricsRegistry()
+
+
+def get_family(name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+            return name[:-len(suffix)]
+    return name
+
+
+def sort_key(item):
+    (name, labels), _ = item
+    le = dict(labels).get('le')
+    return (
+        get_family(name),
+        [pair for pair in labels if pair[0] != 'le'],
+        name,
+        float(le) if le is not None else 0,
+    )
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render_metrics(samples):
+    """Форматирует метрики в текстовом формате Prometheus."""
+    lines = []
+    family = None
+    for (name, labels), value in sorted(samples.items(), key=sort_key):
+        if get_family(name) != family:
+            family = get_family(name)
+            kind, description = METRICS.get(family, ('untyped', ''))
+            lines.append(f'# HELP {family} {description}')
+            lines.append(f'# TYPE {family} {kind}')
+        label_text = ','.join(
+            '{}="{}"'.format(
+                key, text.replace('\\', '\\\\').replace('"', '\\"')
+            )
+            for key, text in labels
+        )
+        lines.append(f'{name}{{{label_text}}} {format_value(value)}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,107 @@
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import registry
+
+QUERY_COUNT_HEADER = 'X-DB-Queries'
+
+
+class QueryCounter:
+    """
+    Обертка выполнения запросов, которая считает их количество
+    и суммарное время.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+
+
+@contextmanager
+def count_queries():
+    """Считает SQL-запросы ко всем базам данных внутри блока."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+class QueryCountMiddleware:
+    """
+    Добавляет к ответу заголовок `X-DB-Queries` с количеством
+    SQL-запросов, выполненных при обработке запроса.
+
+    Запросы считаются через `execute_wrapper` без включения `DEBUG`.
+    Подключается настройкой `QUERY_COUNT_HEADER` и используется
+    нагрузочным тестом (см. `spare_kits.loadtest`).
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_COUNT_HEADER:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with count_queries() as counter:
+            response = self.get_response(request)
+        response[QUERY_COUNT_HEADER] = counter.count
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Собирает по имени представления время обработки запроса, количество
+    и время SQL-запросов и время отрисовки шаблона (см.
+    `spare_kits.metrics`).
+
+    Подключается настройкой `METRICS_ENABLED`.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.render_duration = 0
+        start = time.perf_counter()
+        with count_queries() as counter:
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        match = request.resolver_match
+        registry.record(
+            view=match.view_name if match else 'unresolved',
+            method=request.method,
+            status=response.status_code,
+            duration=duration,
+            queries=counter.count,
+            db_time=counter.duration,
+            render_time=request.render_duration,
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        """
+        Засекает отрисовку `TemplateResponse`: обработчик вызывает
+        этот метод непосредственно перед `render()`.
+        """
+        start = time.perf_counter()
+
+        def rendered(response):
+            request.render_duration = time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
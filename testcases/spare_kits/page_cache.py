@@ -0,0 +1,174 @@
+"""
+Кэш целых страниц для анонимных пользователей.
+
+Ключ страницы строится по пути и строке запроса, а в записи кэша хранятся
+версии наборов данных (см. `spare_kits.versions`), из которых она собрана.
+Когда сигналы меняют версию, запись становится устаревшей. В течение
+`PAGE_CACHE_STALE_TIMEOUT` секунд устаревшую страницу перестраивает только
+один запрос, захвативший блокировку, а остальные получают прежнюю версию.
+
+По тем же версиям для анонимных запросов вычисляются валидаторы ETag
+и Last-Modified, так что на условный GET-запрос с неизменившимися данными
+отдается 304 Not Modified без выполнения представления.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+from .versions import bump_version, get_versions
+
+PAGE_KEY = 'page-cache:{}'
+LOCK_KEY = 'page-cache-lock:{}'
+# Версии страниц каталога тем и тестов и таблицы результатов
+CATALOG_PAGES = 'pages:catalog'
+LEADERBOARD_PAGES = 'pages:leaderboard'
+
+
+def get_page_key(request):
+    query = request.GET.urlencode()
+    path = f'{request.path}?{query}' if query else request.path
+    return hashlib.md5(path.encode()).hexdigest()
+
+
+def is_cacheable(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+    )
+
+
+def build_response(entry, state):
+    response = HttpResponse(entry['content'], status=entry['status'])
+    for header, value in entry['headers']:
+        response[header] = value
+    response['X-Page-Cache'] = state
+    return response
+
+
+def store_response(key, response, versions):
+    """
+    Сохраняет ответ в кэш, если он успешен и не устанавливает cookies.
+    """
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    if response.status_code != 200 or response.cookies:
+        return
+    cache.set(
+        PAGE_KEY.format(key),
+        {
+            'content': response.content,
+            'status': response.status_code,
+            'headers': list(response.items()),
+            'versions': versions,
+            'created': time.time(),
+        },
+        timeout=(
+            settings.PAGE_CACHE_TIMEOUT + settings.PAGE_CACHE_STALE_TIMEOUT
+        ),
+    )
+
+
+def invalidate_pages(*version_names):
+    """Делает устаревшими страницы после фиксации транзакции."""
+    transaction.on_commit(lambda: bump_version(*version_names))
+
+
+def cache_anonymous_page(*version_names):
+    """
+    Кэширует ответы представления для анонимных GET-запросов.
+
+    `version_names` - версии наборов данных, изменение которых делает
+    страницу устаревшей.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable(request):
+                return view_func(request, *args, **kwargs)
+            key = get_page_key(request)
+            versions = get_versions(*version_names)
+            entry = cache.get(PAGE_KEY.format(key))
+            locked = False
+            if entry is not None:
+                age = time.time() - entry['created']
+                if (
+                    entry['versions'] == versions
+                    and age < settings.PAGE_CACHE_TIMEOUT
+                ):
+                    return build_response(entry, 'hit')
+                if settings.PAGE_CACHE_STALE_TIMEOUT:
+                    locked = cache.add(
+                        LOCK_KEY.format(key), 1,
+                        timeout=settings.PAGE_CACHE_LOCK_TIMEOUT,
+                    )
+                    if not locked:
+                        return build_response(entry, 'stale')
+            response = view_func(request, *args, **kwargs)
+            try:
+                store_response(key, response, versions)
+            finally:
+                if locked:
+                    cache.delete(LOCK_KEY.format(key))
+            response['X-Page-Cache'] = 'miss'
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def conditional_page(*version_names):
+    """
+    Отвечает 304 Not Modified на условные GET-запросы анонимов, пока
+    не изменились версии `version_names`.
+
+    Страницы авторизованных пользователей зависят еще и от их цвета
+    и кошелька, которые в версии не входят, поэтому для них валидаторы
+    не вычисляются и страница всегда строится заново.
+    """
+
+    def get_etag(request, *args, **kwargs):
+        if not is_cacheable(request):
+            return None
+        versions = sorted(get_versions(*version_names).items())
+        return hashlib.md5(
+            f'{request.get_full_path()}:{versions}'.encode()
+        ).hexdigest()
+
+    def get_last_modified(request, *args, **kwargs):
+        if not is_cacheable(request):
+            return None
+        return datetime.fromtimestamp(
+            max(get_versions(*version_names).values()) / 10 ** 9,
+            tz=timezone.utc,
+        )
+
+    def decorator(view_func):
+        return vary_on_cookie(condition(
+            etag_func=get_etag, last_modified_func=get_last_modified
+        )(view_func))
+
+    return decorator
+
+
+def versioned_page(*version_names):
+    """
+    Подключает к представлению условные GET-запросы и кэш страниц
+    для анонимных пользователей по версиям `version_names`.
+    """
+
+    def decorator(view_func):
+        return conditional_page(*version_names)(
+            cache_anonymous_page(*version_names)(view_func)
+        )
+
+    return decorator
@@ -0,0 +1,282 @@
+"""
+Постраничный вывод по ключу (keyset/seek-пагинация).
+
+Вместо OFFSET страница выбирается условием на значения полей сортировки
+крайней записи соседней страницы, поэтому глубокие страницы читаются
+по индексу так же быстро, как первая, а общий `COUNT(*)` не нужен.
+"""
+import base64
+import json
+from math import ceil
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(values, direction, number):
+    """Упаковывает позицию страницы в непрозрачную строку."""
+    data = json.dumps(
+        {'v': values, 'd': direction, 'n': number},
+        cls=DjangoJSONEncoder,
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Распаковывает позицию страницы.
+
+    Возвращает `None` для пустого или поврежденного курсора.
+    """
+    if not cursor:
+        return None
+    try:
+        data = json.loads(
+            base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        )
+        values, direction, number = data['v'], data['d'], int(data['n'])
+    except (ValueError, TypeError, KeyError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list):
+        return None
+    return values, direction, max(number, 1)
+
+
+def get_seek_filter(ordering, values, reverse=False):
+    """
+    Строит условие выборки записей, следующих за `values` в порядке
+    `ordering` (или предшествующих им при `reverse=True`).
+    """
+    seek = Q()
+    for index, field in enumerate(ordering):
+        name = field.lstrip('-')
+        descending = field.startswith('-') != reverse
+        condition = Q(**{
+            f'{name}__{"lt" if descending else "gt"}': values[index]
+        })
+        for previous, value in zip(ordering[:index], values):
+            condition &= Q(**{previous.lstrip('-'): value})
+        seek |= condition
+    return seek
+
+
+class KeysetPage:
+    """Страница keyset-пагинации."""
+
+    def __init__(self, object_list, number, paginator,
+                 has_next, has_previous):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Keyset page {self.number}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    @cached_property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self.paginator.get_cursor(
+            self.object_list[-1], NEXT, self.next_page_number()
+        )
+
+    @cached_property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        if self.previous_page_number() == 1:
+            return ''
+        return self.paginator.get_cursor(
+            self.object_list[0], PREVIOUS, self.previous_page_number()
+        )
+
+
+class KeysetPaginator:
+    """
+    Keyset-пагинатор для queryset.
+
+    `ordering` - поля (или аннотации) сортировки в формате `order_by`;
+    последним должно идти уникальное поле, например `('-total_won', '-id')`.
+    При `estimate_count=True` доступно приблизительное общее количество
+    записей: на PostgreSQL оно берется из статистики планировщика.
+    """
+
+    def __init__(self, queryset, ordering, per_page, estimate_count=False):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = int(per_page)
+        self.estimate_count = estimate_count
+
+    def get_cursor(self, obj, direction, number):
+        values = [
+            getattr(obj, field.lstrip('-')) for field in self.ordering
+        ]
+        return encode_cursor(values, direction, number)
+
+    def get_page(self, cursor=None):
+        """
+        Возвращает страницу по курсору.
+
+        Курсор с неподходящими для полей сортировки значениями, например
+        подделанный вручную, открывает первую страницу.
+        """
+        position = decode_cursor(cursor)
+        if position is not None and len(position[0]) == len(self.ordering):
+            try:
+                return self.get_seek_page(*position)
+            except (ValueError, TypeError, ValidationError):
+                pass
+        return self.build_page(
+            list(self.queryset.order_by(*self.ordering)[:self.per_page + 1]),
+            number=1,
+            has_previous=False,
+        )
+
+    def get_seek_page(self, values, direction, number):
+        if direction == NEXT:
+            return self.build_page(
+                list(self.queryset.filter(
+                    get_seek_filter(self.ordering, values)
+                ).order_by(*self.ordering)[:self.per_page + 1]),
+                number=number,
+                has_previous=True,
+            )
+        reverse_ordering = [
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in self.ordering
+        ]
+        rows = list(self.queryset.filter(
+            get_seek_filter(self.ordering, values, reverse=True)
+        ).order_by(*reverse_ordering)[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return KeysetPage(
+            rows, number if has_previous else 1, self,
+            has_next=True, has_previous=has_previous,
+        )
+
+    def build_page(self, rows, number, has_previous):
+        return KeysetPage(
+            rows[:self.per_page], number, self,
+            has_next=len(rows) > self.per_page, has_previous=has_previous,
+        )
+
+    @cached_property
+    def count(self):
+        """
+        Возвращает общее количество записей: приблизительное на PostgreSQL
+        при `estimate_count=True`, иначе точное.
+        """
+        connection = connections[self.queryset.db]
+        if self.estimate_count and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class '
+                    'WHERE oid = %s::regclass',
+                    [self.queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return row[0]
+        return self.queryset.count()
+
+    @cached_property
+    def num_pages(self):
+        return max(ceil(self.count / self.per_page), 1)
+
+
+class KeysetPaginationMixin:
+    """
+    Подключает keyset-пагинацию к `ListView`.
+
+    Курсор передается GET-параметром `cursor_kwarg`, а шаблону доступны
+    обычные `paginator`, `page_obj` и `is_paginated`.
+    """
+
+    keyset_ordering = ('-pk',)
+    cursor_kwarg = 'cursor'
+    estimate_count = False
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(
+            queryset,
+            self.keyset_ordering,
+            page_size,
+            estimate_count=self.estimate_count,
+        )
+        page = paginator.get_page(self.request.GET.get(self.cursor_kwarg))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        """
+        Добавляет `cursor_query` - остальные GET-параметры запроса
+        (например, поисковый запрос) для ссылок на соседние страницы.
+        """
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.copy()
+        query.pop(self.cursor_kwarg, None)
+        query.pop('format', None)
+        context['cursor_query'] = f'{query.urlencode()}&' if query else ''
+        return context
+
+
+class LoadMoreMixin(KeysetPaginationMixin):
+    """
+    Отдает следующую порцию карточек в JSON при `?format=json`.
+
+    Ответ содержит HTML карточек из `cards_template_name` и курсор
+    следующей страницы, чтобы кнопка "Показать еще" могла дописать их
+    к списку без перезагрузки страницы.
+    """
+
+    cards_template_name = None
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get('format') != 'json':
+            return super().render_to_response(context, **response_kwargs)
+        page = context['page_obj']
+        return JsonResponse({
+            'html': render_to_string(
+                self.cards_template_name,
+                {'object_list': page.object_list},
+                request=self.request,
+            ),
+            'has_next': page.has_next(),
+            'next_cursor': page.next_cursor,
+        })
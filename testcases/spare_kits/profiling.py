@@ -0,0 +1,175 @@
+"""
+Профилирование отдельных запросов.
+
+Запрос профилируется по требованию, если персонал добавил к адресу
+`?profile=1` или клиент передал заголовок `X-Profile` с подписанным
+токеном (см. `make_profile_token`). Вокруг представления запускаются
+`cProfile` и сэмплирующий профайлер: в `PROFILING_DIR` сохраняются
+файл pstats (`.prof`) и свернутые стеки (`.collapsed`) для построения
+flame graph, например `flamegraph.pl`.
+
+Кроме того, доля `PROFILING_SAMPLE_RATE` запросов к представлениям
+`PROFILING_SAMPLE_VIEWS` профилируется только сэмплирующим профайлером,
+не чаще `PROFILING_SAMPLE_LIMIT` раз в минуту на все процессы.
+"""
+import cProfile
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = 'profile'
+TOKEN_SALT = 'spare_kits.profiling'
+LIMIT_KEY = 'profiling-samples:{}'
+
+
+def make_profile_token():
+    """Возвращает токен для заголовка `X-Profile`."""
+    return signing.dumps('profile', salt=TOKEN_SALT)
+
+
+def is_valid_token(token):
+    try:
+        signing.loads(
+            token, salt=TOKEN_SALT, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class Sampler:
+    """
+    Сэмплирующий профайлер: отдельный поток с интервалом
+    `PROFILING_SAMPLE_INTERVAL` снимает стек профилируемого потока.
+    """
+
+    def __init__(self, thread_id=None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(settings.PROFILING_SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{frame.f_globals.get("__name__", "?")}:{code.co_name}'
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Возвращает стеки в свернутом формате `a;b;c количество`."""
+        return ''.join(
+            f'{stack} {count}\n' for stack, count in self.stacks.items()
+        )
+
+
+def get_profile_path(view_name):
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = '{}-{}-{}-{}'.format(
+        time.strftime('%Y%m%d-%H%M%S'),
+        view_name.replace(':', '-') or 'unresolved',
+        os.getpid(),
+        uuid.uuid4().hex[:8],
+    )
+    return directory / name
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует запросы по требованию и выборочно (см. модуль).
+
+    Подключается настройкой `PROFILING_DIR`.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_DIR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if self.is_requested(request):
+            return self.profile(request, full=True)
+        if self.is_sampled(request):
+            return self.profile(request, full=False)
+        return self.get_response(request)
+
+    def is_requested(self, request):
+        if PROFILE_PARAM in request.GET and request.user.is_staff:
+            return True
+        token = request.headers.get(PROFILE_HEADER)
+        return bool(token) and is_valid_token(token)
+
+    def is_sampled(self, request):
+        """
+        Решает, попадает ли запрос в выборку, с ограничением частоты
+        через общий кэш.
+        """
+        if (
+            not settings.PROFILING_SAMPLE_RATE
+            or random.random() >= settings.PROFILING_SAMPLE_RATE
+        ):
+            return False
+        try:
+            view_name = resolve(request.path_info).view_name
+        except Resolver404:
+            return False
+        if view_name not in settings.PROFILING_SAMPLE_VIEWS:
+            return False
+        key = LIMIT_KEY.format(int(time.time() // 60))
+        cache.add(key, 0, timeout=120)
+        try:
+            return cache.incr(key) <= settings.PROFILING_SAMPLE_LIMIT
+        except ValueError:
+            return False
+
+    def profile(self, request, full):
+        """
+        Выполняет запрос под профайлерами и сохраняет результаты.
+
+        `full` включает `cProfile` в дополнение к сэмплированию.
+        """
+        sampler = Sampler()
+        profiler = cProfile.Profile() if full else None
+        sampler.start()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            sampler.stop()
+        match = request.resolver_match
+        path = get_profile_path(match.view_name if match else '')
+        if profiler is not None:
+            profiler.dump_stats(path.with_suffix('.prof'))
+        path.with_suffix('.collapsed').write_text(sampler.collapsed())
+        if full:
+            response[PROFILE_HEADER] = path.name
+        return response
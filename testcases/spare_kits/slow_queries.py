@@ -0,0 +1,152 @@
+"""
+Журнал медленных SQL-запросов.
+
+Запросы дольше `SLOW_QUERY_THRESHOLD` секунд записываются логгером
+`spare_kits.slow_queries` по одной JSON-строке: представление, отпечаток
+запроса без значений параметров, время и план выполнения. План
+снимается повторным `EXPLAIN` (PostgreSQL `EXPLAIN (ANALYZE off)`,
+SQLite `EXPLAIN QUERY PLAN`) только для запросов на чтение.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+PARAMS_RE = re.compile(r'(?:%s|\?)')
+LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+SPACE_RE = re.compile(r'\s+')
+EXPLAIN_PREFIXES = {
+    'postgresql': 'EXPLAIN (ANALYZE off) ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+# Повторный запрос EXPLAIN сам проходит через обертку соединения
+explaining = threading.local()
+
+
+def normalize_sql(sql):
+    """
+    Заменяет значения в запросе на `?`, а списки значений `IN (...)`
+    на `(...)`, чтобы одинаковые запросы с разными параметрами
+    группировались вместе.
+    """
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = PARAMS_RE.sub('?', sql)
+    sql = LIST_RE.sub('(...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def get_fingerprint(sql):
+    return hashlib.md5(normalize_sql(sql).encode()).hexdigest()[:16]
+
+
+def explain(connection, sql, params):
+    """
+    Возвращает план запроса на чтение или None.
+
+    EXPLAIN выполняется в точке сохранения, чтобы его ошибка не
+    прерывала транзакцию, в которой выполнялся исходный запрос.
+    """
+    prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+    keyword = sql.lstrip()[:6].upper()
+    if prefix is None or not keyword.startswith(('SELECT', 'WITH')):
+        return None
+    explaining.active = True
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+    except DatabaseError as error:
+        return [f'EXPLAIN failed: {error}']
+    finally:
+        explaining.active = False
+    return [
+        ' '.join(str(value) for value in row) if len(row) > 1 else row[0]
+        for row in rows
+    ]
+
+
+class SlowQueryLogger:
+    """Обертка выполнения запросов, записывающая медленные запросы."""
+
+    def __init__(self, source):
+        self.source = source
+
+    def get_source(self):
+        if callable(self.source):
+            return self.source()
+        return self.source
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(explaining, 'active', False):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            # Медленные запросы записываются и при ошибке, например
+            # при превышении времени выполнения
+            duration = time.perf_counter() - start
+            if duration >= settings.SLOW_QUERY_THRESHOLD:
+                self.log(context['connection'], sql, params, many, duration)
+
+    def log(self, connection, sql, params, many, duration):
+        logger.warning(json.dumps({
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'source': self.get_source(),
+            'database': connection.alias,
+            'duration': round(duration, 4),
+            'fingerprint': get_fingerprint(sql),
+            'sql': normalize_sql(sql),
+            'many': many,
+            'plan': None if many else explain(connection, sql, params),
+        }, ensure_ascii=False))
+
+
+@contextmanager
+def log_slow_queries(source):
+    """
+    Записывает медленные запросы внутри блока, например в командах.
+
+    `source` - строка или функция, возвращающая источник запросов.
+    """
+    slow_query_logger = SlowQueryLogger(source)
+    with ExitStack() as stack:
+        if settings.SLOW_QUERY_THRESHOLD:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(slow_query_logger)
+                )
+        yield
+
+
+class SlowQueryMiddleware:
+    """
+    Записывает медленные запросы с именем представления, которое их
+    выполнило. Подключается настройкой `SLOW_QUERY_THRESHOLD`.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_THRESHOLD:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        def get_source():
+            match = request.resolver_match
+            return match.view_name if match else request.path
+
+        with log_slow_queries(get_source):
+            return self.get_response(request)
@@ -0,0 +1,35 @@
+"""
+Версии наборов данных для инвалидации кэшей.
+
+Версия хранится в кэше Django и меняется при каждом изменении данных,
+поэтому все процессы приложения видят одно и то же значение.
+"""
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'version:{}'
+
+
+def get_versions(*names):
+    """Возвращает словарь текущих версий для переданных имен."""
+    keys = {VERSION_KEY.format(name): name for name in names}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        cache.add(key, time.time_ns(), timeout=None)
+        versions[key] = cache.get(key, 0)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def get_version(name):
+    """Возвращает текущую версию набора данных."""
+    return get_versions(name)[name]
+
+
+def bump_version(*names):
+    """Меняет версии наборов данных, делая устаревшими связанные кэши."""
+    version = time.time_ns()
+    cache.set_many(
+        {VERSION_KEY.format(name): version for name in names}, timeout=None
+    )
+    return version
@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from .metrics import registry, render_metrics
+
 
 def page_not_found(request, exception):
     return render(
@@ -15,3 +19,21 @@ def csrf_failure(request, reason=''):
 
 def server_error(request):
     return render(request, 'errors/500.html', status=500)
+
+
+def metrics(request):
+    """
+    Отдает метрики в формате Prometheus.
+
+    Доступно с адресов `METRICS_ALLOWED_IPS` и персоналу, для остальных
+    эндпоинт не существует.
+    """
+    if not settings.METRICS_ENABLED or not (
+        request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+        or request.user.is_staff
+    ):
+        raise Http404
+    return HttpResponse(
+        render_metrics(registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -46,11 +46,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'spare_kits.middleware.MetricsMiddleware',
+    'spare_kits.middleware.QueryCountMiddleware',
+    'spare_kits.slow_queries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'spare_kits.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -92,6 +96,19 @@ DATABASES = {
     },
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    },
+}
+
 AUTH_USER_MODEL = "users.User"
 
 # Password validation
@@ -159,3 +176,102 @@ MAX_PRIZE = 100
 # Максималльное значение процента правильных ответов
 # для успешного прохождения теста
 MAX_PERCENT_SUCCESS = 100
+# Режим прохождения теста, при котором ответ на вопрос сразу возвращает
+# следующий вопрос без дополнительного редиректа
+TESTING_SINGLE_ROUND_TRIP = os.getenv(
+    'TESTING_SINGLE_ROUND_TRIP', default='False'
+) == 'True'
+# Время хранения снимка теста в кэше (в секундах)
+TEST_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+# Количество снимков тестов, хранящихся в памяти каждого процесса
+TEST_SNAPSHOT_LRU_SIZE = 256
+# Хранилище состояния незавершенных попыток: 'database' или 'cache'.
+# При 'cache' ответы записываются в базу данных только по завершении теста
+TESTING_STATE_ENGINE = os.getenv('TESTING_STATE_ENGINE', default='database')
+# Время хранения состояния незавершенной попытки в кэше (в секундах)
+TESTING_STATE_TIMEOUT = 60 * 60 * 24
+# Длина интервала реестра состояний попыток в кэше (в секундах)
+TESTING_STATE_BUCKET_SIZE = 60 * 10
+# Максимальное количество слов поискового запроса
+SEARCH_MAX_TERMS = 10
+# Максимальное количество тестов в результатах поиска
+SEARCH_RESULTS_LIMIT = 100
+# Количество карточек тем и тестов на одной странице списка
+LISTING_PAGE_SIZE = 20
+# Время жизни страницы в кэше для анонимных пользователей (в секундах)
+PAGE_CACHE_TIMEOUT = 60 * 5
+# Сколько секунд после устаревания страницы ее можно отдавать, пока
+# один запрос собирает новую версию (0 - отключить)
+PAGE_CACHE_STALE_TIMEOUT = 60
+# Максимальное время сборки страницы под блокировкой (в секундах)
+PAGE_CACHE_LOCK_TIMEOUT = 30
+# Добавлять к ответам заголовок X-DB-Queries с количеством SQL-запросов
+# (используется нагрузочным тестом load_test)
+QUERY_COUNT_HEADER = os.getenv('QUERY_COUNT_HEADER', default='False') == 'True'
+# Сбор метрик представлений для Prometheus (эндпоинт /metrics/)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', default='False') == 'True'
+# Каталог файлов метрик процессов; для нескольких воркеров gunicorn
+# должен быть общим и очищаться при перезапуске (пусто - только память)
+METRICS_DIR = os.getenv('METRICS_DIR', default='')
+# Как часто процесс сбрасывает метрики в файл (в секундах)
+METRICS_FLUSH_INTERVAL = 1
+# Адреса, с которых доступен эндпоинт метрик
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+# Границы корзин гистограммы времени обработки запроса (в секундах)
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Запросы дольше стольких секунд записываются в журнал медленных
+# запросов с планом выполнения (0 - отключить)
+SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', default='0'))
+# Файл журнала медленных запросов (JSON Lines) и его ротация
+SLOW_QUERY_LOG_FILE = os.getenv(
+    'SLOW_QUERY_LOG_FILE', default=BASE_DIR / 'slow_queries.jsonl'
+)
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUP_COUNT = 5
+# Каталог профилей запросов (пусто - профилирование отключено)
+PROFILING_DIR = os.getenv('PROFILING_DIR', default='')
+# Время действия токена заголовка X-Profile (в секундах)
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+# Интервал снятия стеков сэмплирующим профайлером (в секундах)
+PROFILING_SAMPLE_INTERVAL = 0.005
+# Доля выборочно профилируемых запросов к PROFILING_SAMPLE_VIEWS
+PROFILING_SAMPLE_RATE = float(
+    os.getenv('PROFILING_SAMPLE_RATE', default='0')
+)
+PROFILING_SAMPLE_VIEWS = ('core:tests-detail', 'users:users-list')
+# Максимальное количество выборочных профилей в минуту на все процессы
+PROFILING_SAMPLE_LIMIT = 10
+# Миниатюры аватаров, которые строятся после загрузки фотографии:
+# поле пользователя с адресом миниатюры -> размер
+AVATAR_THUMBNAILS = {'photo_small': '100x100', 'photo_large': '200x200'}
+# Количество потоков построения миниатюр в каждом процессе
+# (0 - строить миниатюры сразу в запросе)
+AVATAR_WORKERS = int(os.getenv('AVATAR_WORKERS', default='2'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {
+            'format': '%(message)s',
+        },
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'maxBytes': SLOW_QUERY_LOG_MAX_BYTES,
+            'backupCount': SLOW_QUERY_LOG_BACKUP_COUNT,
+            'formatter': 'message',
+            'encoding': 'utf-8',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'spare_kits.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
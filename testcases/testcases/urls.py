@@ -18,11 +18,14 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from spare_kits.views import metrics
+
 urlpatterns = [
     path('', include('core.urls', namespace='core')),
     path('users/', include('users.urls', namespace='users')),
     path('users/', include('django.contrib.auth.urls')),
     path('admin/', admin.site.urls),
+    path('metrics/', metrics, name='metrics'),
 ]
 
 handler404 = 'spare_kits.views.page_not_found'
@@ -4,12 +4,13 @@ from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
-from users.models import Color, Wallet
+from spare_kits.admin import CachedChoicesMixin
+from users.models import CoinTransaction, Color, UserStats, Wallet
 
 User = get_user_model()
 
 
-class UserCustomAdmin(UserAdmin):
+class UserCustomAdmin(CachedChoicesMixin, UserAdmin):
     list_display = (
         'username', 'first_name', 'last_name',
         'color', 'colored_name', 'is_staff',
@@ -28,6 +29,7 @@ class UserCustomAdmin(UserAdmin):
         (_('Important dates'), {'fields': ('last_login', 'date_joined')}),
     )
     list_editable = ('color',)
+    list_select_related = ('color',)
 
     @admin.display
     def colored_name(self, obj):
@@ -43,6 +45,25 @@ class WalletAdmin(admin.ModelAdmin):
     list_display = ('owner', 'total_won', 'current_sum',)
 
 
+class CoinTransactionAdmin(admin.ModelAdmin):
+    search_fields = ('owner__username',)
+    list_display = ('owner', 'amount', 'kind', 'date_created', 'materialized')
+    list_filter = ('kind', 'materialized')
+    list_select_related = ('owner',)
+    raw_id_fields = ('owner',)
+    readonly_fields = ('materialized',)
+
+
+class UserStatsAdmin(admin.ModelAdmin):
+    search_fields = ('user__username',)
+    list_display = (
+        'user', 'tests_attempts', 'tests_count', 'tests_success', 'total_won',
+    )
+    list_select_related = ('user',)
+
+
 admin.site.register(Color)
 admin.site.register(User, UserCustomAdmin)
 admin.site.register(Wallet, WalletAdmin)
+admin.site.register(CoinTransaction, CoinTransactionAdmin)
+admin.site.register(UserStats, UserStatsAdmin)
@@ -0,0 +1,119 @@
+"""
+Миниатюры аватаров пользователей.
+
+Миниатюры размеров `AVATAR_THUMBNAILS` строятся sorl-thumbnail сразу
+после загрузки фотографии в пуле из `AVATAR_WORKERS` потоков, а их адреса
+сохраняются в полях пользователя. Страницы выводят готовые адреса без
+обращения к хранилищу ключей sorl и без обработки изображений в запросе.
+
+После регистрации адреса записываются только новому пользователю, а при
+досрочном построении миниатюры строятся один раз для файла фотографии
+и записываются всем пользователям с этим файлом, у которых их еще нет,
+например с фотографией по умолчанию. При смене фотографии адреса
+очищаются и миниатюры строятся заново (см. `users.signals`).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import connection
+from sorl.thumbnail import get_thumbnail
+
+from spare_kits.page_cache import LEADERBOARD_PAGES, invalidate_pages
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+# Потоки пула создаются только при первой постановке задачи
+executor = ThreadPoolExecutor(
+    max_workers=max(settings.AVATAR_WORKERS, 1),
+    thread_name_prefix='avatars',
+)
+
+
+def build_thumbnails(photo_name):
+    """
+    Строит миниатюры фотографии и возвращает их адреса по полям
+    пользователя или None, если исходный файл недоступен.
+    """
+    urls = {}
+    for field, geometry in settings.AVATAR_THUMBNAILS.items():
+        thumbnail = get_thumbnail(photo_name, geometry, **THUMBNAIL_OPTIONS)
+        if not thumbnail.exists():
+            return None
+        urls[field] = thumbnail.url
+    return urls
+
+
+def generate_avatars(photo_name, user_ids=None, everything=False):
+    """
+    Строит миниатюры фотографии и сохраняет их адреса пользователям
+    `user_ids` с этой фотографией, а если они не заданы - всем
+    пользователям с ней, у которых миниатюр еще нет (или всем при
+    `everything`). Возвращает количество обновленных пользователей.
+    """
+    try:
+        urls = build_thumbnails(photo_name)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры %s', photo_name)
+        return 0
+    if urls is None:
+        logger.warning('Фотография %s не найдена', photo_name)
+        return 0
+    users = User.objects.filter(photo=photo_name)
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    elif not everything:
+        users = users.filter(
+            **{field: '' for field in settings.AVATAR_THUMBNAILS}
+        )
+    updated = users.update(**urls)
+    if updated:
+        # Массовое обновление не отправляет сигналов сохранения
+        invalidate_pages(LEADERBOARD_PAGES)
+    return updated
+
+
+def run_in_worker(photo_name, *args, **kwargs):
+    try:
+        return generate_avatars(photo_name, *args, **kwargs)
+    finally:
+        connection.close()
+
+
+def schedule_avatars(photo_name, user_ids):
+    """
+    Ставит построение миниатюр фотографии пользователей `user_ids`
+    в очередь пула потоков; при `AVATAR_WORKERS = 0` строит их сразу.
+    """
+    if not settings.AVATAR_WORKERS:
+        generate_avatars(photo_name, user_ids)
+        return
+    executor.submit(run_in_worker, photo_name, user_ids)
+
+
+def backfill_avatars(workers, everything=False):
+    """
+    Строит миниатюры для фотографий пользователей, у которых их еще нет
+    (или для всех при `everything`), в пуле из `workers` потоков.
+    Возвращает количество обновленных пользователей.
+    """
+    users = User.objects.exclude(photo='')
+    if not everything:
+        users = users.filter(
+            **{field: '' for field in settings.AVATAR_THUMBNAILS}
+        )
+    photos = list(
+        users.order_by('photo').values_list('photo', flat=True).distinct()
+    )
+    if not workers:
+        return sum(map(
+            partial(generate_avatars, everything=everything), photos
+        ))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(
+            partial(run_in_worker, everything=everything), photos
+        ))
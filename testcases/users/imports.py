@@ -0,0 +1,208 @@
+"""
+Массовый импорт пользователей из CSV или JSON Lines.
+
+Файл читается построчно и обрабатывается пакетами: пароли пакета
+хешируются в пуле процессов, пока предыдущий пакет записывается в базу
+данных, а пользователи, их кошельки и статистика создаются
+`bulk_create` в одной транзакции на пакет. Ошибочные строки
+пропускаются и выводятся с номерами строк.
+"""
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from time import perf_counter
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from spare_kits.page_cache import LEADERBOARD_PAGES, invalidate_pages
+from .avatars import backfill_avatars
+from .models import Color, User, UserStats, Wallet
+
+FIELDS = ('username', 'email', 'first_name', 'last_name', 'password')
+FORMATS = ('csv', 'jsonl')
+
+
+def get_format(path):
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(file, file_format):
+    """
+    Построчно читает файл и возвращает пары (номер строки, словарь
+    полей) или (номер строки, текст ошибки).
+    """
+    if file_format == 'jsonl':
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                yield line_number, f'некорректный JSON: {error}'
+                continue
+            if not isinstance(row, dict):
+                yield line_number, 'строка должна быть объектом JSON'
+                continue
+            yield line_number, row
+        return
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, row
+
+
+class UserImporter:
+    """Импортирует пользователей из файла пакетами (см. модуль)."""
+
+    username_validator = UnicodeUsernameValidator()
+
+    def __init__(self, batch_size=1000, workers=None, stdout=None,
+                 stderr=None):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.stdout = stdout
+        self.stderr = stderr
+        self.seen = set()
+        self.counts = {'imported': 0, 'errors': 0}
+        self.lengths = {
+            field: User._meta.get_field(field).max_length
+            for field in FIELDS if field != 'password'
+        }
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def error(self, line_number, message):
+        self.counts['errors'] += 1
+        if self.stderr is not None:
+            self.stderr.write(f'Строка {line_number}: {message}')
+
+    def clean_row(self, row):
+        """
+        Проверяет поля строки и возвращает словарь значений; вызывает
+        `ValidationError` для ошибочной строки.
+        """
+        values = {
+            field: str(row.get(field) or '').strip() for field in FIELDS
+        }
+        values['password'] = str(row.get('password') or '') or None
+        if not values['username']:
+            raise ValidationError('не указано имя пользователя')
+        for field, max_length in self.lengths.items():
+            if values[field] and len(values[field]) > max_length:
+                raise ValidationError(
+                    f'{field}: длиннее {max_length} символов'
+                )
+        self.username_validator(values['username'])
+        if values['email']:
+            validate_email(values['email'])
+        if values['username'] in self.seen:
+            raise ValidationError('имя пользователя повторяется в файле')
+        return values
+
+    def clean_rows(self, rows):
+        for line_number, row in rows:
+            if isinstance(row, str):
+                self.error(line_number, row)
+                continue
+            try:
+                values = self.clean_row(row)
+            except ValidationError as error:
+                self.error(line_number, '; '.join(error.messages))
+                continue
+            self.seen.add(values['username'])
+            yield line_number, values
+
+    def insert_batch(self, batch, passwords, color):
+        """Создает пользователей пакета с кошельками и статистикой."""
+        existing = set(User.objects.filter(
+            username__in=[values['username'] for _, values in batch]
+        ).values_list('username', flat=True))
+        users = []
+        for (line_number, values), password in zip(batch, passwords):
+            if values['username'] in existing:
+                self.error(line_number, 'пользователь уже существует')
+                continue
+            users.append(User(
+                username=values['username'],
+                email=values['email'],
+                first_name=values['first_name'],
+                last_name=values['last_name'],
+                password=password,
+                color=color,
+            ))
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=self.batch_size)
+            Wallet.objects.bulk_create(
+                [Wallet(owner=user) for user in users],
+                batch_size=self.batch_size,
+            )
+            UserStats.objects.bulk_create(
+                [UserStats(user=user) for user in users],
+                batch_size=self.batch_size,
+            )
+        self.counts['imported'] += len(users)
+
+    def hash_passwords(self, pool, passwords):
+        """Возвращает итератор хешей паролей, вычисляемых в пуле."""
+        if pool is None:
+            return map(make_password, passwords)
+        workers = self.workers or os.cpu_count() or 1
+        return pool.map(
+            make_password,
+            passwords,
+            chunksize=max(1, len(passwords) // (workers * 4)),
+        )
+
+    def import_rows(self, rows):
+        """
+        Импортирует строки `read_rows` и возвращает количество
+        импортированных и ошибочных строк.
+        """
+        start = perf_counter()
+        color = Color.get_default_color()
+        rows = self.clean_rows(rows)
+        pool = (
+            ProcessPoolExecutor(self.workers, initializer=django.setup)
+            if self.workers != 0 else None
+        )
+        pending = None
+        try:
+            while batch := list(islice(rows, self.batch_size)):
+                passwords = [values['password'] for _, values in batch]
+                # Пароли пакета хешируются, пока записывается предыдущий
+                hashed = self.hash_passwords(pool, passwords)
+                if pending is not None:
+                    self.insert_batch(*pending, color)
+                    self.report(start)
+                pending = batch, hashed
+            if pending is not None:
+                self.insert_batch(*pending, color)
+                self.report(start)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        if self.counts['imported']:
+            backfill_avatars(workers=0)
+            invalidate_pages(LEADERBOARD_PAGES)
+        return self.counts
+
+    def import_file(self, path, file_format=None):
+        file_format = file_format or get_format(path)
+        with open(path, encoding='utf-8', newline='') as file:
+            return self.import_rows(read_rows(file, file_format))
+
+    def report(self, start):
+        elapsed = perf_counter() - start
+        self.log(
+            f'Импортировано пользователей: {self.counts["imported"]}, '
+            f'ошибок: {self.counts["errors"]}, '
+            f'{self.counts["imported"] / elapsed:.0f} в секунду'
+        )
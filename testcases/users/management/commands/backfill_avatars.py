@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.avatars import backfill_avatars
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит миниатюры аватаров для уже загруженных фотографий '
+        'и сохраняет их адреса пользователям.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.AVATAR_WORKERS,
+            help='Количество потоков построения миниатюр (0 - строить '
+                 'в текущем потоке).',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Перестроить миниатюры всех пользователей, а не только '
+                 'тех, у кого их еще нет.',
+        )
+
+    def handle(self, *args, **options):
+        updated = backfill_avatars(options['workers'], options['all'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено пользователей: {updated}'
+        ))
@@ -0,0 +1,41 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from users.imports import FORMATS, UserImporter
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует пользователей из CSV или JSON Lines с полями '
+        'username, email, first_name, last_name и password и создает им '
+        'кошельки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу с пользователями.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Формат файла (по умолчанию по '
+                                 'расширению: .jsonl - JSON Lines, иначе '
+                                 'CSV).')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Количество пользователей в одной '
+                                 'транзакции (по умолчанию 1000).')
+        parser.add_argument('--workers', type=int,
+                            help='Количество процессов хеширования паролей '
+                                 '(по умолчанию по числу процессоров, 0 - '
+                                 'хешировать в текущем процессе).')
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        counts = UserImporter(
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            stdout=self.stdout,
+            stderr=self.stderr,
+        ).import_file(options['path'], options['format'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершен за {perf_counter() - start:.1f} с '
+            f'(импортировано: {counts["imported"]}, '
+            f'ошибок: {counts["errors"]})'
+        ))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.models import Wallet
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит необработанные записи журнала монет в кошельки '
+        'пользователей пакетами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество записей журнала в одной транзакции (по '
+                 'умолчанию 1000).',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Работать постоянно, повторяя перенос через указанное '
+                 'количество секунд.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            materialized = Wallet.materialize(
+                batch_size=options['batch_size']
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Перенесено записей журнала монет: {materialized}'
+            ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from users.models import UserStats
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает статистику пользователей для таблицы результатов '
+        'по попыткам прохождения тестов и кошелькам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество записей в одном запросе (по умолчанию 1000).',
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = UserStats.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитана статистика пользователей: {rebuilt}'
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from users.models import UserStats, Wallet
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает кошельки пользователей по всему журналу монет '
+        'и обновляет статистику для таблицы результатов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество записей в одном запросе (по умолчанию 1000).',
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = Wallet.rebuild(batch_size=options['batch_size'])
+        UserStats.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано кошельков: {rebuilt}'
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.models import Wallet
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет суммы кошельков с перенесенными записями журнала монет '
+        'и выводит расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество кошельков в одном запросе (по умолчанию 1000).',
+        )
+
+    def handle(self, *args, **options):
+        mismatches = Wallet.reconcile(batch_size=options['batch_size'])
+        for owner_id, wallet, ledger in mismatches:
+            self.stdout.write(
+                f'Пользователь {owner_id}: в кошельке получено/остаток '
+                f'{wallet[0]}/{wallet[1]}, по журналу {ledger[0]}/{ledger[1]}'
+            )
+        if mismatches:
+            raise CommandError(
+                f'Расхождений: {len(mismatches)}. Для исправления '
+                f'выполните rebuild_wallets.'
+            )
+        self.stdout.write(self.style.SUCCESS('Кошельки сходятся с журналом'))
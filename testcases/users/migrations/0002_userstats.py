@@ -0,0 +1,69 @@
+# Generated by Django 4.0 on 2026-10-18 03:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Max, Q
+from django.db.models.functions import Coalesce
+
+
+def fill_user_stats(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    UserStats = apps.get_model('users', 'UserStats')
+    rows = User.objects.order_by().annotate(
+        attempts_count=Count(
+            'attempts', filter=Q(attempts__result__isnull=False)
+        ),
+        tests_completed=Count(
+            'attempts__testcase',
+            distinct=True,
+            filter=Q(attempts__result__isnull=False),
+        ),
+        tests_passed=Count(
+            'attempts__testcase',
+            distinct=True,
+            filter=Q(attempts__success=True),
+        ),
+        won=Coalesce(Max('wallet__total_won'), 0),
+    ).values_list(
+        'pk', 'attempts_count', 'tests_completed', 'tests_passed', 'won'
+    )
+    UserStats.objects.bulk_create([
+        UserStats(
+            user_id=pk,
+            tests_attempts=attempts_count,
+            tests_count=tests_completed,
+            tests_success=tests_passed,
+            total_won=won,
+        ) for pk, attempts_count, tests_completed, tests_passed, won in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_attempt_counters'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='users.user', verbose_name='пользователь')),
+                ('tests_attempts', models.PositiveIntegerField(default=0, verbose_name='общее количество тестирований')),
+                ('tests_count', models.PositiveIntegerField(default=0, verbose_name='общее количество тестов')),
+                ('tests_success', models.PositiveIntegerField(default=0, verbose_name='пройденных тестов')),
+                ('total_won', models.PositiveIntegerField(default=0, verbose_name='получено монет за все время')),
+            ],
+            options={
+                'verbose_name': 'статистика пользователя',
+                'verbose_name_plural': 'статистика пользователей',
+                'ordering': ('-total_won', '-user'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='userstats',
+            index=models.Index(fields=['-total_won', '-user'], name='userstats_ranking_idx'),
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 4.0 on 2026-10-18 04:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_opening_balances(apps, schema_editor):
+    """
+    Записывает в журнал монет начальные остатки существующих кошельков:
+    полученные монеты и уже потраченные.
+    """
+    Wallet = apps.get_model('users', 'Wallet')
+    CoinTransaction = apps.get_model('users', 'CoinTransaction')
+    transactions = []
+    wallets = Wallet.objects.filter(total_won__gt=0).values_list(
+        'owner_id', 'total_won', 'current_sum'
+    )
+    for owner_id, total_won, current_sum in wallets.iterator():
+        transactions.append(CoinTransaction(
+            owner_id=owner_id,
+            amount=total_won,
+            kind='opening',
+            materialized=True,
+        ))
+        if current_sum < total_won:
+            transactions.append(CoinTransaction(
+                owner_id=owner_id,
+                amount=current_sum - total_won,
+                kind='purchase',
+                materialized=True,
+            ))
+        if len(transactions) >= 1000:
+            CoinTransaction.objects.bulk_create(transactions)
+            transactions = []
+    CoinTransaction.objects.bulk_create(transactions)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_userstats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userstats',
+            name='total_won',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='получено монет за все время'),
+        ),
+        migrations.AlterField(
+            model_name='wallet',
+            name='current_sum',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='текущая сумма монет'),
+        ),
+        migrations.AlterField(
+            model_name='wallet',
+            name='total_won',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='получено монет за все время'),
+        ),
+        migrations.CreateModel(
+            name='CoinTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.BigIntegerField(verbose_name='сумма')),
+                ('kind', models.CharField(choices=[('prize', 'награда за тест'), ('purchase', 'покупка'), ('opening', 'начальный остаток')], max_length=16, verbose_name='вид операции')),
+                ('date_created', models.DateTimeField(auto_now_add=True, verbose_name='дата операции')),
+                ('materialized', models.BooleanField(default=False, verbose_name='перенесена в кошелек')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coin_transactions', to='users.user', verbose_name='владелец')),
+            ],
+            options={
+                'verbose_name': 'операция с монетами',
+                'verbose_name_plural': 'операции с монетами',
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='cointransaction',
+            index=models.Index(condition=models.Q(('materialized', False)), fields=['owner', 'id'], name='cointransaction_pending_idx'),
+        ),
+        migrations.RunPython(
+            create_opening_balances, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0 on 2026-10-18 04:40
+
+from django.db import migrations
+
+
+def create_default_color(apps, schema_editor):
+    """
+    Создает начальный цвет заранее, чтобы новым пользователям он
+    назначался из каталога цветов без запросов к базе данных.
+    """
+    Color = apps.get_model('users', 'Color')
+    Color.objects.get_or_create(hex_code='D8BFD8', defaults={'cost': 0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_coin_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_default_color, migrations.RunPython.noop),
+    ]
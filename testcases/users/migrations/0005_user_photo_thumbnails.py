@@ -0,0 +1,23 @@
+# Generated by Django 4.0 on 2026-10-18 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_default_color'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='photo_large',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='адрес большой миниатюры фото'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='photo_small',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='адрес маленькой миниатюры фото'),
+        ),
+    ]
@@ -1,5 +1,16 @@
+import threading
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (Case, Count, Exists, F, Max, OuterRef, Q,
+                              Subquery, Sum, Value, When)
+from django.db.models.functions import Coalesce
+
+from spare_kits.utils import batched
+from spare_kits.versions import bump_version, get_version
+
+COLORS_VERSION = 'users.colors'
+DEFAULT_COLOR_HEX = 'D8BFD8'
 
 
 class Color(models.Model):
@@ -31,12 +42,96 @@ class Color(models.Model):
 
     @classmethod
     def get_default_color(cls):
-        color, created = cls.objects.get_or_create(
-            hex_code='D8BFD8',
-            cost=0,
-        )
+        return color_catalog.get_default()
+
+
+class ColorCatalog:
+    """
+    Каталог цветов текущего процесса, упорядоченный по стоимости.
+
+    Цветов мало и меняются они редко, поэтому каталог загружается одним
+    запросом и перечитывается только после смены версии `users.colors`
+    (см. `spare_kits.versions`) или очистки сигналом. Во время
+    HTTP-запроса версия проверяется один раз (см. `start_request`),
+    а вне запросов - при каждом обращении. Объекты каталога общие
+    для всех потоков процесса и не должны изменяться.
+    """
+
+    def __init__(self):
+        self.state = None
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def start_request(self):
+        """Проверяет версию каталога в потоке один раз до конца запроса."""
+        self.local.in_request = True
+        self.local.checked = False
+
+    def finish_request(self):
+        self.local.in_request = False
+
+    def get_state(self):
+        state = self.state
+        if (
+            state is not None
+            and getattr(self.local, 'in_request', False)
+            and self.local.checked
+        ):
+            return state
+        version = get_version(COLORS_VERSION)
+        self.local.checked = True
+        if state is None or state[0] != version:
+            with self.lock:
+                state = self.state
+                if state is None or state[0] != version:
+                    colors = tuple(Color.objects.order_by('cost', 'pk'))
+                    state = (
+                        version,
+                        colors,
+                        {color.pk: color for color in colors},
+                        {color.hex_code.upper(): color for color in colors},
+                    )
+                    self.state = state
+        return state
+
+    def all(self):
+        return self.get_state()[1]
+
+    def get(self, pk):
+        return self.get_state()[2].get(pk)
+
+    def get_by_hex(self, hex_code):
+        return self.get_state()[3].get(hex_code.lstrip('#').upper())
+
+    def get_default(self):
+        """Возвращает начальный цвет, создавая его при отсутствии."""
+        color = self.get_by_hex(DEFAULT_COLOR_HEX)
+        if color is None:
+            color, created = Color.objects.get_or_create(
+                hex_code=DEFAULT_COLOR_HEX,
+                defaults={'cost': 0},
+            )
         return color
 
+    def get_next(self, color):
+        """Возвращает следующий по стоимости цвет для покупки или None."""
+        cost = color.cost if color is not None else -1
+        return next(
+            (item for item in self.all() if item.cost > cost), None
+        )
+
+    def clear(self):
+        """Очищает каталог процесса; он перечитается при обращении."""
+        self.state = None
+
+    def invalidate(self):
+        """Делает каталог устаревшим во всех процессах."""
+        self.clear()
+        bump_version(COLORS_VERSION)
+
+
+color_catalog = ColorCatalog()
+
 
 class User(AbstractUser):
     """Кастомизация базовой модели пользователя."""
@@ -57,6 +152,18 @@ class User(AbstractUser):
         verbose_name='фото пользователя',
         help_text='Добавьте к профилю свою фотографию',
     )
+    photo_small = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name='адрес маленькой миниатюры фото',
+    )
+    photo_large = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name='адрес большой миниатюры фото',
+    )
     color = models.ForeignKey(
         Color,
         related_name='users',
@@ -90,20 +197,30 @@ class User(AbstractUser):
             self.color = Color.get_default_color()
         return super(User, self).save(*args, **kwargs)
 
+    def get_color(self):
+        """Возвращает цвет пользователя из каталога цветов."""
+        return color_catalog.get(self.color_id)
+
 
 class Wallet(models.Model):
-    """Кошелек с наградными монетами пользователя."""
+    """
+    Кошелек с наградными монетами пользователя.
+
+    Суммы кошелька - материализованный итог журнала `CoinTransaction`:
+    начисления только добавляют строки в журнал, а `materialize` пакетно
+    переносит их в кошельки.
+    """
 
     owner = models.OneToOneField(
         User,
         on_delete=models.CASCADE,
         verbose_name='владелец',
     )
-    total_won = models.PositiveSmallIntegerField(
+    total_won = models.PositiveBigIntegerField(
         verbose_name='получено монет за все время',
         default=0,
     )
-    current_sum = models.PositiveSmallIntegerField(
+    current_sum = models.PositiveBigIntegerField(
         verbose_name='текущая сумма монет',
         default=0,
     )
@@ -129,3 +246,384 @@ class Wallet(models.Model):
         на печать.
         """
         return f'{self.owner} + {self.current_sum}'
+
+    @classmethod
+    def materialize(cls, owners=None, batch_size=1000):
+        """
+        Переносит необработанные записи журнала монет в кошельки.
+
+        Записи обрабатываются пакетами по `batch_size`, каждый пакет -
+        в своей транзакции одним обновлением кошельков. `owners` -
+        идентификаторы пользователей, которыми ограничивается перенос.
+        Возвращает количество перенесенных записей.
+        """
+        pending = CoinTransaction.objects.filter(materialized=False)
+        if owners is not None:
+            pending = pending.filter(owner_id__in=owners)
+        if not pending.exists():
+            return 0
+        materialized = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    pending.select_for_update(skip_locked=True)
+                    .order_by('pk')
+                    .values_list('pk', 'owner_id', 'amount')[:batch_size]
+                )
+                if not rows:
+                    return materialized
+                won, change = {}, {}
+                for pk, owner_id, amount in rows:
+                    change[owner_id] = change.get(owner_id, 0) + amount
+                    won[owner_id] = won.get(owner_id, 0) + max(amount, 0)
+                cls.objects.bulk_create(
+                    [cls(owner_id=owner_id) for owner_id in change],
+                    ignore_conflicts=True,
+                )
+                cls.objects.filter(owner_id__in=change).update(
+                    total_won=F('total_won') + Case(*[
+                        When(owner_id=owner_id, then=Value(amount))
+                        for owner_id, amount in won.items()
+                    ], default=Value(0)),
+                    current_sum=F('current_sum') + Case(*[
+                        When(owner_id=owner_id, then=Value(amount))
+                        for owner_id, amount in change.items()
+                    ], default=Value(0)),
+                )
+                CoinTransaction.objects.filter(
+                    pk__in=[row[0] for row in rows]
+                ).update(materialized=True)
+            materialized += len(rows)
+
+    @classmethod
+    def spend(cls, owner_id, amount):
+        """
+        Списывает `amount` монет одним условным обновлением кошелька,
+        если их хватает, и записывает покупку в журнал.
+
+        Проверка баланса и списание выполняются в одном запросе, поэтому
+        параллельные покупки не тратят одни монеты дважды. Возвращает
+        True при успешном списании.
+        """
+        with transaction.atomic(savepoint=False):
+            spent = cls.objects.filter(
+                owner_id=owner_id, current_sum__gte=amount
+            ).update(current_sum=F('current_sum') - amount)
+            if spent:
+                CoinTransaction.objects.create(
+                    owner_id=owner_id,
+                    amount=-amount,
+                    kind=CoinTransaction.PURCHASE,
+                    materialized=True,
+                )
+        return bool(spent)
+
+    @classmethod
+    def get_ledger_totals(cls, owners=None, last=None, materialized=None):
+        """
+        Возвращает суммы журнала по пользователям:
+        идентификатор -> (получено за все время, текущая сумма).
+
+        `last` - последняя учитываемая запись журнала, `materialized` -
+        учитывать только перенесенные (или только необработанные) записи.
+        """
+        ledger = CoinTransaction.objects.order_by()
+        if materialized is not None:
+            ledger = ledger.filter(materialized=materialized)
+        if owners is not None:
+            ledger = ledger.filter(owner_id__in=owners)
+        if last is not None:
+            ledger = ledger.filter(pk__lte=last)
+        return {
+            owner_id: (won, balance)
+            for owner_id, won, balance in ledger.values('owner_id').annotate(
+                won=Coalesce(Sum('amount', filter=Q(amount__gt=0)), 0),
+                balance=Sum('amount'),
+            ).values_list('owner_id', 'won', 'balance')
+        }
+
+    @classmethod
+    def open_balances(cls, owners=None, batch_size=1000):
+        """
+        Записывает в журнал монет начальные остатки кошельков, у которых
+        еще нет записей в журнале, например загруженных `loaddata`:
+        полученные монеты и уже потраченные.
+
+        Возвращает количество кошельков, получивших начальные остатки.
+        """
+        wallets = cls.objects.filter(total_won__gt=0).filter(~Exists(
+            CoinTransaction.objects.filter(owner_id=OuterRef('owner_id'))
+        ))
+        if owners is not None:
+            wallets = wallets.filter(owner_id__in=owners)
+        opened = 0
+        rows = wallets.order_by('owner_id').values_list(
+            'owner_id', 'total_won', 'current_sum'
+        ).iterator(chunk_size=batch_size)
+        for batch in batched(rows, batch_size):
+            transactions = []
+            for owner_id, total_won, current_sum in batch:
+                transactions.append(CoinTransaction(
+                    owner_id=owner_id,
+                    amount=total_won,
+                    kind=CoinTransaction.OPENING,
+                    materialized=True,
+                ))
+                if current_sum < total_won:
+                    transactions.append(CoinTransaction(
+                        owner_id=owner_id,
+                        amount=current_sum - total_won,
+                        kind=CoinTransaction.PURCHASE,
+                        materialized=True,
+                    ))
+            CoinTransaction.objects.bulk_create(transactions)
+            opened += len(batch)
+        return opened
+
+    @classmethod
+    def reconcile(cls, batch_size=1000):
+        """
+        Сверяет кошельки с перенесенными записями журнала монет.
+
+        Кошельки без записей в журнале сначала получают начальные остатки
+        (см. `open_balances`). Возвращает расхождения: (идентификатор
+        владельца, суммы кошелька, суммы по журналу).
+        """
+        cls.open_balances(batch_size=batch_size)
+        totals = cls.get_ledger_totals(materialized=True)
+        wallets = cls.objects.order_by('owner_id').values_list(
+            'owner_id', 'total_won', 'current_sum'
+        ).iterator(chunk_size=batch_size)
+        return [
+            (owner_id, (total_won, current_sum), totals.get(owner_id, (0, 0)))
+            for owner_id, total_won, current_sum in wallets
+            if (total_won, current_sum) != totals.get(owner_id, (0, 0))
+        ]
+
+    @classmethod
+    def rebuild(cls, owners=None, batch_size=1000):
+        """
+        Пересчитывает кошельки по всему журналу монет.
+
+        Кошельки без записей в журнале сначала получают начальные остатки,
+        поэтому пересчет их не обнуляет. Учитываются записи, существующие
+        на момент начала пересчета. Возвращает количество пересчитанных
+        кошельков.
+        """
+        wallets = cls.objects.all()
+        if owners is not None:
+            wallets = wallets.filter(owner_id__in=owners)
+        rebuilt = 0
+        with transaction.atomic():
+            cls.open_balances(owners, batch_size)
+            last = CoinTransaction.objects.aggregate(
+                last=Coalesce(Max('pk'), 0)
+            )['last']
+            totals = cls.get_ledger_totals(owners, last)
+            CoinTransaction.objects.filter(
+                owner_id__in=wallets.values('owner_id'),
+                materialized=False,
+                pk__lte=last,
+            ).update(materialized=True)
+            for batch in batched(wallets.iterator(chunk_size=batch_size),
+                                 batch_size):
+                for wallet in batch:
+                    wallet.total_won, wallet.current_sum = totals.get(
+                        wallet.owner_id, (0, 0)
+                    )
+                cls.objects.bulk_update(batch, ('total_won', 'current_sum'))
+                rebuilt += len(batch)
+        return rebuilt
+
+
+class CoinTransaction(models.Model):
+    """
+    Запись журнала монет: начисление (положительная сумма) или списание
+    (отрицательная).
+
+    Записи только добавляются; флаг `materialized` отмечает записи,
+    уже перенесенные в кошелек.
+    """
+
+    PRIZE = 'prize'
+    PURCHASE = 'purchase'
+    OPENING = 'opening'
+    KIND_CHOICES = (
+        (PRIZE, 'награда за тест'),
+        (PURCHASE, 'покупка'),
+        (OPENING, 'начальный остаток'),
+    )
+
+    owner = models.ForeignKey(
+        User,
+        related_name='coin_transactions',
+        on_delete=models.CASCADE,
+        verbose_name='владелец',
+    )
+    amount = models.BigIntegerField(
+        verbose_name='сумма',
+    )
+    kind = models.CharField(
+        max_length=16,
+        choices=KIND_CHOICES,
+        verbose_name='вид операции',
+    )
+    date_created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='дата операции',
+    )
+    materialized = models.BooleanField(
+        default=False,
+        verbose_name='перенесена в кошелек',
+    )
+
+    class Meta:
+        """
+        Сортирует и добавляет названия в админке.
+        """
+        ordering = ('-id',)
+        verbose_name = 'операция с монетами'
+        verbose_name_plural = 'операции с монетами'
+
+        indexes = [
+            models.Index(
+                fields=('owner', 'id'),
+                condition=models.Q(materialized=False),
+                name='cointransaction_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        """
+        Добавляет удобочитаемый вывод при вызове экземпляра объекта
+        на печать.
+        """
+        return f'{self.owner} {self.amount:+}'
+
+
+class UserStats(models.Model):
+    """
+    Материализованная статистика пользователя для таблицы результатов.
+
+    Обновляется при завершении каждой попытки, поэтому таблица результатов
+    читается по индексу без агрегации всех попыток.
+    """
+
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='stats',
+        on_delete=models.CASCADE,
+        verbose_name='пользователь',
+    )
+    tests_attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='общее количество тестирований',
+    )
+    tests_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='общее количество тестов',
+    )
+    tests_success = models.PositiveIntegerField(
+        default=0,
+        verbose_name='пройденных тестов',
+    )
+    total_won = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='получено монет за все время',
+    )
+
+    class Meta:
+        """
+        Сортирует и добавляет названия в админке.
+        """
+        ordering = ('-total_won', '-user')
+        verbose_name = 'статистика пользователя'
+        verbose_name_plural = 'статистика пользователей'
+
+        indexes = [
+            models.Index(
+                fields=('-total_won', '-user'),
+                name='userstats_ranking_idx',
+            ),
+        ]
+
+    def __str__(self):
+        """
+        Добавляет удобочитаемый вывод при вызове экземпляра объекта
+        на печать.
+        """
+        return f'{self.user} + {self.total_won}'
+
+    @classmethod
+    def count_attempt(cls, user, new_test, new_success, prize=0):
+        """
+        Учитывает в статистике завершенную попытку пользователя.
+
+        `new_test` - первая завершенная попытка по этому тесту,
+        `new_success` - тест пройден впервые, `prize` - начисленные монеты.
+        """
+        updated = cls.objects.filter(user=user).update(
+            tests_attempts=F('tests_attempts') + 1,
+            tests_count=F('tests_count') + int(new_test),
+            tests_success=F('tests_success') + int(new_success),
+            total_won=F('total_won') + prize,
+        )
+        if not updated:
+            cls.rebuild(User.objects.filter(pk=user.pk))
+
+    @classmethod
+    def rebuild(cls, users=None, batch_size=1000):
+        """
+        Пересчитывает статистику пользователей по попыткам и журналу
+        монет.
+
+        Монеты считаются по всем начислениям журнала, включая еще
+        не перенесенные в кошельки; кошельки без записей в журнале сначала
+        получают начальные остатки. Возвращает количество пересчитанных
+        пользователей.
+        """
+        if users is None:
+            users = User.objects.all()
+        Wallet.open_balances(users.values('pk'), batch_size)
+        rows = users.order_by().annotate(
+            attempts_count=Count(
+                'attempts', filter=Q(attempts__result__isnull=False)
+            ),
+            tests_completed=Count(
+                'attempts__testcase',
+                distinct=True,
+                filter=Q(attempts__result__isnull=False),
+            ),
+            tests_passed=Count(
+                'attempts__testcase',
+                distinct=True,
+                filter=Q(attempts__success=True),
+            ),
+            won=Coalesce(Subquery(
+                CoinTransaction.objects.filter(
+                    owner=OuterRef('pk'), amount__gt=0
+                ).order_by().values('owner').annotate(
+                    won=Sum('amount')
+                ).values('won')
+            ), 0),
+        ).values_list(
+            'pk', 'attempts_count', 'tests_completed', 'tests_passed', 'won'
+        ).iterator(chunk_size=batch_size)
+        stats = (
+            cls(
+                user_id=pk,
+                tests_attempts=attempts_count,
+                tests_count=tests_completed,
+                tests_success=tests_passed,
+                total_won=won,
+            )
+            for pk, attempts_count, tests_completed, tests_passed, won in rows
+        )
+        rebuilt = 0
+        with transaction.atomic():
+            cls.objects.filter(user__in=users.values('pk')).delete()
+            for batch in batched(stats, batch_size):
+                cls.objects.bulk_create(batch)
+                rebuilt += len(batch)
+        return rebuilt
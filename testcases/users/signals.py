@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from spare_kits.page_cache import LEADERBOARD_PAGES, invalidate_pages
+from .avatars import schedule_avatars
+from .models import Color, User, UserStats, Wallet, color_catalog
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.create(user=instance)
+
+
+@receiver(pre_save, sender=User)
+def photo_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Очищает адреса миниатюр при смене фотографии, например в админке,
+    и ставит их построение в очередь после фиксации транзакции.
+    """
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and 'photo' not in update_fields:
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list(
+        'photo', flat=True
+    ).first()
+    if previous is None or previous == instance.photo.name:
+        return
+    for field in settings.AVATAR_THUMBNAILS:
+        setattr(instance, field, '')
+    # Новый файл получает окончательное имя при сохранении поля
+    transaction.on_commit(
+        lambda: schedule_avatars(instance.photo.name, [instance.pk])
+    )
+
+
+@receiver((post_save, post_delete), sender=User)
+@receiver((post_save, post_delete), sender=Wallet)
+@receiver((post_save, post_delete), sender=UserStats)
+@receiver((post_save, post_delete), sender=Color)
+def leaderboard_changed(sender, **kwargs):
+    invalidate_pages(LEADERBOARD_PAGES)
+
+
+@receiver((post_save, post_delete), sender=Color)
+def color_changed(sender, **kwargs):
+    color_catalog.clear()
+    transaction.on_commit(color_catalog.invalidate)
+
+
+@receiver(request_started)
+def colors_request_started(sender, **kwargs):
+    color_catalog.start_request()
+
+
+@receiver(request_finished)
+def colors_request_finished(sender, **kwargs):
+    color_catalog.finish_request()
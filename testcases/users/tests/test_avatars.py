@@ -0,0 +1,153 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..avatars import generate_avatars
+
+User = get_user_model()
+
+DEFAULT_PHOTO = 'user_avatar/default_user.jpg'
+
+
+def make_photo(name='photo.png', size=(300, 150)):
+    content = BytesIO()
+    Image.new('RGB', size, 'red').save(content, 'PNG')
+    return SimpleUploadedFile(name, content.getvalue(), 'image/png')
+
+
+class AvatarsTests(TestCase):
+    """Тестирует построение миниатюр аватаров."""
+
+    def setUp(self):
+        """Переносит медиафайлы во временный каталог и чистит кэш sorl."""
+        cache.clear()
+        media_root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, media_root)
+        (media_root / 'user_avatar').mkdir()
+        shutil.copy(
+            Path(settings.MEDIA_ROOT) / DEFAULT_PHOTO,
+            media_root / DEFAULT_PHOTO,
+        )
+        media_settings = override_settings(
+            MEDIA_ROOT=str(media_root), AVATAR_WORKERS=0
+        )
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.media_root = media_root
+
+    def get_size(self, url):
+        name = url.removeprefix(settings.MEDIA_URL).lstrip('/')
+        with Image.open(self.media_root / name) as image:
+            return image.size
+
+    def test_signup_builds_thumbnails(self):
+        """Миниатюры загруженной фотографии строятся после регистрации."""
+        with self.captureOnCommitCallbacks(execute=True):
+            Client().post(reverse('users:signup'), {
+                'first_name': 'Вася',
+                'last_name': 'Васечкин',
+                'username': 'basilio',
+                'email': 'vasya@kot.com',
+                'password1': 'Wiskas2023',
+                'password2': 'Wiskas2023',
+                'photo': make_photo(),
+            })
+        user = User.objects.get(username='basilio')
+        self.assertTrue(user.photo.name.startswith('users_photos/'))
+        self.assertEqual(self.get_size(user.photo_small), (100, 100))
+        self.assertEqual(self.get_size(user.photo_large), (200, 200))
+
+    def test_signup_updates_only_new_user(self):
+        """Регистрация с фотографией по умолчанию не переписывает
+        миниатюры других пользователей.
+        """
+        user = User.objects.create_user(
+            username='tester', photo_small='old.jpg', photo_large='old.jpg'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Client().post(reverse('users:signup'), {
+                'first_name': 'Вася',
+                'last_name': 'Васечкин',
+                'username': 'basilio',
+                'email': 'vasya@kot.com',
+                'password1': 'Wiskas2023',
+                'password2': 'Wiskas2023',
+            })
+        self.assertTrue(
+            User.objects.get(username='basilio').photo_small.endswith('.jpg')
+        )
+        user.refresh_from_db()
+        self.assertEqual(user.photo_small, 'old.jpg')
+
+    def test_photo_change_rebuilds_thumbnails(self):
+        """При смене фотографии миниатюры строятся заново."""
+        user = User.objects.create_user(username='tester')
+        generate_avatars(user.photo.name)
+        user.refresh_from_db()
+        old_small = user.photo_small
+        user.photo = make_photo()
+        with self.captureOnCommitCallbacks() as callbacks:
+            user.save()
+        user.refresh_from_db()
+        self.assertEqual((user.photo_small, user.photo_large), ('', ''))
+        for callback in callbacks:
+            callback()
+        user.refresh_from_db()
+        self.assertNotEqual(user.photo_small, old_small)
+        self.assertEqual(self.get_size(user.photo_small), (100, 100))
+        new_small = user.photo_small
+        user.save()
+        user.refresh_from_db()
+        self.assertEqual(user.photo_small, new_small)
+
+    def test_leaderboard_uses_stored_urls(self):
+        """Таблица результатов выводит адреса миниатюр, сохраненные
+        после кэширования страницы.
+        """
+        user = User.objects.create_user(username='tester')
+        User.objects.update(photo_small='', photo_large='')
+        guest_client = Client()
+        guest_client.get(reverse('users:users-list'))
+        with self.captureOnCommitCallbacks(execute=True):
+            generate_avatars(user.photo.name)
+        user.refresh_from_db()
+        response = guest_client.get(reverse('users:users-list'))
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, f'src="{user.photo_small}"')
+
+    def test_missing_photo_is_skipped(self):
+        """Для отсутствующего файла адреса миниатюр не сохраняются."""
+        User.objects.create_user(username='tester', photo='missing.jpg')
+        with self.assertLogs('sorl.thumbnail', 'ERROR'):
+            with self.assertLogs('users.avatars', 'WARNING'):
+                self.assertEqual(generate_avatars('missing.jpg'), 0)
+
+    def test_backfill_command(self):
+        """Команда строит миниатюры один раз для каждой фотографии."""
+        User.objects.bulk_create(
+            User(username=f'user{index}', photo=DEFAULT_PHOTO)
+            for index in range(3)
+        )
+        out = StringIO()
+        call_command('backfill_avatars', workers=0, stdout=out)
+        self.assertIn('3', out.getvalue())
+        self.assertEqual(
+            set(User.objects.values_list('photo_small', 'photo_large')),
+            {(
+                User.objects.first().photo_small,
+                User.objects.first().photo_large,
+            )},
+        )
+        self.assertFalse(User.objects.filter(photo_small='').exists())
+        call_command('backfill_avatars', workers=0, stdout=out)
+        self.assertIn('Обновлено пользователей: 0', out.getvalue())
@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .. import models
+from ..models import Color, color_catalog
+
+User = get_user_model()
+
+
+class ColorCatalogTests(TestCase):
+    """Тестирует каталог цветов процесса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создает цвета для покупки."""
+        cls.default = Color.get_default_color()
+        cls.color2 = Color.objects.create(hex_code='7B68EE', cost=100)
+        cls.color1 = Color.objects.create(hex_code='00FFFF', cost=50)
+
+    def setUp(self):
+        """Чистит каталог от цветов других тестов."""
+        cache.clear()
+        color_catalog.clear()
+
+    def test_lookups_without_queries(self):
+        """Загруженный каталог отвечает без запросов к базе данных."""
+        color_catalog.all()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                color_catalog.all(), (self.default, self.color1, self.color2)
+            )
+            self.assertEqual(Color.get_default_color(), self.default)
+            self.assertEqual(color_catalog.get(self.color2.pk), self.color2)
+            self.assertEqual(color_catalog.get_by_hex('#7b68ee'), self.color2)
+            self.assertEqual(
+                color_catalog.get_next(self.default), self.color1
+            )
+            self.assertEqual(color_catalog.get_next(self.color1), self.color2)
+            self.assertIsNone(color_catalog.get_next(self.color2))
+
+    def test_new_user_gets_default_color(self):
+        """Новому пользователю начальный цвет назначается из каталога."""
+        color_catalog.all()
+        with CaptureQueriesContext(connection) as context:
+            user = User.objects.create_user(username='tester')
+        self.assertEqual(user.color, self.default)
+        self.assertEqual(user.get_color(), self.default)
+        self.assertFalse(any(
+            'users_color' in query['sql']
+            for query in context.captured_queries
+        ))
+
+    def test_signals_invalidate_catalog(self):
+        """Изменение цветов обновляет каталог во всех процессах."""
+        color_catalog.all()
+        with self.captureOnCommitCallbacks(execute=True):
+            color3 = Color.objects.create(hex_code='32CD32', cost=75)
+        self.assertEqual(color_catalog.get_next(self.color1), color3)
+        version = color_catalog.state[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            color3.delete()
+        self.assertIsNone(color_catalog.get_by_hex('32CD32'))
+        self.assertNotEqual(color_catalog.state[0], version)
+
+    def test_version_checked_once_per_request(self):
+        """Во время запроса версия каталога проверяется один раз."""
+        color_catalog.all()
+        with mock.patch.object(
+            models, 'get_version', wraps=models.get_version
+        ) as get_version:
+            color_catalog.start_request()
+            try:
+                for _ in range(3):
+                    color_catalog.get(self.color1.pk)
+                self.assertEqual(get_version.call_count, 1)
+            finally:
+                color_catalog.finish_request()
+            color_catalog.get(self.color1.pk)
+            color_catalog.get(self.color1.pk)
+            self.assertEqual(get_version.call_count, 3)
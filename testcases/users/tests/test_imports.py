@@ -0,0 +1,88 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import Color, UserStats, Wallet
+
+User = get_user_model()
+
+CSV_ROWS = (
+    'username,email,first_name,last_name,password\n'
+    'ivanov,ivanov@school.ru,Иван,Иванов,Secret123\n'
+    ',nobody@school.ru,Без,Имени,Secret123\n'
+    'petrov,not-an-email,Петр,Петров,Secret123\n'
+    'sidorov,,Сидор,Сидоров,\n'
+    'ivanov,other@school.ru,Иван,Другой,Secret123\n'
+    'existing,,,,Secret123\n'
+)
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+])
+class ImportUsersTests(TestCase):
+    """Тестирует массовый импорт пользователей."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создает уже существующего пользователя."""
+        User.objects.create_user(username='existing')
+
+    def setUp(self):
+        """Создает временный каталог для файлов импорта."""
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def import_file(self, name, content, **options):
+        path = self.directory / name
+        path.write_text(content, encoding='utf-8')
+        out, err = StringIO(), StringIO()
+        call_command(
+            'import_users', str(path), stdout=out, stderr=err, **options
+        )
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import(self):
+        """Корректные строки импортируются, ошибочные - выводятся."""
+        out, err = self.import_file(
+            'users.csv', CSV_ROWS, batch_size=2, workers=0
+        )
+        self.assertIn('импортировано: 2, ошибок: 4', out)
+        for line in (3, 4, 6, 7):
+            self.assertIn(f'Строка {line}:', err)
+        ivanov = User.objects.get(username='ivanov')
+        self.assertEqual(ivanov.last_name, 'Иванов')
+        self.assertTrue(ivanov.check_password('Secret123'))
+        self.assertEqual(ivanov.color, Color.get_default_color())
+        self.assertFalse(
+            User.objects.get(username='sidorov').has_usable_password()
+        )
+        imported = ('ivanov', 'sidorov')
+        self.assertEqual(
+            Wallet.objects.filter(owner__username__in=imported).count(), 2
+        )
+        self.assertEqual(
+            UserStats.objects.filter(user__username__in=imported).count(), 2
+        )
+
+    def test_jsonl_import_with_process_pool(self):
+        """JSON Lines импортируется с хешированием паролей в процессах."""
+        lines = [
+            json.dumps({'username': f'user{index}', 'password': f'pw{index}'})
+            for index in range(5)
+        ]
+        lines.insert(2, '{broken')
+        out, err = self.import_file(
+            'users.jsonl', '\n'.join(lines) + '\n', batch_size=2, workers=2
+        )
+        self.assertIn('импортировано: 5, ошибок: 1', out)
+        self.assertIn('Строка 3: некорректный JSON', err)
+        user = User.objects.get(username='user4')
+        self.assertTrue(user.check_password('pw4'))
+        self.assertTrue(Wallet.objects.filter(owner=user).exists())
@@ -1,14 +1,17 @@
 from http import HTTPStatus
+from io import StringIO
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UsernameField
 from django.core.cache import cache
+from django.core.management import call_command
 from django.forms import CharField, EmailField, ImageField
 from django.test import Client, TestCase
 from django.urls import reverse
 
 from core.models import Answer, Attempt, Question, Test, Theme
-from ..models import Color, Wallet
+from spare_kits.pagination import NEXT, encode_cursor
+from ..models import CoinTransaction, Color, Wallet
 
 User = get_user_model()
 
@@ -76,6 +79,16 @@ class UsersViewTests(TestCase):
             success=True,
             result=100.00,
         )
+        # Начальные остатки кошельков в журнале монет
+        CoinTransaction.objects.bulk_create(
+            CoinTransaction(
+                owner=wallet.owner,
+                amount=wallet.total_won,
+                kind=CoinTransaction.OPENING,
+                materialized=True,
+            ) for wallet in (cls.wallet1, cls.wallet2)
+        )
+        call_command('rebuild_user_stats', stdout=StringIO())
         cls.PAGES = {
             'RESULTS_PAGE': reverse('users:users-list'),
             'USER_SELF_PAGE': reverse('users:users-me'),
@@ -118,7 +131,7 @@ class UsersViewTests(TestCase):
         response = self.authorized_client.get(
             self.PAGES['RESULTS_PAGE']
         )
-        object = response.context.get('object_list').first()
+        object = response.context.get('object_list')[0]
 
         self.assertEqual(object.photo, self.user1.photo)
         self.assertEqual(object.color, self.user1.color)
@@ -286,14 +299,42 @@ class PaginatorUsersViewsTest(TestCase):
     def test_paginator(self):
         """Проверка контекста шаблона страниц."""
         response = self.authorized_client.get(self.PAGE)
-        self.assertEqual(
-            len(response.context['page_obj']), self.FIRST_SECOND_PAGE
+        page = response.context['page_obj']
+        self.assertEqual(len(page), self.FIRST_SECOND_PAGE)
+        self.assertEqual(page.number, 1)
+        self.assertFalse(page.has_previous())
+        seen = [user.id for user in page]
+        response = self.authorized_client.get(
+            self.PAGE, {'cursor': page.next_cursor}
         )
-        response = self.authorized_client.get(self.PAGE + '?page=2')
-        self.assertEqual(
-            len(response.context['page_obj']), self.FIRST_SECOND_PAGE
+        page = response.context['page_obj']
+        self.assertEqual(len(page), self.FIRST_SECOND_PAGE)
+        self.assertEqual(page.number, 2)
+        seen += [user.id for user in page]
+        response = self.authorized_client.get(
+            self.PAGE, {'cursor': page.next_cursor}
         )
-        response = self.authorized_client.get(self.PAGE + '?page=3')
+        page = response.context['page_obj']
+        self.assertEqual(len(page), self.THIRD_PAGE)
+        self.assertEqual(page.number, 3)
+        self.assertFalse(page.has_next())
+        seen += [user.id for user in page]
         self.assertEqual(
-            len(response.context['page_obj']), self.THIRD_PAGE
+            seen,
+            list(User.objects.order_by('-id').values_list('id', flat=True))
+        )
+        response = self.authorized_client.get(
+            self.PAGE, {'cursor': page.previous_cursor}
         )
+        page = response.context['page_obj']
+        self.assertEqual(page.number, 2)
+        self.assertEqual([user.id for user in page], seen[10:20])
+        self.assertEqual(page.paginator.num_pages, 3)
+
+    def test_paginator_broken_cursor(self):
+        """Поврежденный курсор открывает первую страницу."""
+        response = self.authorized_client.get(self.PAGE, {'cursor': 'xyz'})
+        self.assertEqual(response.context['page_obj'].number, 1)
+        cursor = encode_cursor(['x', 'y'], NEXT, 2)
+        response = self.authorized_client.get(self.PAGE, {'cursor': cursor})
+        self.assertEqual(response.context['page_obj'].number, 1)
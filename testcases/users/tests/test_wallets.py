@@ -0,0 +1,198 @@
+import threading
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from ..models import CoinTransaction, Color, UserStats, Wallet
+
+User = get_user_model()
+
+
+class WalletLedgerTests(TestCase):
+    """Тестирует журнал монет и перенос его записей в кошельки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создает пользователей, кошелек и цвет."""
+        cls.user1 = User.objects.create_user(username='tester')
+        cls.user2 = User.objects.create_user(username='einshtein')
+        cls.wallet1 = Wallet.objects.create(owner=cls.user1)
+        cls.color = Color.objects.create(hex_code='FE8855', cost=30)
+
+    def add_coins(self, owner, *amounts, kind=CoinTransaction.PRIZE):
+        CoinTransaction.objects.bulk_create(
+            CoinTransaction(owner=owner, amount=amount, kind=kind)
+            for amount in amounts
+        )
+
+    def test_materialize_in_batches(self):
+        """Записи журнала переносятся пакетами, кошельки создаются."""
+        self.add_coins(self.user1, 10, 20, 30)
+        self.add_coins(self.user2, 40, -15, kind=CoinTransaction.PURCHASE)
+        self.assertEqual(Wallet.materialize(batch_size=2), 5)
+        self.assertFalse(
+            CoinTransaction.objects.filter(materialized=False).exists()
+        )
+        wallet1 = Wallet.objects.get(owner=self.user1)
+        wallet2 = Wallet.objects.get(owner=self.user2)
+        self.assertEqual((wallet1.total_won, wallet1.current_sum), (60, 60))
+        self.assertEqual((wallet2.total_won, wallet2.current_sum), (40, 25))
+        self.assertEqual(Wallet.materialize(), 0)
+
+    def test_materialize_for_owners(self):
+        """Перенос можно ограничить пользователями."""
+        self.add_coins(self.user1, 10)
+        self.add_coins(self.user2, 20)
+        self.assertEqual(Wallet.materialize(owners=[self.user1.pk]), 1)
+        self.assertFalse(Wallet.objects.filter(owner=self.user2).exists())
+
+    def test_counters_are_wide(self):
+        """Суммы кошелька не ограничены 32767 монетами."""
+        self.add_coins(self.user1, *[30000] * 3)
+        Wallet.materialize()
+        self.wallet1.refresh_from_db()
+        self.assertEqual(self.wallet1.total_won, 90000)
+
+    def test_reconcile_and_rebuild(self):
+        """Расхождения с журналом находятся и исправляются пересчетом."""
+        self.add_coins(self.user1, 100, -40)
+        Wallet.materialize()
+        call_command('reconcile_wallets', stdout=StringIO())
+        Wallet.objects.filter(owner=self.user1).update(current_sum=5)
+        self.add_coins(self.user1, 7)
+        self.assertEqual(
+            Wallet.reconcile(),
+            [(self.user1.pk, (100, 5), (100, 60))],
+        )
+        with self.assertRaises(CommandError):
+            call_command('reconcile_wallets', stdout=StringIO())
+        call_command('rebuild_wallets', stdout=StringIO())
+        self.wallet1.refresh_from_db()
+        self.assertEqual(
+            (self.wallet1.total_won, self.wallet1.current_sum), (107, 67)
+        )
+        self.assertEqual(Wallet.reconcile(), [])
+        self.assertEqual(UserStats.objects.get(user=self.user1).total_won, 107)
+
+    def test_stats_count_pending_prizes(self):
+        """Таблица результатов учитывает еще не перенесенные награды."""
+        self.add_coins(self.user1, 100)
+        Wallet.materialize()
+        self.add_coins(self.user1, 50)
+        self.add_coins(self.user1, -30, kind=CoinTransaction.PURCHASE)
+        UserStats.rebuild()
+        self.assertEqual(UserStats.objects.get(user=self.user1).total_won, 150)
+        self.wallet1.refresh_from_db()
+        self.wallet1.save()
+        self.assertEqual(UserStats.objects.get(user=self.user1).total_won, 150)
+
+    def test_purchase_uses_pending_prizes(self):
+        """Покупка учитывает еще не перенесенные награды."""
+        self.add_coins(self.user1, 50)
+        client = Client()
+        client.force_login(self.user1)
+        client.get(reverse('users:user-color', args=(self.color.pk,)))
+        self.user1.refresh_from_db()
+        self.wallet1.refresh_from_db()
+        self.assertEqual(self.user1.color, self.color)
+        self.assertEqual(self.wallet1.current_sum, 20)
+        self.assertTrue(CoinTransaction.objects.filter(
+            owner=self.user1,
+            amount=-self.color.cost,
+            kind=CoinTransaction.PURCHASE,
+        ).exists())
+        self.assertEqual(Wallet.reconcile(), [])
+
+    def test_wallets_without_ledger_get_opening_balances(self):
+        """Кошельки, загруженные без журнала, не обнуляются пересчетом
+        и не считаются расхождениями.
+        """
+        Wallet.objects.filter(owner=self.user1).update(
+            total_won=1000, current_sum=400
+        )
+        UserStats.rebuild()
+        self.assertEqual(
+            UserStats.objects.get(user=self.user1).total_won, 1000
+        )
+        self.assertEqual(Wallet.reconcile(), [])
+        call_command('rebuild_wallets', stdout=StringIO())
+        self.wallet1.refresh_from_db()
+        self.assertEqual(
+            (self.wallet1.total_won, self.wallet1.current_sum), (1000, 400)
+        )
+        self.assertEqual(Wallet.open_balances(), 0)
+        self.assertEqual(
+            CoinTransaction.objects.filter(owner=self.user1).count(), 2
+        )
+
+    def test_materialize_command(self):
+        """Команда переносит все необработанные записи."""
+        self.add_coins(self.user1, 10, 20)
+        out = StringIO()
+        call_command('materialize_coins', batch_size=1, stdout=out)
+        self.assertIn('2', out.getvalue())
+        self.wallet1.refresh_from_db()
+        self.assertEqual(self.wallet1.current_sum, 30)
+
+
+class ConcurrentPurchaseTests(TransactionTestCase):
+    """Тестирует параллельные покупки цвета."""
+
+    # Восстанавливает начальный цвет, созданный миграцией
+    serialized_rollback = True
+
+    def test_no_double_spend(self):
+        """Параллельные покупки не тратят одни монеты дважды."""
+        user = User.objects.create_user(username='tester')
+        Wallet.objects.create(owner=user, total_won=100, current_sum=100)
+        CoinTransaction.objects.create(
+            owner=user,
+            amount=100,
+            kind=CoinTransaction.OPENING,
+            materialized=True,
+        )
+        colors = [
+            Color.objects.create(hex_code=f'0000{index:02}', cost=30)
+            for index in range(8)
+        ]
+        clients = []
+        for color in colors:
+            client = Client()
+            client.force_login(user)
+            clients.append((client, color))
+        barrier = threading.Barrier(len(clients), timeout=10)
+
+        def buy(client, color):
+            barrier.wait()
+            try:
+                for _ in range(50):
+                    try:
+                        client.get(
+                            reverse('users:user-color', args=(color.pk,))
+                        )
+                        return
+                    except OperationalError:
+                        # SQLite блокирует таблицы на запись целиком
+                        time.sleep(0.01)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=buy, args=args) for args in clients
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wallet = Wallet.objects.get(owner=user)
+        purchases = CoinTransaction.objects.filter(
+            owner=user, kind=CoinTransaction.PURCHASE
+        ).count()
+        self.assertEqual(purchases, 3)
+        self.assertEqual(wallet.current_sum, 10)
+        self.assertEqual(Wallet.reconcile(), [])
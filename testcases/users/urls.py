@@ -8,6 +8,7 @@ from django.contrib.auth.views import (LoginView, LogoutView,
                                        PasswordResetView)
 from django.urls import path
 
+from spare_kits.page_cache import LEADERBOARD_PAGES, versioned_page
 from . import views
 
 app_name = 'users'
@@ -15,7 +16,7 @@ app_name = 'users'
 urlpatterns = [
     path(
         'results/',
-        views.UserListView.as_view(),
+        versioned_page(LEADERBOARD_PAGES)(views.UserListView.as_view()),
         name='users-list',
     ),
     path(
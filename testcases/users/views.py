@@ -1,12 +1,15 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Count, F, Q
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import F
+from django.http import Http404
 from django.urls import reverse_lazy
 from django.views.generic import (CreateView, ListView, RedirectView,
                                   TemplateView)
 
+from spare_kits.pagination import KeysetPaginationMixin
+from .avatars import schedule_avatars
 from .forms import СustomUserCreationForm
-from .models import Color, Wallet
+from .models import Wallet, color_catalog
 
 User = get_user_model()
 
@@ -21,25 +24,33 @@ class SignUp(CreateView):
     def form_valid(self, form):
         self.object = form.save()
         Wallet.objects.create(owner=self.object)
+        photo_name, user_id = self.object.photo.name, self.object.pk
+        transaction.on_commit(
+            lambda: schedule_avatars(photo_name, [user_id])
+        )
         return super().form_valid(form)
 
 
-class UserListView(ListView):
-    """Представление для списка пользователей."""
+class UserListView(KeysetPaginationMixin, ListView):
+    """
+    Представление для списка пользователей.
+
+    Страницы рейтинга выбираются по ключу (`total_won`, `id`),
+    а не смещением.
+    """
 
     template_name = 'users/user_list.html'
     paginate_by = 10
+    keyset_ordering = ('-total_won', '-id')
+    estimate_count = True
 
     def get_queryset(self):
-        return User.objects.select_related('wallet', 'color').annotate(
-            tests_attempts=Count('attempts'),
-            tests_count=Count('attempts__testcase', distinct=True),
-            tests_success=Count(
-                'attempts__testcase', distinct=True, filter=Q(
-                    attempts__success=True
-                )
-            ),
-        ).order_by('-wallet__total_won')
+        return User.objects.filter(stats__isnull=False).annotate(
+            tests_attempts=F('stats__tests_attempts'),
+            tests_count=F('stats__tests_count'),
+            tests_success=F('stats__tests_success'),
+            total_won=F('stats__total_won'),
+        )
 
 
 class UserMeView(TemplateView):
@@ -53,15 +64,12 @@ class UserMeView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['color'] = None
-        queryset = User.objects.select_related(
-            'wallet', 'color'
-        ).get(id=self.request.user.id)
-        context['object'] = queryset
-        user_color_cost = queryset.color.cost
-        available_colors = Color.objects.filter(cost__gt=user_color_cost)
-        if available_colors:
-            context['color'] = available_colors.first()
+        Wallet.materialize(owners=[self.request.user.pk])
+        user = User.objects.select_related('wallet').get(
+            id=self.request.user.id
+        )
+        context['object'] = user
+        context['color'] = color_catalog.get_next(user.get_color())
         return context
 
 
@@ -71,12 +79,20 @@ class UserColorView(RedirectView):
     url = reverse_lazy('users:users-me')
 
     def get_redirect_url(self, *args, **kwargs):
+        """
+        Покупает цвет: списание монет и смена цвета выполняются в одной
+        транзакции. Необработанные начисления переносятся в кошелек,
+        только если монет в нем не хватило.
+        """
         user = self.request.user
-        color = get_object_or_404(Color, pk=kwargs['pk'])
-        if color.cost <= user.wallet.current_sum:
-            Wallet.objects.filter(owner=user.id).update(
-                current_sum=F('current_sum') - color.cost
-            )
-            self.request.user.color = color
-            self.request.user.save()
+        color = color_catalog.get(kwargs['pk'])
+        if color is None:
+            raise Http404
+        with transaction.atomic():
+            paid = Wallet.spend(user.pk, color.cost)
+            if not paid and Wallet.materialize(owners=[user.pk]):
+                paid = Wallet.spend(user.pk, color.cost)
+            if paid:
+                user.color = color
+                user.save(update_fields=['color'])
         return super().get_redirect_url()